@@ -60,7 +60,8 @@ export const simulateScenario = async (speciesArray, scenarioData) => {
  * REQUEST:
  * {
  *   speciesArray: [...],
- *   targetSpecies: { name: "Grass", ... }
+ *   targetSpecies: { name: "Grass", ... },
+ *   foodWeb: { predator: ['Rabbit', ...], prey: ['Grass', ...] } // optional
  * }
  * 
  * RESPONSE:
@@ -72,11 +73,14 @@ export const simulateScenario = async (speciesArray, scenarioData) => {
  *   }
  * }
  */
-export const analyzeCascade = async (speciesArray, targetSpecies) => {
+export const analyzeCascade = async (speciesArray, targetSpecies, foodWeb = null) => {
   const payload = {
     speciesArray,
     targetSpecies
   };
+  if (foodWeb) {
+    payload.foodWeb = foodWeb;
+  }
 
   try {
     const response = await axios.post(
@@ -90,6 +94,40 @@ export const analyzeCascade = async (speciesArray, targetSpecies) => {
   }
 };
 
+/**
+ * Rank every species by the damage its removal would cause
+ * (one request instead of one cascade analysis per species)
+ * 
+ * REQUEST:
+ * {
+ *   speciesArray: [...]
+ * }
+ * 
+ * RESPONSE:
+ * {
+ *   keystone_ranking: [
+ *     { rank: 1, target_species: "Grass", ecosystem_health_change: -3, ... },
+ *     ...
+ *   ]
+ * }
+ */
+export const analyzeKeystones = async (speciesArray) => {
+  const payload = {
+    speciesArray
+  };
+
+  try {
+    const response = await axios.post(
+      `${API_BASE_URL}/api/analyze/keystone`,
+      payload
+    );
+    return response.data;
+  } catch (error) {
+    console.error('❌ Keystone sweep error:', error);
+    return { error: 'Keystone sweep failed' };
+  }
+};
+
 /**
  * Calculate invasive species impact
  * 
@@ -188,6 +226,115 @@ export const predictEcosystemTrajectory = async (speciesArray, timeSteps = 12) =
   }
 };
 
+/**
+ * Predict the trajectory in the compact table format
+ * 
+ * Species names are sent once and populations as a steps x species
+ * matrix, which is much smaller for long horizons.
+ * 
+ * RESPONSE data:
+ * {
+ *   names: ['Grass', 'Rabbit', ...],
+ *   steps: [0, 1, ...],
+ *   ecosystem_health: [75, 73, ...],
+ *   populations: [[5000, 300, ...], ...] // one row per step
+ * }
+ */
+export const predictEcosystemTrajectoryTable = async (speciesArray, timeSteps = 12) => {
+  try {
+    const response = await axios.post(
+      `${API_BASE_URL}/api/predict/trajectory`,
+      { species: speciesArray, timeSteps },
+      { headers: { Accept: 'application/vnd.ecopyramid.trajectory+json' } }
+    );
+    return response.data;
+  } catch (error) {
+    console.error('❌ Trajectory prediction error:', error);
+    return { error: 'Prediction failed' };
+  }
+};
+
+/**
+ * Stream the ecosystem trajectory step by step (NDJSON)
+ * 
+ * onStep is called with each timeline entry as soon as the server has
+ * computed it, so the UI can animate while the simulation continues.
+ * Resolves with the number of steps received.
+ */
+export const streamEcosystemTrajectory = async (speciesArray, timeSteps = 12, onStep = () => {}) => {
+  const response = await fetch(`${API_BASE_URL}/api/predict/trajectory/stream`, {
+    method: 'POST',
+    headers: { 'Content-Type': 'application/json', Accept: 'application/x-ndjson' },
+    body: JSON.stringify({ species: speciesArray, timeSteps })
+  });
+  if (!response.ok) {
+    throw new Error(`Trajectory stream failed (${response.status})`);
+  }
+
+  const reader = response.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = '';
+  let steps = 0;
+
+  for (;;) {
+    const { done, value } = await reader.read();
+    if (done) break;
+    buffer += decoder.decode(value, { stream: true });
+
+    const lines = buffer.split('\n');
+    buffer = lines.pop();
+    for (const line of lines) {
+      if (!line.trim()) continue;
+      const message = JSON.parse(line);
+      if (message.done) return message.steps;
+      onStep(message);
+      steps += 1;
+    }
+  }
+  return steps;
+};
+
+/**
+ * Ecosystem sessions: send the pyramid once, then only the changes
+ * 
+ * createEcosystemSession resolves with { session_id, data: { ids, summary } }.
+ * ids[i] is the id of speciesArray[i], used by remove/update deltas:
+ * 
+ *   { op: 'add', species: {...} }
+ *   { op: 'remove', id: 3 }
+ *   { op: 'update', id: 3, changes: { population: 120 } }
+ * 
+ * The summary holds ecosystem health, per-level totals and risk counts.
+ */
+export const createEcosystemSession = async (speciesArray) => {
+  try {
+    const response = await axios.post(`${API_BASE_URL}/api/sessions`, { species: speciesArray });
+    return response.data;
+  } catch (error) {
+    console.error('❌ Session creation error:', error);
+    return { error: 'Session creation failed' };
+  }
+};
+
+export const applyEcosystemDeltas = async (sessionId, deltas) => {
+  try {
+    const response = await axios.post(`${API_BASE_URL}/api/sessions/${sessionId}/deltas`, { deltas });
+    return response.data;
+  } catch (error) {
+    console.error('❌ Session update error:', error);
+    // 404 means the session expired: create a new one
+    return { error: 'Session update failed', status: error.response?.status };
+  }
+};
+
+export const closeEcosystemSession = async (sessionId) => {
+  try {
+    await axios.delete(`${API_BASE_URL}/api/sessions/${sessionId}`);
+  } catch (error) {
+    // Already expired, nothing to do
+  }
+};
+
 // ============================================
 // NEW: INVASIVE SPECIES PREDICTION
 // ============================================
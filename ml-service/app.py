@@ -1,15 +1,80 @@
 
-from fastapi import FastAPI, HTTPException
+from fastapi import Depends, FastAPI, HTTPException, Query, Request, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.exceptions import RequestValidationError
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
-from typing import List, Dict, Optional
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import JSONResponse, StreamingResponse
+from pydantic import BaseModel, Field, BeforeValidator, WithJsonSchema, model_validator
+from typing import List, Dict, Optional, Literal, Annotated, Any, Awaitable, Callable, Tuple
+from contextlib import asynccontextmanager
+import asyncio
+import functools
+import itertools
+import json
+import math
+import os
 import random
 
+from service.checkpoints import CheckpointStore, InvalidCheckpoint
+from service.executor import EXECUTOR_KINDS, ExecutorBusy, ExecutorRegistry, parse_overrides
+from service.jobs import JobManager, JobNotFound, JobQueueFull
+from service.instrumentation import MetricsMiddleware, RequestMetrics, TimedRoute
+from service.metrics import MetricsRegistry
+from service.micro_batch import MicroBatchRegistry
+from service.parallel_samples import gather_rows
+from service.sessions import SessionNotFound, SessionStore, SessionTooLarge
+from service.result_cache import ResultCache, canonical_key, seed_from_key
+from service.settings import env_choice, env_int, env_float, env_flag, env_str
+from service.startup import WARMUP_ECOSYSTEM, ModelLoader
+from service.trajectory_format import (
+    CONTENT_TYPES, encode_table, negotiate_format, table_from_timeline
+)
+
 # ============================================
 # INITIALIZE FASTAPI APP
 # ============================================
 
-app = FastAPI(title="Eco Pyramid ML Service", version="1.0")
+# ML_LAZY_IMPORTS=1 defers importing the model (and NumPy) until the
+# first request that needs it, for hosts that scale to zero.
+# ML_WARMUP runs every analysis once at startup (see service/startup.py)
+LAZY_IMPORTS = env_flag("ML_LAZY_IMPORTS", False)
+WARMUP_ENABLED = env_flag("ML_WARMUP", True)
+
+# Endpoints that never need the model (they must stay fast on a cold start)
+MODEL_FREE_PATHS = {
+    "/", "/api/health", "/api/models/status", "/api/cache/stats", "/api/sessions/stats",
+    "/api/jobs/stats", "/metrics"
+}
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Startup / shutdown hooks"""
+    warmup = None
+    if WARMUP_ENABLED:
+        if LAZY_IMPORTS:
+            # Accept requests right away and warm up in the background
+            # (a request arriving first simply waits for the import)
+            warmup = asyncio.create_task(asyncio.to_thread(model_loader.warm))
+        else:
+            await asyncio.to_thread(model_loader.warm)
+    yield
+    if warmup is not None and not warmup.done():
+        await warmup
+    job_manager.shutdown()
+    model_executors.shutdown()
+
+async def model_ready(request: Request):
+    """Import a deferred model before the first request that may use it"""
+    if not model_loader.loaded and request.url.path not in MODEL_FREE_PATHS:
+        await model_loader.ensure_loaded()
+
+app = FastAPI(
+    title="Eco Pyramid ML Service", version="1.0", lifespan=lifespan,
+    dependencies=[Depends(model_ready)]
+)
+# Endpoints report when they start/finish to the metrics middleware
+app.router.route_class = TimedRoute
 
 # Add CORS middleware for frontend access
 app.add_middleware(
@@ -19,23 +84,110 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Compress large responses (e.g. long trajectories) for clients that
+# send "Accept-Encoding: gzip"
+if env_flag("ML_GZIP_ENABLED", True):
+    app.add_middleware(
+        GZipMiddleware,
+        minimum_size=env_int("ML_GZIP_MIN_BYTES", 1024),
+        compresslevel=env_int("ML_GZIP_LEVEL", 6)
+    )
+
+# Per-stage latency, status codes, model vs fallback and payload sizes,
+# served on /metrics (added last so it also times CORS and gzip)
+METRICS_ENABLED = env_flag("ML_METRICS_ENABLED", True)
+metrics_registry = MetricsRegistry()
+request_metrics = RequestMetrics(metrics_registry)
+if METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware, metrics=request_metrics)
+
 # ============================================
 # TRY TO IMPORT CASCADE MODEL
 # ============================================
 
 cascade_model_available = False
+
 try:
-    from model.cascade_model import (
-        analyze_cascade,
-        analyze_invasive,
-        predict_populations,
-        assess_extinction_risks
-    )
-    cascade_model_available = True
-    print("✅ Cascade model loaded successfully")
-except ImportError as e:
-    print(f"⚠️ Cascade model not available: {e}")
-    print("⚠️ Falling back to basic prediction mode")
+    from model.errors import PopulationOverflow
+except ImportError:
+    class PopulationOverflow(ValueError):
+        """Never raised by the fallback paths"""
+
+def import_cascade_model() -> bool:
+    """
+    Import the model into this module (at startup, or on first use
+    with ML_LAZY_IMPORTS). Returns whether it is available.
+    """
+    global cascade_model_available
+    global analyze_cascade, analyze_keystones, analyze_invasive, analyze_invasive_sweep
+    global predict_populations, predict_populations_checkpointed
+    global predict_population_table, predict_health_curves, stream_populations
+    global assess_extinction_risks
+    global batch_cascade, batch_health_curves, batch_invasive, batch_risk, batch_trajectory
+    global CompiledEcosystem, IncrementalEcosystem, compile_ecosystem, compile_records
+    global evaluate_samples, latin_hypercube, output_names, parameter_bounds
+    global scale_samples, sensitivity_report
+    try:
+        from model.cascade_model import (
+            analyze_cascade,
+            analyze_keystones,
+            analyze_invasive,
+            analyze_invasive_sweep,
+            predict_populations,
+            predict_populations_checkpointed,
+            predict_health_curves,
+            predict_population_table,
+            stream_populations,
+            assess_extinction_risks
+        )
+        from model.batch import (
+            batch_cascade, batch_health_curves, batch_invasive, batch_risk, batch_trajectory
+        )
+        from model.ecosystem import CompiledEcosystem, compile_ecosystem
+        from model.incremental import IncrementalEcosystem, compile_records
+        from model.sensitivity import (
+            evaluate_samples, latin_hypercube, output_names, parameter_bounds,
+            scale_samples, sensitivity_report
+        )
+        cascade_model_available = True
+        print("✅ Cascade model loaded successfully")
+    except ImportError as e:
+        print(f"⚠️ Cascade model not available: {e}")
+        print("⚠️ Falling back to basic prediction mode")
+    return cascade_model_available
+
+def warm_up_cascade_model():
+    """
+    Run each analysis once on the built-in template ecosystem, so the
+    first real request does not pay for first-use costs
+    """
+    species = WARMUP_ECOSYSTEM
+    analyze_cascade(species, species[1], seed=0)
+    analyze_cascade(species, species[1], seed=0, ensemble_size=16)
+    analyze_keystones(species)
+    analyze_invasive(species, species[2], 5)
+    analyze_invasive_sweep(species, species[:2], [1, 10])
+    for mode in ("iterative", "analytic", "lotka_volterra"):
+        predict_populations(species, 12, mode)
+    predict_population_table(species, 12)
+    predict_health_curves(species, 12)
+    assess_extinction_risks(species, top_k=2)
+    batch_risk([species, species])
+    IncrementalEcosystem(species).risks()
+
+model_loader = ModelLoader(import_cascade_model, warm_up_cascade_model)
+if not LAZY_IMPORTS:
+    model_loader.load()
+
+def numpy_module():
+    """
+    NumPy for the request validators, imported with the model by
+    model_loader, so the first request's import is timed and reported
+    on /api/models/status however the request is validated
+    """
+    model_loader.load()
+    import numpy
+    return numpy
 
 # ============================================
 # PYDANTIC MODELS (Request/Response schemas)
@@ -52,30 +204,474 @@ class SpeciesData(BaseModel):
     ecosystem: Optional[str] = "grassland"
     _id: Optional[str] = None
 
+def _float_column(value: Any):
+    """Validate a numeric column straight into a float64 NumPy array"""
+    np = numpy_module()
+    try:
+        column = np.asarray(value, dtype=np.float64)
+    except (TypeError, ValueError):
+        raise ValueError("must be an array of numbers")
+    if column.ndim != 1:
+        raise ValueError("must be a flat array of numbers")
+    if not np.isfinite(column).all():
+        raise ValueError("must only contain finite numbers")
+    return column
+
+FloatColumn = Annotated[
+    Any,
+    BeforeValidator(_float_column),
+    WithJsonSchema({"type": "array", "items": {"type": "number"}})
+]
+
+FiniteFloat = Annotated[float, Field(allow_inf_nan=False)]
+
+class SpeciesOverride(BaseModel):
+    """Values replacing a catalog species' own (only the fields given)"""
+    name: Optional[str] = None
+    icon: Optional[str] = None
+    trophicLevel: Optional[str] = None
+    biomass: Optional[FiniteFloat] = None
+    energy: Optional[FiniteFloat] = None
+    population: Optional[FiniteFloat] = None
+
+SPECIES_COLUMN_FIELDS = ("name", "trophicLevel", "biomass", "energy", "population", "icon")
+
+class SpeciesColumns(BaseModel):
+    """
+    Columnar species payload: parallel arrays with one entry per species.
+    Much cheaper than a list of SpeciesData for large ecosystems, since
+    no object is created per species.
+    
+    Instead of the columns, species can be picked from the shared species
+    catalog (ML_SPECIES_CATALOG) by ID, with per-species overrides keyed
+    by position: {"catalogIds": [...], "overrides": {"2": {"population": 40}}}.
+    The columns are then filled in from the catalog.
+    """
+    name: Optional[List[str]] = None
+    trophicLevel: Optional[List[str]] = None
+    biomass: Optional[FloatColumn] = None
+    energy: Optional[FloatColumn] = None
+    population: Optional[FloatColumn] = None
+    icon: Optional[List[str]] = None
+    catalogIds: Optional[List[str]] = None
+    overrides: Optional[Dict[int, SpeciesOverride]] = None
+    
+    @model_validator(mode="after")
+    def check_lengths(self):
+        if self.catalogIds is not None:
+            self.fill_from_catalog()
+        else:
+            missing = [f for f in SPECIES_COLUMN_FIELDS[:-1] if getattr(self, f) is None]
+            if missing:
+                raise ValueError(f"Missing columns: {', '.join(missing)} (or use catalogIds)")
+            if self.overrides:
+                raise ValueError("overrides only apply to catalogIds")
+        
+        size = len(self.name)
+        for field in ("trophicLevel", "biomass", "energy", "population", "icon"):
+            column = getattr(self, field)
+            if column is not None and len(column) != size:
+                raise ValueError(f"{field} has {len(column)} entries, expected {size}")
+        return self
+    
+    def fill_from_catalog(self):
+        """Replace catalogIds (+ overrides) by the catalog's columns"""
+        given = [f for f in SPECIES_COLUMN_FIELDS if getattr(self, f) is not None]
+        if given:
+            raise ValueError(
+                f"catalogIds replaces the species columns ({', '.join(given)}); "
+                "use overrides to change single species"
+            )
+        catalog = species_catalog()
+        if catalog is None:
+            raise ValueError("No species catalog is available (ML_SPECIES_CATALOG)")
+        
+        columns = catalog.select(self.catalogIds)
+        for index, override in (self.overrides or {}).items():
+            if not 0 <= index < len(self.catalogIds):
+                raise ValueError(f"overrides refer to species {index}, out of range")
+            for field, value in override.dict(exclude_none=True).items():
+                columns[field][index] = value
+        
+        for field, column in columns.items():
+            setattr(self, field, column)
+    
+    def columns(self) -> Dict:
+        """The species columns, as CompiledEcosystem.from_columns takes them"""
+        return {field: getattr(self, field) for field in SPECIES_COLUMN_FIELDS}
+    
+    def to_records(self) -> List[Dict]:
+        """Per-species dicts (only needed by the fallback paths)"""
+        icons = self.icon or ["🔹"] * len(self.name)
+        return [
+            {
+                "name": name, "icon": icon, "trophicLevel": level,
+                "biomass": biomass, "energy": energy, "population": population
+            }
+            for name, icon, level, biomass, energy, population in zip(
+                self.name, icons, self.trophicLevel,
+                self.biomass.tolist(), self.energy.tolist(), self.population.tolist()
+            )
+        ]
+
+def _link_column(value: Any):
+    """Validate food web link endpoints: species indices or names"""
+    np = numpy_module()
+    if not isinstance(value, (list, tuple)):
+        raise ValueError("must be an array of species names or indices")
+    if len(value) == 0:
+        return np.empty(0, dtype=np.int64)
+    column = np.asarray(value)
+    if column.ndim == 1 and column.dtype.kind in "iu":
+        return column.astype(np.int64)
+    if all(isinstance(v, (str, int)) and not isinstance(v, bool) for v in value):
+        return list(value)
+    raise ValueError("must be an array of species names or indices")
+
+LinkColumn = Annotated[
+    Any,
+    BeforeValidator(_link_column),
+    WithJsonSchema({"type": "array", "items": {"anyOf": [{"type": "string"}, {"type": "integer"}]}})
+]
+
+class FoodWebLinks(BaseModel):
+    """
+    Predator -> prey links as two parallel arrays: predator[i] eats
+    prey[i]. Species are given by name or by index in the species list.
+    """
+    predator: LinkColumn
+    prey: LinkColumn
+    
+    @model_validator(mode="after")
+    def check_lengths(self):
+        if len(self.predator) != len(self.prey):
+            raise ValueError("predator and prey must have the same length")
+        return self
+    
+    def check_species(self, names: List[str]):
+        """Raise ValueError if a link refers to a species not in `names`"""
+        known = None
+        for column in (self.predator, self.prey):
+            if hasattr(column, "dtype"):
+                if len(column) and (column.min() < 0 or column.max() >= len(names)):
+                    raise ValueError("foodWeb species index out of range")
+                continue
+            known = known if known is not None else set(names)
+            for ref in column:
+                if isinstance(ref, str):
+                    if ref not in known:
+                        raise ValueError(f"foodWeb refers to unknown species '{ref}'")
+                elif not 0 <= ref < len(names):
+                    raise ValueError("foodWeb species index out of range")
+
+def require_species(request: BaseModel, list_field: str) -> BaseModel:
+    """Check that exactly one of the list or columnar species inputs is set"""
+    has_list = getattr(request, list_field) is not None
+    has_columns = request.speciesColumns is not None
+    if has_list == has_columns:
+        raise ValueError(f"Provide exactly one of {list_field} or speciesColumns")
+    return request
+
 class CascadeAnalysisRequest(BaseModel):
     """Request for cascade effect analysis"""
-    speciesArray: List[SpeciesData]
+    speciesArray: Optional[List[SpeciesData]] = None
+    speciesColumns: Optional[SpeciesColumns] = None
     targetSpecies: SpeciesData
+    # Monte Carlo mode: number of samples of the predator-loss jitter
+    ensembleSize: Optional[int] = Field(default=None, ge=1, le=100000)
+    # Fix the random draws (defaults to a seed derived from the request)
+    seed: Optional[int] = Field(default=None, ge=0, le=2**32 - 1)
+    # Optional real predator -> prey links (cascade follows them)
+    foodWeb: Optional[FoodWebLinks] = None
+    
+    @model_validator(mode="after")
+    def check_species(self):
+        require_species(self, "speciesArray")
+        if self.foodWeb is not None:
+            if self.speciesColumns is not None:
+                names = self.speciesColumns.name
+            else:
+                names = [s.name for s in self.speciesArray]
+            self.foodWeb.check_species(names)
+        return self
+
+class KeystoneSweepRequest(BaseModel):
+    """Request for the all-targets keystone sweep"""
+    speciesArray: Optional[List[SpeciesData]] = None
+    speciesColumns: Optional[SpeciesColumns] = None
+    
+    @model_validator(mode="after")
+    def check_species(self):
+        return require_species(self, "speciesArray")
 
 class InvasiveSpeciesRequest(BaseModel):
     """Request for invasive species analysis"""
-    currentSpecies: List[SpeciesData]
+    currentSpecies: Optional[List[SpeciesData]] = None
+    speciesColumns: Optional[SpeciesColumns] = None
     invasiveSpecies: SpeciesData
     invasionStrength: int = 5
+    
+    @model_validator(mode="after")
+    def check_species(self):
+        return require_species(self, "currentSpecies")
+
+# Most candidate invasives in one sweep (the response holds
+# candidates x strengths x species changes)
+MAX_INVASIVE_CANDIDATES = env_int("ML_MAX_INVASIVE_CANDIDATES", 500)
+
+InvasionStrength = Annotated[int, Field(ge=1, le=10)]
+
+class InvasiveSweepRequest(BaseModel):
+    """Request for the candidates x strengths invasive sweep"""
+    currentSpecies: Optional[List[SpeciesData]] = None
+    speciesColumns: Optional[SpeciesColumns] = None
+    candidates: List[SpeciesData] = Field(min_length=1, max_length=MAX_INVASIVE_CANDIDATES)
+    strengths: Optional[List[InvasionStrength]] = Field(default=None, min_length=1, max_length=10)
+    
+    @model_validator(mode="after")
+    def check_species(self):
+        return require_species(self, "currentSpecies")
+
+# Most parameter samples in one sensitivity analysis, and the fewest
+# samples worth sending to a worker as one chunk
+MAX_SENSITIVITY_SAMPLES = env_int("ML_MAX_SENSITIVITY_SAMPLES", 4096)
+SENSITIVITY_MIN_CHUNK = env_int("ML_SENSITIVITY_MIN_CHUNK", 32)
+
+# The Lotka-Volterra constants a sensitivity analysis can vary
+SensitivityParameter = Literal[
+    "producer_growth_rate", "consumer_growth_rate", "predation_rate",
+    "natural_mortality", "energy_transfer_efficiency", "carrying_capacity_factor"
+]
+
+class SensitivityRequest(BaseModel):
+    """Request for a parameter sensitivity analysis"""
+    species: Optional[List[SpeciesData]] = None
+    speciesColumns: Optional[SpeciesColumns] = None
+    samples: int = Field(default=256, ge=16, le=MAX_SENSITIVITY_SAMPLES)
+    timeSteps: int = Field(default=12, ge=1, le=1000)
+    # Default range of each parameter: its constant +/- this fraction
+    spread: float = Field(default=0.5, gt=0, lt=1)
+    # Explicit (low, high) ranges for some parameters
+    bounds: Optional[Dict[SensitivityParameter, Tuple[FiniteFloat, FiniteFloat]]] = None
+    # Parameters to vary (default: all of them)
+    parameters: Optional[List[SensitivityParameter]] = Field(default=None, min_length=1)
+    # Bins per parameter of the index estimate (default: sqrt(samples))
+    bins: Optional[int] = Field(default=None, ge=2, le=1024)
+    # Fix the Latin hypercube (defaults to a seed derived from the request)
+    seed: Optional[int] = Field(default=None, ge=0, le=2**32 - 1)
+    
+    @model_validator(mode="after")
+    def check_species(self):
+        return require_species(self, "species")
+
+# Longest trajectory a request may ask for: number of dense steps, and
+# the largest step number in `steps` (bounds the work of one request)
+MAX_TIME_STEPS = env_int("ML_MAX_TIME_STEPS", 10000)
+MAX_TRAJECTORY_STEP = env_int("ML_MAX_TRAJECTORY_STEP", 1000000)
+
+TimeSteps = Annotated[int, Field(ge=0, le=MAX_TIME_STEPS)]
+TrajectorySteps = Optional[List[Annotated[int, Field(ge=0, le=MAX_TRAJECTORY_STEP)]]]
 
 class PopulationTrajectoryRequest(BaseModel):
     """Request for population trajectory prediction"""
-    species: List[SpeciesData]
-    timeSteps: int = 12
+    species: Optional[List[SpeciesData]] = None
+    speciesColumns: Optional[SpeciesColumns] = None
+    timeSteps: TimeSteps = 12
+    # "analytic" evaluates the closed-form solution at each step directly;
+    # "lotka_volterra" (RK4) / "lotka_volterra_rk45" couple the levels
+    mode: Literal["iterative", "analytic", "lotka_volterra", "lotka_volterra_rk45"] = "iterative"
+    # Optional sparse set of steps to return (e.g. [12, 120, 10000])
+    steps: TrajectorySteps = Field(default=None, max_length=10000)
+    
+    @model_validator(mode="after")
+    def check_species(self):
+        return require_species(self, "species")
+
+# Longest checkpoint token accepted (about 40 characters per species)
+MAX_CHECKPOINT_LENGTH = env_int("ML_MAX_CHECKPOINT_LENGTH", 8 * 1024 * 1024)
+
+class ResumableTrajectoryRequest(PopulationTrajectoryRequest):
+    """Population trajectory that may continue an earlier run"""
+    # Token from an earlier response: the run continues from its step
+    checkpoint: Optional[str] = Field(default=None, max_length=MAX_CHECKPOINT_LENGTH)
+    # Or just the step to continue from: the server resumes from the
+    # closest checkpoint it still has (recomputing the steps in between)
+    startStep: Optional[int] = Field(default=None, ge=0, le=MAX_TRAJECTORY_STEP)
+    
+    @model_validator(mode="after")
+    def check_resume(self):
+        if self.checkpoint is not None and self.startStep is not None:
+            raise ValueError("Provide at most one of checkpoint or startStep")
+        if self.startStep is not None and self.steps and min(self.steps) < self.startStep:
+            raise ValueError("steps must not come before startStep")
+        return self
+    
+    def report_steps(self) -> Optional[List[int]]:
+        """steps, with a dense range starting at startStep spelled out"""
+        if self.steps is None and self.startStep is not None:
+            return list(range(self.startStep, self.startStep + self.timeSteps))
+        return self.steps
+
+class TrajectoryStreamRequest(PopulationTrajectoryRequest):
+    """Request for a streamed population trajectory"""
+    # Number of steps sent together in one write
+    chunkSize: int = Field(default=1, ge=1, le=1000)
 
 class EcosystemHealthRequest(BaseModel):
     """Request for ecosystem health assessment"""
-    species: List[SpeciesData]
+    species: Optional[List[SpeciesData]] = None
+    speciesColumns: Optional[SpeciesColumns] = None
+    topK: Optional[int] = Field(default=None, ge=1)  # Only the k riskiest species
+    minScore: Optional[int] = Field(default=None, ge=0, le=100)  # Only risk_score >= minScore
+    
+    @model_validator(mode="after")
+    def check_species(self):
+        return require_species(self, "species")
+
+class SessionCreateRequest(BaseModel):
+    """Start an ecosystem session"""
+    species: Optional[List[SpeciesData]] = None
+    speciesColumns: Optional[SpeciesColumns] = None
+    
+    @model_validator(mode="after")
+    def check_species(self):
+        return require_species(self, "species")
+
+class SpeciesChanges(BaseModel):
+    """Fields to change on a session species (omitted = unchanged)"""
+    name: Optional[str] = None
+    icon: Optional[str] = None
+    trophicLevel: Optional[str] = None
+    biomass: Optional[float] = None
+    energy: Optional[float] = None
+    population: Optional[float] = None
+
+class SpeciesDelta(BaseModel):
+    """
+    One change to a session ecosystem:
+    {"op": "add", "species": {...}}
+    {"op": "remove", "id": 3}
+    {"op": "update", "id": 3, "changes": {"population": 120}}
+    """
+    op: Literal["add", "remove", "update"]
+    id: Optional[int] = None
+    species: Optional[SpeciesData] = None
+    changes: Optional[SpeciesChanges] = None
+    
+    @model_validator(mode="after")
+    def check_fields(self):
+        if self.op == "add" and self.species is None:
+            raise ValueError("add needs species")
+        if self.op != "add" and self.id is None:
+            raise ValueError(f"{self.op} needs id")
+        if self.op == "update" and self.changes is None:
+            raise ValueError("update needs changes")
+        return self
+
+class SessionDeltaRequest(BaseModel):
+    """Changes applied in order, all or nothing"""
+    deltas: List[SpeciesDelta] = Field(min_length=1, max_length=10000)
+
+class SessionCascadeRequest(BaseModel):
+    """Cascade analysis of a session ecosystem"""
+    targetSpecies: SpeciesData
+    ensembleSize: Optional[int] = Field(default=None, ge=1, le=100000)
+    seed: Optional[int] = Field(default=None, ge=0, le=2**32 - 1)
+
+class SessionTrajectoryRequest(BaseModel):
+    """Population trajectory of a session ecosystem"""
+    timeSteps: TimeSteps = 12
+    mode: Literal["iterative", "analytic", "lotka_volterra", "lotka_volterra_rk45"] = "iterative"
+    steps: TrajectorySteps = Field(default=None, max_length=10000)
+
+# Largest number of ecosystems in one batch request
+MAX_BATCH_ECOSYSTEMS = env_int("ML_MAX_BATCH_ECOSYSTEMS", 1000)
+
+class EcosystemInput(BaseModel):
+    """One ecosystem of a batch request"""
+    species: Optional[List[SpeciesData]] = None
+    speciesColumns: Optional[SpeciesColumns] = None
+    
+    @model_validator(mode="after")
+    def check_species(self):
+        return require_species(self, "species")
+
+class BatchCascadeItem(EcosystemInput):
+    """Ecosystem and the species removed from it"""
+    targetSpecies: SpeciesData
+    # Fix this ecosystem's random draws (default: batch seed + position)
+    seed: Optional[int] = Field(default=None, ge=0, le=2**32 - 1)
+
+class BatchCascadeRequest(BaseModel):
+    """Cascade analysis of many ecosystems at once"""
+    ecosystems: List[BatchCascadeItem] = Field(min_length=1, max_length=MAX_BATCH_ECOSYSTEMS)
+    ensembleSize: Optional[int] = Field(default=None, ge=1, le=100000)
+    seed: Optional[int] = Field(default=None, ge=0, le=2**32 - 1)
+
+class BatchInvasiveItem(EcosystemInput):
+    """Ecosystem and the species invading it"""
+    invasiveSpecies: SpeciesData
+    invasionStrength: int = 5
+
+class BatchInvasiveRequest(BaseModel):
+    """Invasive species analysis of many ecosystems at once"""
+    ecosystems: List[BatchInvasiveItem] = Field(min_length=1, max_length=MAX_BATCH_ECOSYSTEMS)
+
+class BatchTrajectoryRequest(BaseModel):
+    """Population trajectories of many ecosystems at once"""
+    ecosystems: List[EcosystemInput] = Field(min_length=1, max_length=MAX_BATCH_ECOSYSTEMS)
+    timeSteps: TimeSteps = 12
+    mode: Literal["iterative", "analytic", "lotka_volterra", "lotka_volterra_rk45"] = "iterative"
+    steps: TrajectorySteps = Field(default=None, max_length=10000)
+
+class BatchHealthRequest(BaseModel):
+    """Extinction risks of many ecosystems at once"""
+    ecosystems: List[EcosystemInput] = Field(min_length=1, max_length=MAX_BATCH_ECOSYSTEMS)
 
 class PredictionRequest(BaseModel):
     """Basic prediction request (original format)"""
     data: List[dict]
 
+# ============================================
+# SPECIES CATALOG
+# ============================================
+# Optional memory-mapped species library (service/species_catalog.py).
+# Requests can then send speciesColumns.catalogIds instead of records.
+
+SPECIES_CATALOG_PATH = env_str("ML_SPECIES_CATALOG", "")
+
+@functools.lru_cache(maxsize=1)
+def species_catalog():
+    """The mapped catalog, opened on first use (None if not available)"""
+    if not SPECIES_CATALOG_PATH:
+        return None
+    try:
+        from service.species_catalog import SpeciesCatalog
+        catalog = SpeciesCatalog(SPECIES_CATALOG_PATH)
+    except (ImportError, OSError, ValueError) as e:
+        print(f"⚠️ Species catalog not available: {e}")
+        return None
+    print(f"✅ Species catalog mapped: {len(catalog)} species")
+    return catalog
+
+# ============================================
+# SPECIES INPUT HELPERS
+# ============================================
+
+def species_records(species_list: Optional[List[SpeciesData]],
+                    columns: Optional[SpeciesColumns]) -> List[Dict]:
+    """Species as plain dicts (used by the fallback paths)"""
+    if columns is not None:
+        return columns.to_records()
+    return [s.dict() for s in species_list]
+
+def species_input(species_list: Optional[List[SpeciesData]],
+                  columns: Optional[SpeciesColumns]):
+    """Species for the model: columnar payloads are compiled directly"""
+    if columns is not None:
+        return CompiledEcosystem.from_columns(**columns.columns())
+    return [s.dict() for s in species_list]
+
 # ============================================
 # BASIC PREDICTION FALLBACK
 # ============================================
@@ -105,6 +701,192 @@ def basic_predict(species_list):
         "confidence": 0.85
     }
 
+# ============================================
+# MODEL EXECUTORS
+# ============================================
+# Model calls run in a thread or process pool so a slow request does not
+# block the event loop (and every other request on this worker).
+# ML_EXECUTOR sets the default pool; ML_EXECUTOR_OVERRIDES picks one per
+# endpoint, e.g. "trajectory=process,keystone=thread".
+# Sensitivity analysis defaults to the process pool (its chunks are
+# independent and CPU-bound; see service/parallel_samples.py).
+
+model_executors = ExecutorRegistry(
+    default_kind=env_choice("ML_EXECUTOR", "thread", EXECUTOR_KINDS),
+    max_workers=env_int("ML_EXECUTOR_WORKERS", os.cpu_count() or 4),
+    max_queue=env_int("ML_EXECUTOR_QUEUE", 64),
+    overrides={"sensitivity": "process", **parse_overrides(env_str("ML_EXECUTOR_OVERRIDES", ""))}
+)
+
+# ============================================
+# MICRO-BATCHING
+# ============================================
+# With ML_MICROBATCH_WINDOW_MS > 0, concurrent cascade / health requests
+# for small ecosystems are collected for that long (or until
+# ML_MICROBATCH_MAX_SIZE are waiting) and run as one vectorized call of
+# model/batch.py. Batch sizes and queue waits are on /metrics and
+# /api/models/status (service/micro_batch.py).
+
+micro_batches = MicroBatchRegistry(
+    window_seconds=env_float("ML_MICROBATCH_WINDOW_MS", 0.0) / 1000,
+    max_batch=env_int("ML_MICROBATCH_MAX_SIZE", 64),
+    max_species=env_int("ML_MICROBATCH_MAX_SPECIES", 64),
+    registry=metrics_registry if METRICS_ENABLED else None
+)
+
+async def run_cascade_batch(ensemble_size: Optional[int], items: List) -> List[Dict]:
+    """items: (species_data, target, seed) of each caller"""
+    ecosystems, targets, seeds = zip(*items)
+    return await model_executors.run(
+        "cascade", batch_cascade, list(ecosystems), list(targets), list(seeds), ensemble_size
+    )
+
+async def run_health_batch(items: List) -> List[List[Dict]]:
+    """items: (species_data, top_k, min_score) of each caller"""
+    risks = await model_executors.run("health", batch_risk, [item[0] for item in items])
+    # Same selection as calculate_extinction_risk(top_k, min_score)
+    return [
+        [r for r in species_risks if min_score is None or r['risk_score'] >= min_score][:top_k]
+        for species_risks, (_, top_k, min_score) in zip(risks, items)
+    ]
+
+@app.exception_handler(ExecutorBusy)
+async def executor_busy_handler(request: Request, exc: ExecutorBusy):
+    """Too much queued model work: ask the client to retry shortly"""
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Server busy, please retry"},
+        headers={"Retry-After": str(exc.retry_after)}
+    )
+
+@app.exception_handler(PopulationOverflow)
+async def population_overflow_handler(request: Request, exc: PopulationOverflow):
+    """The requested horizon grows populations past what a float holds"""
+    return JSONResponse(status_code=422, content={"detail": str(exc)})
+
+def _json_safe(value: Any) -> Any:
+    """Replace NaN/Infinity (which JSON cannot carry) by their string form"""
+    if isinstance(value, float) and not math.isfinite(value):
+        return str(value)
+    if isinstance(value, dict):
+        return {key: _json_safe(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_json_safe(item) for item in value]
+    return value
+
+@app.exception_handler(RequestValidationError)
+async def validation_error_handler(request: Request, exc: RequestValidationError):
+    """
+    FastAPI's usual 422 body, but safe to encode: a rejected NaN or
+    Infinity (Python's JSON parser accepts them) is echoed as a string
+    instead of failing the error response itself with a 500
+    """
+    detail = _json_safe(jsonable_encoder(exc.errors()))
+    return JSONResponse(status_code=422, content={"detail": detail})
+
+# ============================================
+# RESULT CACHE
+# ============================================
+# Identical requests (same species, target, strength, timeSteps...) are
+# answered from memory. Clients can send "Cache-Control: no-cache" to
+# force a fresh computation, or "no-store" to bypass the cache entirely.
+
+CACHE_ENABLED = env_flag("ML_CACHE_ENABLED", True)
+# Seed the model from the request hash so fresh and cached answers match
+CACHE_DETERMINISTIC = env_flag("ML_CACHE_DETERMINISTIC", True)
+
+result_cache = ResultCache(
+    max_entries=env_int("ML_CACHE_MAX_ENTRIES", 256),
+    max_bytes=env_int("ML_CACHE_MAX_BYTES", 64 * 1024 * 1024),
+    ttl_seconds=env_float("ML_CACHE_TTL_SECONDS", 300.0)
+)
+
+async def cached_result(endpoint: str, request: Any, http_request: Request,
+                        response: Response,
+                        compute: Callable[[Optional[int]], Awaitable[Any]]) -> Any:
+    """
+    Return await compute(seed) for this request, using the result cache
+    
+    `request` is the validated request model (or a dict identifying
+    the request). The outcome is reported in the X-Cache response
+    header (HIT, MISS or BYPASS).
+    """
+    payload = request.dict() if isinstance(request, BaseModel) else request
+    key = canonical_key(endpoint, payload)
+    seed = seed_from_key(key) if CACHE_DETERMINISTIC else None
+    
+    cache_control = http_request.headers.get("cache-control", "").lower()
+    no_store = "no-store" in cache_control
+    no_cache = no_store or "no-cache" in cache_control
+    
+    if not CACHE_ENABLED or no_store:
+        response.headers["X-Cache"] = "BYPASS"
+        return await compute(seed)
+    
+    if not no_cache:
+        hit, result = result_cache.get(key)
+        if hit:
+            response.headers["X-Cache"] = "HIT"
+            return result
+    
+    result = await compute(seed)
+    result_cache.put(key, result)
+    response.headers["X-Cache"] = "MISS" if not no_cache else "BYPASS"
+    return result
+
+# ============================================
+# TRAJECTORY CHECKPOINTS
+# ============================================
+# Every JSON trajectory returns a signed checkpoint token; sending it
+# back (or a startStep) continues the run (service/checkpoints.py).
+
+checkpoint_store = CheckpointStore(
+    secret=env_str("ML_CHECKPOINT_SECRET", "").encode("utf-8") or None,
+    max_entries=env_int("ML_CHECKPOINT_MAX_ENTRIES", 1024),
+    max_bytes=env_int("ML_CHECKPOINT_MAX_BYTES", 32 * 1024 * 1024)
+)
+
+@app.exception_handler(InvalidCheckpoint)
+async def invalid_checkpoint_handler(request: Request, exc: InvalidCheckpoint):
+    return JSONResponse(status_code=422, content={"detail": str(exc)})
+
+def resume_checkpoint(request: ResumableTrajectoryRequest, fingerprint: str,
+                      steps: Optional[List[int]]) -> Optional[Dict]:
+    """
+    Engine state to start the request from: its checkpoint token, or the
+    latest cached checkpoint before the first step it reports
+    """
+    if request.checkpoint is not None:
+        state = checkpoint_store.decode(request.checkpoint, fingerprint, request.mode)
+        if steps and min(steps) < state["step"]:
+            raise InvalidCheckpoint(
+                f"steps must not come before the checkpoint at step {state['step']}"
+            )
+        return state
+    if steps:
+        return checkpoint_store.latest(fingerprint, request.mode, min(steps))
+    return None
+
+def basic_trajectory(species_data, time_steps, steps=None):
+    """Fallback trajectory (random variation), one step at a time"""
+    if steps is not None:
+        report_steps = sorted(set(steps))
+    else:
+        report_steps = range(time_steps)
+    
+    for step in report_steps:
+        species_snapshot = {}
+        for s in species_data:
+            variation = random.uniform(0.95, 1.05)
+            species_snapshot[s['name']] = int(s['population'] * variation)
+        
+        yield {
+            'step': step,
+            'month': f'Month {step}',
+            'species_data': species_snapshot,
+            'ecosystem_health': random.randint(60, 85)
+        }
+
 # ============================================
 # HEALTH CHECK ENDPOINTS
 # ============================================
@@ -131,13 +913,49 @@ async def health():
 @app.get("/api/models/status")
 async def model_status():
     """Check which ML models are available"""
+    if not model_loader.loaded:
+        state = "⏳ Not loaded yet"
+    else:
+        state = "✅ Ready" if cascade_model_available else "⚠️ Fallback"
+    return {
+        "cascade_model": state,
+        "invasive_model": state,
+        "trajectory_model": state,
+        "risk_model": state,
+        "startup": {"lazy_imports": LAZY_IMPORTS, **model_loader.stats()},
+        "result_cache": result_cache.stats() if CACHE_ENABLED else "disabled",
+        "executors": model_executors.stats(),
+        "sessions": session_store.stats(),
+        "checkpoints": checkpoint_store.stats(),
+        "micro_batching": micro_batches.stats(),
+        "species_catalog": species_catalog().stats() if species_catalog() else "disabled"
+    }
+
+@app.get("/metrics")
+async def metrics():
+    """Prometheus metrics (text exposition format)"""
+    if not METRICS_ENABLED:
+        raise HTTPException(status_code=404, detail="Metrics are disabled")
+    return Response(
+        content=metrics_registry.render(),
+        media_type=MetricsRegistry.CONTENT_TYPE
+    )
+
+@app.get("/api/cache/stats")
+async def cache_stats():
+    """Result cache hit/miss counters and memory use"""
     return {
-        "cascade_model": "✅ Ready" if cascade_model_available else "⚠️ Fallback",
-        "invasive_model": "✅ Ready" if cascade_model_available else "⚠️ Fallback",
-        "trajectory_model": "✅ Ready" if cascade_model_available else "⚠️ Fallback",
-        "risk_model": "✅ Ready" if cascade_model_available else "⚠️ Fallback"
+        "enabled": CACHE_ENABLED,
+        "deterministic": CACHE_DETERMINISTIC,
+        **result_cache.stats()
     }
 
+@app.delete("/api/cache")
+async def clear_cache():
+    """Drop every cached result"""
+    result_cache.clear()
+    return {"success": True}
+
 # ============================================
 # BASIC PREDICTION ENDPOINT
 # ============================================
@@ -158,7 +976,8 @@ async def predict(input_data: PredictionRequest):
 # ============================================
 
 @app.post("/api/analyze/cascade")
-async def analyze_cascade_endpoint(request: CascadeAnalysisRequest):
+async def analyze_cascade_endpoint(request: CascadeAnalysisRequest,
+                                   http_request: Request, response: Response):
     """
     Analyze cascade effects when a species is removed
     
@@ -167,7 +986,7 @@ async def analyze_cascade_endpoint(request: CascadeAnalysisRequest):
     try:
         if not cascade_model_available:
             # Simple fallback cascade analysis
-            species_data = [s.dict() for s in request.speciesArray]
+            species_data = species_records(request.speciesArray, request.speciesColumns)
             target = request.targetSpecies.dict()
             
             # Calculate simple cascade effect
@@ -198,9 +1017,23 @@ async def analyze_cascade_endpoint(request: CascadeAnalysisRequest):
             }
         
         # Use ML model if available
-        species_data = [s.dict() for s in request.speciesArray]
-        target = request.targetSpecies.dict()
-        result = analyze_cascade(species_data, target)
+        async def compute(seed):
+            species_data = species_input(request.speciesArray, request.speciesColumns)
+            target = request.targetSpecies.dict()
+            if request.seed is not None:
+                seed = request.seed
+            food_web = dict(request.foodWeb) if request.foodWeb is not None else None
+            if food_web is None and micro_batches.accepts(species_data):
+                return await micro_batches.submit(
+                    f"cascade:{request.ensembleSize}", (species_data, target, seed),
+                    functools.partial(run_cascade_batch, request.ensembleSize)
+                )
+            return await model_executors.run(
+                "cascade", analyze_cascade, species_data, target, seed,
+                request.ensembleSize, food_web
+            )
+        
+        result = await cached_result("cascade", request, http_request, response, compute)
         
         return {
             "success": True,
@@ -209,23 +1042,84 @@ async def analyze_cascade_endpoint(request: CascadeAnalysisRequest):
             "source": "ml_model"
         }
     
+    except ExecutorBusy:
+        raise
     except Exception as e:
         print(f"Error in cascade analysis: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+# ============================================
+# KEYSTONE SWEEP ENDPOINT
+# ============================================
+
+@app.post("/api/analyze/keystone")
+async def analyze_keystone_endpoint(request: KeystoneSweepRequest,
+                                    http_request: Request, response: Response):
+    """
+    Predict the removal of every species at once and rank them
+    by how much their loss would hurt the ecosystem
+    """
+    try:
+        if not cascade_model_available:
+            # Simple fallback: every other species is affected
+            species_data = species_records(request.speciesArray, request.speciesColumns)
+            num_others = max(0, len(species_data) - 1)
+            
+            ranking = []
+            for rank, s in enumerate(species_data, start=1):
+                ranking.append({
+                    'rank': rank,
+                    'target_species': s['name'],
+                    'icon': s.get('icon', '🔹'),
+                    'ecosystem_health_change': -min(100, num_others),
+                    'extinctions_predicted': 0,
+                    'num_species_affected': num_others
+                })
+            
+            return {
+                "success": True,
+                "data": {
+                    "keystone_ranking": ranking,
+                    "num_species": len(species_data)
+                },
+                "model_version": "1.0",
+                "source": "fallback"
+            }
+        
+        # Use ML model if available
+        async def compute(seed):
+            species_data = species_input(request.speciesArray, request.speciesColumns)
+            return await model_executors.run("keystone", analyze_keystones, species_data)
+        
+        result = await cached_result("keystone", request, http_request, response, compute)
+        
+        return {
+            "success": True,
+            "data": result,
+            "model_version": "1.0",
+            "source": "ml_model"
+        }
+    
+    except ExecutorBusy:
+        raise
+    except Exception as e:
+        print(f"Error in keystone sweep: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
 # ============================================
 # INVASIVE SPECIES ENDPOINT
 # ============================================
 
 @app.post("/api/analyze/invasive")
-async def analyze_invasive_endpoint(request: InvasiveSpeciesRequest):
+async def analyze_invasive_endpoint(request: InvasiveSpeciesRequest,
+                                    http_request: Request, response: Response):
     """
     Analyze impact of invasive species on ecosystem
     """
     try:
         if not cascade_model_available:
             # Simple fallback invasive analysis
-            species_data = [s.dict() for s in request.currentSpecies]
+            species_data = species_records(request.currentSpecies, request.speciesColumns)
             invasive = request.invasiveSpecies.dict()
             
             affected = []
@@ -254,9 +1148,14 @@ async def analyze_invasive_endpoint(request: InvasiveSpeciesRequest):
             }
         
         # Use ML model if available
-        species_data = [s.dict() for s in request.currentSpecies]
-        invasive = request.invasiveSpecies.dict()
-        result = analyze_invasive(species_data, invasive, request.invasionStrength)
+        async def compute(seed):
+            species_data = species_input(request.currentSpecies, request.speciesColumns)
+            invasive = request.invasiveSpecies.dict()
+            return await model_executors.run(
+                "invasive", analyze_invasive, species_data, invasive, request.invasionStrength
+            )
+        
+        result = await cached_result("invasive", request, http_request, response, compute)
         
         return {
             "success": True,
@@ -265,77 +1164,379 @@ async def analyze_invasive_endpoint(request: InvasiveSpeciesRequest):
             "source": "ml_model"
         }
     
+    except ExecutorBusy:
+        raise
     except Exception as e:
         print(f"Error in invasive analysis: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+# ============================================
+# INVASIVE SWEEP ENDPOINT
+# ============================================
+
+@app.post("/api/analyze/invasive/sweep")
+async def analyze_invasive_sweep_endpoint(request: InvasiveSweepRequest,
+                                          http_request: Request, response: Response):
+    """
+    Compare many candidate invasives at every invasion strength
+    (one call instead of candidates x strengths /api/analyze/invasive calls)
+    """
+    strengths = request.strengths or list(range(1, 11))
+    try:
+        if not cascade_model_available:
+            # Simple fallback: no effect predicted for any candidate
+            species_data = species_records(request.currentSpecies, request.speciesColumns)
+            names = [s['name'] for s in species_data]
+            candidates = [c.name for c in request.candidates]
+            
+            return {
+                "success": True,
+                "data": {
+                    "candidates": candidates,
+                    "strengths": strengths,
+                    "species": names,
+                    "population_change": [[[0] * len(names) for _ in strengths] for _ in candidates],
+                    "impact_types": [[None] * len(names) for _ in candidates],
+                    "total_impact": [[0] * len(strengths) for _ in candidates],
+                    "outcome_prediction": [["ECOSYSTEM_CHANGE"] * len(strengths) for _ in candidates],
+                    "num_affected": [0] * len(candidates)
+                },
+                "model_version": "1.0",
+                "source": "fallback"
+            }
+        
+        # Use ML model if available
+        async def compute(seed):
+            species_data = species_input(request.currentSpecies, request.speciesColumns)
+            candidates = [c.dict() for c in request.candidates]
+            return await model_executors.run(
+                "invasive", analyze_invasive_sweep, species_data, candidates, strengths
+            )
+        
+        result = await cached_result("invasive_sweep", request, http_request, response, compute)
+        
+        return {
+            "success": True,
+            "data": result,
+            "model_version": "1.0",
+            "source": "ml_model"
+        }
+    
+    except ExecutorBusy:
+        raise
+    except Exception as e:
+        print(f"Error in invasive sweep: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+# ============================================
+# SENSITIVITY ANALYSIS ENDPOINT
+# ============================================
+
+def sensitivity_chunks(num_samples: int, workers: int) -> List[Tuple[int, int]]:
+    """(start, stop) sample ranges: one per worker, none below the minimum size"""
+    count = max(1, min(workers, num_samples // max(1, SENSITIVITY_MIN_CHUNK)))
+    edges = [num_samples * index // count for index in range(count + 1)]
+    return list(zip(edges[:-1], edges[1:]))
+
+@app.post("/api/analyze/sensitivity")
+async def analyze_sensitivity_endpoint(request: SensitivityRequest,
+                                       http_request: Request, response: Response):
+    """
+    How much each Lotka-Volterra constant drives the trajectory outputs
+    (first-order indices from Latin hypercube samples, evaluated in
+    parallel chunks; see model/sensitivity.py)
+    """
+    if not cascade_model_available:
+        raise HTTPException(status_code=503, detail="Sensitivity analysis needs the ML model")
+    try:
+        ranges = parameter_bounds(request.spread, request.bounds, request.parameters)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    
+    try:
+        async def compute(seed):
+            if request.seed is not None:
+                seed = request.seed
+            eco = compile_ecosystem(species_input(request.species, request.speciesColumns))
+            unit = latin_hypercube(request.samples, len(ranges), seed)
+            values = scale_samples(unit, ranges)
+            
+            executor = model_executors.for_endpoint("sensitivity")
+            calls = [
+                (start, (eco, {name: column[start:stop] for name, column in values.items()},
+                         request.timeSteps))
+                for start, stop in sensitivity_chunks(request.samples, executor.max_workers)
+            ]
+            outputs = await gather_rows(
+                executor, evaluate_samples, calls,
+                (request.samples, len(output_names(eco.names)))
+            )
+            return sensitivity_report(eco.names, ranges, unit, outputs, request.bins)
+        
+        result = await cached_result("sensitivity", request, http_request, response, compute)
+        
+        return {
+            "success": True,
+            "data": result,
+            "model_version": "1.0",
+            "source": "ml_model"
+        }
+    
+    except (ExecutorBusy, PopulationOverflow):
+        raise
+    except Exception as e:
+        print(f"Error in sensitivity analysis: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
 # ============================================
 # POPULATION TRAJECTORY ENDPOINT
 # ============================================
 
 @app.post("/api/predict/trajectory")
-async def predict_trajectory_endpoint(request: PopulationTrajectoryRequest):
+async def predict_trajectory_endpoint(request: ResumableTrajectoryRequest,
+                                      http_request: Request, response: Response):
     """
     Predict population trajectory over time
+    
+    Clients can ask for a compact table (names once, populations as a
+    steps x species matrix) with the Accept header, see
+    service/trajectory_format.py.
+    
+    The response carries a checkpoint of the last step; pass it back as
+    `checkpoint` (or pass `startStep`) to continue the run from there.
     """
+    table_format = negotiate_format(http_request.headers.get("accept", ""))
+    if table_format is not None:
+        if request.checkpoint is not None or request.startStep is not None:
+            raise HTTPException(
+                status_code=406, detail="Checkpoints are only available with JSON responses"
+            )
+        return await trajectory_table_response(table_format, request, http_request)
+    
     try:
         if not cascade_model_available:
-            # Simple fallback trajectory
-            species_data = [s.dict() for s in request.species]
-            timeline = []
-            
-            for step in range(request.timeSteps):
-                species_snapshot = {}
-                for s in species_data:
-                    variation = random.uniform(0.95, 1.05)
-                    species_snapshot[s['name']] = int(s['population'] * variation)
-                
-                timeline.append({
-                    'step': step,
-                    'month': f'Month {step}',
-                    'species_data': species_snapshot,
-                    'ecosystem_health': random.randint(60, 85)
-                })
+            # Simple fallback trajectory (no state to continue from)
+            species_data = species_records(request.species, request.speciesColumns)
+            timeline = list(basic_trajectory(
+                species_data, request.timeSteps, request.report_steps()
+            ))
             
             return {
                 "success": True,
                 "data": {
-                    "timeline": timeline
+                    "timeline": timeline,
+                    "checkpoint": None
                 },
                 "model_version": "1.0",
                 "source": "fallback"
             }
         
         # Use ML model if available
-        species_data = [s.dict() for s in request.species]
-        trajectory = predict_populations(species_data, request.timeSteps)
+        async def compute(seed):
+            eco = compile_ecosystem(species_input(request.species, request.speciesColumns))
+            fingerprint = eco.fingerprint()
+            steps = request.report_steps()
+            start = resume_checkpoint(request, fingerprint, steps)
+            result = await model_executors.run(
+                "trajectory", predict_populations_checkpointed,
+                eco, request.timeSteps, request.mode, steps, start
+            )
+            state = result["checkpoint"]
+            checkpoint_store.put(fingerprint, request.mode, state)
+            return {
+                "timeline": result["timeline"],
+                "checkpoint": {
+                    "step": state["step"],
+                    "token": checkpoint_store.encode(fingerprint, request.mode, state)
+                }
+            }
+        
+        trajectory = await cached_result("trajectory", request, http_request, response, compute)
         
         return {
             "success": True,
-            "data": {
-                "timeline": trajectory
-            },
+            "data": trajectory,
             "model_version": "1.0",
             "source": "ml_model"
         }
     
+    except (ExecutorBusy, PopulationOverflow, InvalidCheckpoint):
+        raise
     except Exception as e:
         print(f"Error in trajectory prediction: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+async def trajectory_table_response(table_format: str,
+                                    request: PopulationTrajectoryRequest,
+                                    http_request: Request) -> Response:
+    """
+    Trajectory encoded in one of the compact table formats
+    """
+    # Collects the X-Cache header from cached_result
+    cache_info = Response()
+    try:
+        if not cascade_model_available:
+            species_data = species_records(request.species, request.speciesColumns)
+            table = table_from_timeline(
+                basic_trajectory(species_data, request.timeSteps, request.steps)
+            )
+            source = "fallback"
+        else:
+            async def compute(seed):
+                species_data = species_input(request.species, request.speciesColumns)
+                return await model_executors.run(
+                    "trajectory", predict_population_table,
+                    species_data, request.timeSteps, request.mode, request.steps
+                )
+            
+            table = await cached_result(
+                "trajectory_table", request, http_request, cache_info, compute
+            )
+            source = "ml_model"
+        
+        body = encode_table(table_format, table, source, "1.0")
+    
+    except (ExecutorBusy, PopulationOverflow):
+        raise
+    except Exception as e:
+        print(f"Error in trajectory prediction: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+    
+    headers = {"X-Model-Source": source, "X-Model-Version": "1.0", "Vary": "Accept"}
+    if "x-cache" in cache_info.headers:
+        headers["X-Cache"] = cache_info.headers["x-cache"]
+    return Response(content=body, media_type=CONTENT_TYPES[table_format], headers=headers)
+
+@app.post("/api/predict/trajectory/health")
+async def trajectory_health_endpoint(request: PopulationTrajectoryRequest,
+                                     http_request: Request, response: Response):
+    """
+    Health curves of the trajectory: per step health score, Shannon and
+    Simpson diversity, stability and trophic-level biomass ratios
+    (model/health_metrics.py)
+    """
+    try:
+        if not cascade_model_available:
+            # The fallback trajectory only has the health score
+            species_data = species_records(request.species, request.speciesColumns)
+            timeline = list(basic_trajectory(species_data, request.timeSteps, request.steps))
+            return {
+                "success": True,
+                "data": {
+                    "steps": [entry["step"] for entry in timeline],
+                    "ecosystem_health": [entry["ecosystem_health"] for entry in timeline]
+                },
+                "model_version": "1.0",
+                "source": "fallback"
+            }
+        
+        async def compute(seed):
+            species_data = species_input(request.species, request.speciesColumns)
+            return await model_executors.run(
+                "trajectory", predict_health_curves,
+                species_data, request.timeSteps, request.mode, request.steps
+            )
+        
+        curves = await cached_result("trajectory_health", request, http_request, response, compute)
+        
+        return {
+            "success": True,
+            "data": curves,
+            "model_version": "1.0",
+            "source": "ml_model"
+        }
+    
+    except (ExecutorBusy, PopulationOverflow):
+        raise
+    except Exception as e:
+        print(f"Error in trajectory health: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/api/predict/trajectory/stream")
+async def stream_trajectory_endpoint(request: TrajectoryStreamRequest,
+                                     http_request: Request,
+                                     format: Optional[Literal["ndjson", "sse"]] = None):
+    """
+    Stream the population trajectory while it is being computed
+    
+    Each step is sent as soon as it is simulated, either as
+    newline-delimited JSON (default) or as Server-Sent Events
+    (format=sse or "Accept: text/event-stream"). The final message
+    is {"done": true, "steps": <count>}, or {"error": ..., "steps": <count>}
+    (SSE event "error") if the simulation fails part-way.
+    """
+    accept = http_request.headers.get("accept", "")
+    use_sse = format == "sse" or (format is None and "text/event-stream" in accept)
+    executor = model_executors.for_generator("trajectory")
+    
+    def encode(message: Dict, event: str) -> str:
+        body = json.dumps(message, ensure_ascii=False)
+        if use_sse:
+            return f"event: {event}\ndata: {body}\n\n"
+        return body + "\n"
+    
+    try:
+        if cascade_model_available:
+            species_data = species_input(request.species, request.speciesColumns)
+            timeline = stream_populations(
+                species_data, request.timeSteps, request.mode, request.steps
+            )
+            source = "ml_model"
+        else:
+            species_data = species_records(request.species, request.speciesColumns)
+            timeline = basic_trajectory(species_data, request.timeSteps, request.steps)
+            source = "fallback"
+        
+        def next_chunk() -> List[Dict]:
+            return list(itertools.islice(timeline, request.chunkSize))
+        
+        # Pull the first chunk before answering, so a busy executor or a
+        # failing model still gets a proper status code
+        first = await executor.run(next_chunk)
+    except (ExecutorBusy, PopulationOverflow):
+        raise
+    except Exception as e:
+        print(f"Error in trajectory stream: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+    
+    async def messages():
+        # Every chunk is simulated on the model executor, so the stream
+        # counts against the same bound as the other endpoints
+        count = 0
+        chunk = first
+        try:
+            while chunk:
+                count += len(chunk)
+                yield "".join(encode(entry, "step") for entry in chunk)
+                if len(chunk) < request.chunkSize:
+                    break
+                chunk = await executor.run(next_chunk)
+        except Exception as e:
+            print(f"Error in trajectory stream after {count} steps: {e}")
+            yield encode({"error": str(e), "steps": count}, "error")
+            return
+        yield encode({"done": True, "steps": count}, "done")
+    
+    return StreamingResponse(
+        messages(),
+        media_type="text/event-stream" if use_sse else "application/x-ndjson",
+        headers={"X-Model-Source": source, "Cache-Control": "no-cache"}
+    )
+
 # ============================================
 # ECOSYSTEM HEALTH ENDPOINT
 # ============================================
 
 @app.post("/api/ecosystem/health")
-async def ecosystem_health_endpoint(request: EcosystemHealthRequest):
+async def ecosystem_health_endpoint(request: EcosystemHealthRequest,
+                                    http_request: Request, response: Response):
     """
     Assess extinction risks for all species
     """
     try:
         if not cascade_model_available:
             # Simple fallback health assessment
-            species_data = [s.dict() for s in request.species]
+            species_data = species_records(request.species, request.speciesColumns)
             
             risks = []
             for s in species_data:
@@ -358,6 +1559,11 @@ async def ecosystem_health_endpoint(request: EcosystemHealthRequest):
                     ]
                 })
             
+            if request.minScore is not None:
+                risks = [r for r in risks if r['risk_score'] >= request.minScore]
+            if request.topK is not None:
+                risks = sorted(risks, key=lambda r: r['risk_score'], reverse=True)[:request.topK]
+            
             return {
                 "success": True,
                 "data": {
@@ -368,8 +1574,17 @@ async def ecosystem_health_endpoint(request: EcosystemHealthRequest):
             }
         
         # Use ML model if available
-        species_data = [s.dict() for s in request.species]
-        risks = assess_extinction_risks(species_data)
+        async def compute(seed):
+            species_data = species_input(request.species, request.speciesColumns)
+            if micro_batches.accepts(species_data):
+                return await micro_batches.submit(
+                    "health", (species_data, request.topK, request.minScore), run_health_batch
+                )
+            return await model_executors.run(
+                "health", assess_extinction_risks, species_data, request.topK, request.minScore
+            )
+        
+        risks = await cached_result("health", request, http_request, response, compute)
         
         return {
             "success": True,
@@ -380,10 +1595,459 @@ async def ecosystem_health_endpoint(request: EcosystemHealthRequest):
             "source": "ml_model"
         }
     
+    except ExecutorBusy:
+        raise
     except Exception as e:
         print(f"Error in health assessment: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+# ============================================
+# BATCH ENDPOINTS
+# ============================================
+# Many ecosystems per request (e.g. a whole classroom of pyramids). The
+# species of all ecosystems are packed into one set of columns and
+# analysed together (model/batch.py); results come back in request
+# order, one per ecosystem, exactly as the single endpoints would give.
+
+def require_batch_model():
+    """Batches are evaluated by the ML model only (no fallback)"""
+    if not cascade_model_available:
+        raise HTTPException(status_code=503, detail="Batch analysis needs the ML model")
+
+def batch_inputs(items: List[EcosystemInput]) -> List:
+    return [species_input(item.species, item.speciesColumns) for item in items]
+
+def batch_response(results: List) -> Dict:
+    return {
+        "success": True,
+        "data": {"results": results, "num_ecosystems": len(results)},
+        "model_version": "1.0",
+        "source": "ml_model"
+    }
+
+@app.post("/api/batch/cascade")
+async def batch_cascade_endpoint(request: BatchCascadeRequest,
+                                 http_request: Request, response: Response):
+    """
+    Cascade analysis for every (ecosystem, target) pair
+
+    Ecosystem i uses its own seed, else (seed + i), so each result is
+    the one /api/analyze/cascade gives with that seed.
+    """
+    require_batch_model()
+    try:
+        async def compute(seed):
+            if request.seed is not None:
+                seed = request.seed
+            seeds = [
+                item.seed if item.seed is not None
+                else (seed + index) % 2**32 if seed is not None else None
+                for index, item in enumerate(request.ecosystems)
+            ]
+            targets = [item.targetSpecies.dict() for item in request.ecosystems]
+            return await model_executors.run(
+                "batch", batch_cascade, batch_inputs(request.ecosystems),
+                targets, seeds, request.ensembleSize
+            )
+        
+        results = await cached_result("batch_cascade", request, http_request, response, compute)
+        return batch_response(results)
+    
+    except ExecutorBusy:
+        raise
+    except Exception as e:
+        print(f"Error in batch cascade analysis: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/api/batch/invasive")
+async def batch_invasive_endpoint(request: BatchInvasiveRequest,
+                                  http_request: Request, response: Response):
+    """Invasive species analysis for every ecosystem"""
+    require_batch_model()
+    try:
+        async def compute(seed):
+            invasives = [item.invasiveSpecies.dict() for item in request.ecosystems]
+            strengths = [item.invasionStrength for item in request.ecosystems]
+            return await model_executors.run(
+                "batch", batch_invasive, batch_inputs(request.ecosystems), invasives, strengths
+            )
+        
+        results = await cached_result("batch_invasive", request, http_request, response, compute)
+        return batch_response(results)
+    
+    except ExecutorBusy:
+        raise
+    except Exception as e:
+        print(f"Error in batch invasive analysis: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/api/batch/trajectory")
+async def batch_trajectory_endpoint(request: BatchTrajectoryRequest,
+                                    http_request: Request, response: Response):
+    """
+    Population trajectory (timeline) of every ecosystem
+
+    The logistic modes advance all ecosystems as one vector; the
+    Lotka-Volterra modes are integrated ecosystem by ecosystem.
+    """
+    require_batch_model()
+    try:
+        async def compute(seed):
+            return await model_executors.run(
+                "batch", batch_trajectory, batch_inputs(request.ecosystems),
+                request.timeSteps, request.mode, request.steps
+            )
+        
+        timelines = await cached_result("batch_trajectory", request, http_request, response, compute)
+        return batch_response([{"timeline": timeline} for timeline in timelines])
+    
+    except (ExecutorBusy, PopulationOverflow):
+        raise
+    except Exception as e:
+        print(f"Error in batch trajectory: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/api/batch/trajectory/health")
+async def batch_trajectory_health_endpoint(request: BatchTrajectoryRequest,
+                                           http_request: Request, response: Response):
+    """Health curves of every ecosystem's trajectory, all reduced together"""
+    require_batch_model()
+    try:
+        async def compute(seed):
+            return await model_executors.run(
+                "batch", batch_health_curves, batch_inputs(request.ecosystems),
+                request.timeSteps, request.mode, request.steps
+            )
+        
+        curves = await cached_result(
+            "batch_trajectory_health", request, http_request, response, compute
+        )
+        return batch_response(curves)
+    
+    except (ExecutorBusy, PopulationOverflow):
+        raise
+    except Exception as e:
+        print(f"Error in batch trajectory health: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/api/batch/health")
+async def batch_health_endpoint(request: BatchHealthRequest,
+                                http_request: Request, response: Response):
+    """Extinction risks of every ecosystem, scored in one pass"""
+    require_batch_model()
+    try:
+        async def compute(seed):
+            return await model_executors.run("batch", batch_risk, batch_inputs(request.ecosystems))
+        
+        risks = await cached_result("batch_health", request, http_request, response, compute)
+        return batch_response([{"species_risks": species_risks} for species_risks in risks])
+    
+    except ExecutorBusy:
+        raise
+    except Exception as e:
+        print(f"Error in batch health assessment: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+# ============================================
+# ECOSYSTEM SESSIONS
+# ============================================
+# Create an ecosystem once, then send add/remove/update deltas instead
+# of the whole species list. Health, level totals and risk scores are
+# kept up to date per change (model/incremental.py). Idle sessions
+# expire; the least recently used are evicted above the memory cap.
+
+session_store = SessionStore(
+    max_sessions=env_int("ML_SESSION_MAX", 256),
+    max_bytes=env_int("ML_SESSION_MAX_BYTES", 256 * 1024 * 1024),
+    idle_seconds=env_float("ML_SESSION_IDLE_SECONDS", 1800.0)
+)
+
+@app.exception_handler(SessionNotFound)
+async def session_not_found_handler(request: Request, exc: SessionNotFound):
+    return JSONResponse(status_code=404, content={"detail": "Session not found or expired"})
+
+@app.exception_handler(SessionTooLarge)
+async def session_too_large_handler(request: Request, exc: SessionTooLarge):
+    return JSONResponse(status_code=413, content={"detail": str(exc)})
+
+def require_session_model():
+    """Sessions are built on the ML model (no fallback)"""
+    if not cascade_model_available:
+        raise HTTPException(status_code=503, detail="Sessions need the ML model")
+
+async def session_ecosystem(session: Any, version: int, records: List[Dict]) -> Any:
+    """
+    CompiledEcosystem of a session snapshot (session.snapshot()),
+    compiled on the executor: the O(N) rebuild stays off the event loop,
+    and deltas applied meanwhile do not reach the snapshot
+    """
+    compiled = session.compiled_for(version)
+    if compiled is None:
+        compiled = await model_executors.run("session", compile_records, records)
+        session.store_compiled(version, compiled)
+    return compiled
+
+def session_response(session_id: str, data: Dict) -> Dict:
+    return {
+        "success": True,
+        "session_id": session_id,
+        "data": data,
+        "model_version": "1.0",
+        "source": "ml_model"
+    }
+
+@app.post("/api/sessions")
+async def create_session(request: SessionCreateRequest):
+    """
+    Start a session from a species list; returns its id and the ids
+    of the species (for later remove/update deltas)
+    """
+    require_session_model()
+    session = await model_executors.run(
+        "session", IncrementalEcosystem, species_records(request.species, request.speciesColumns)
+    )
+    session_id = session_store.create(session)
+    return session_response(session_id, {"ids": session.ids(), "summary": session.summary()})
+
+@app.get("/api/sessions/stats")
+async def session_stats():
+    """Number of sessions, memory use and eviction counters"""
+    return session_store.stats()
+
+@app.get("/api/sessions/{session_id}")
+async def get_session(session_id: str):
+    """Health, per-level totals and risk counts (no full pass)"""
+    require_session_model()
+    session = session_store.get(session_id)
+    return session_response(session_id, {"summary": session.summary()})
+
+@app.get("/api/sessions/{session_id}/species")
+async def get_session_species(session_id: str):
+    """Current species with their ids"""
+    require_session_model()
+    session = session_store.get(session_id)
+    return session_response(session_id, {"species": session.species()})
+
+@app.post("/api/sessions/{session_id}/deltas")
+async def apply_session_deltas(session_id: str, request: SessionDeltaRequest):
+    """
+    Apply add/remove/update changes in order
+
+    Every id is checked before anything changes, so a bad delta
+    leaves the session untouched.
+    """
+    require_session_model()
+    session = session_store.get(session_id)
+    
+    # Ids that exist at each point of the batch (adds get sequential ids)
+    known = set(session.ids())
+    next_id = session.next_id
+    for position, delta in enumerate(request.deltas):
+        if delta.op == "add":
+            known.add(next_id)
+            next_id += 1
+        elif delta.id not in known:
+            raise HTTPException(
+                status_code=422,
+                detail=f"deltas[{position}]: unknown species id {delta.id}"
+            )
+        elif delta.op == "remove":
+            known.discard(delta.id)
+    
+    added_ids = []
+    for delta in request.deltas:
+        if delta.op == "add":
+            added_ids.append(session.add(delta.species.dict()))
+        elif delta.op == "remove":
+            session.remove(delta.id)
+        else:
+            session.update(delta.id, delta.changes.dict())
+    
+    session_store.resize(session_id)
+    return session_response(session_id, {
+        "applied": len(request.deltas),
+        "added_ids": added_ids,
+        "summary": session.summary()
+    })
+
+@app.get("/api/sessions/{session_id}/risks")
+async def get_session_risks(session_id: str):
+    """Extinction risks from the kept per-species scores"""
+    require_session_model()
+    session = session_store.get(session_id)
+    return session_response(session_id, {"species_risks": session.risks()})
+
+@app.post("/api/sessions/{session_id}/cascade")
+async def session_cascade(session_id: str, request: SessionCascadeRequest,
+                          http_request: Request, response: Response):
+    """Cascade analysis of the session ecosystem"""
+    require_session_model()
+    session = session_store.get(session_id)
+    version, records = session.snapshot()
+    
+    try:
+        async def compute(seed):
+            if request.seed is not None:
+                seed = request.seed
+            eco = await session_ecosystem(session, version, records)
+            return await model_executors.run(
+                "cascade", analyze_cascade, eco,
+                request.targetSpecies.dict(), seed, request.ensembleSize
+            )
+        
+        key = {"session": session_id, "version": version, "request": request.dict()}
+        result = await cached_result("session_cascade", key, http_request, response, compute)
+        return session_response(session_id, result)
+    
+    except ExecutorBusy:
+        raise
+    except Exception as e:
+        print(f"Error in session cascade analysis: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/api/sessions/{session_id}/trajectory")
+async def session_trajectory(session_id: str, request: SessionTrajectoryRequest,
+                             http_request: Request, response: Response):
+    """Population trajectory of the session ecosystem"""
+    require_session_model()
+    session = session_store.get(session_id)
+    version, records = session.snapshot()
+    
+    try:
+        async def compute(seed):
+            eco = await session_ecosystem(session, version, records)
+            return await model_executors.run(
+                "trajectory", predict_populations, eco,
+                request.timeSteps, request.mode, request.steps
+            )
+        
+        key = {"session": session_id, "version": version, "request": request.dict()}
+        timeline = await cached_result("session_trajectory", key, http_request, response, compute)
+        return session_response(session_id, {"timeline": timeline})
+    
+    except (ExecutorBusy, PopulationOverflow):
+        raise
+    except Exception as e:
+        print(f"Error in session trajectory: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.delete("/api/sessions/{session_id}")
+async def delete_session(session_id: str):
+    """End a session and free its memory"""
+    session_store.delete(session_id)
+    return {"success": True}
+
+# ============================================
+# BACKGROUND JOBS
+# ============================================
+# Long simulations can run as jobs instead of inside one request:
+# submit, then poll / long-poll GET /api/jobs/{id}, or DELETE it to
+# cancel (trajectories stop between steps). The queue is bounded and
+# answers 429 + Retry-After when full (service/jobs.py).
+
+MAX_JOB_WAIT_SECONDS = env_float("ML_JOB_MAX_WAIT_SECONDS", 30.0)
+
+job_manager = JobManager(
+    max_workers=env_int("ML_JOB_WORKERS", 2),
+    max_queue=env_int("ML_JOB_QUEUE", 16),
+    keep_seconds=env_float("ML_JOB_KEEP_SECONDS", 600.0),
+    max_finished=env_int("ML_JOB_MAX_FINISHED", 256)
+)
+
+@app.exception_handler(JobNotFound)
+async def job_not_found_handler(request: Request, exc: JobNotFound):
+    return JSONResponse(status_code=404, content={"detail": "Job not found or expired"})
+
+@app.exception_handler(JobQueueFull)
+async def job_queue_full_handler(request: Request, exc: JobQueueFull):
+    """Every job slot is taken: ask the client to come back later"""
+    return JSONResponse(
+        status_code=429,
+        content={"detail": str(exc)},
+        headers={"Retry-After": str(exc.retry_after)}
+    )
+
+def job_response(job, response: Response = None, status_code: int = None) -> Dict:
+    if response is not None and status_code is not None:
+        response.status_code = status_code
+        response.headers["Location"] = f"/api/jobs/{job.id}"
+    return {"success": True, "data": job.to_dict()}
+
+def trajectory_job(request: PopulationTrajectoryRequest):
+    """Job function: the trajectory one step at a time, cancellable between steps"""
+    def run(job):
+        if cascade_model_available:
+            species_data = species_input(request.species, request.speciesColumns)
+            timeline = stream_populations(
+                species_data, request.timeSteps, request.mode, request.steps
+            )
+            source = "ml_model"
+        else:
+            species_data = species_records(request.species, request.speciesColumns)
+            timeline = basic_trajectory(species_data, request.timeSteps, request.steps)
+            source = "fallback"
+        
+        total = len(set(request.steps)) if request.steps is not None else request.timeSteps
+        entries = []
+        job.report(0, total)
+        for entry in timeline:
+            job.check_cancelled()
+            entries.append(entry)
+            job.report(len(entries))
+        return {"timeline": entries, "source": source}
+    return run
+
+def cascade_job(request: CascadeAnalysisRequest):
+    """Job function: one cascade analysis (cancellable until it starts)"""
+    # Same seed as /api/analyze/cascade, so both give the same answer
+    seed = request.seed
+    if seed is None and CACHE_DETERMINISTIC:
+        seed = seed_from_key(canonical_key("cascade", request.dict()))
+    
+    def run(job):
+        species_data = species_input(request.speciesArray, request.speciesColumns)
+        target = request.targetSpecies.dict()
+        food_web = dict(request.foodWeb) if request.foodWeb is not None else None
+        job.report(0, 1)
+        result = analyze_cascade(species_data, target, seed, request.ensembleSize, food_web)
+        job.report(1)
+        return result
+    return run
+
+@app.post("/api/jobs/trajectory", status_code=202)
+async def submit_trajectory_job(request: PopulationTrajectoryRequest, response: Response):
+    """Run a population trajectory in the background, returns the job"""
+    job = job_manager.submit("trajectory", trajectory_job(request))
+    return job_response(job, response, 202)
+
+@app.post("/api/jobs/cascade", status_code=202)
+async def submit_cascade_job(request: CascadeAnalysisRequest, response: Response):
+    """Run a cascade analysis in the background, returns the job"""
+    if not cascade_model_available:
+        raise HTTPException(status_code=503, detail="Cascade jobs need the ML model")
+    job = job_manager.submit("cascade", cascade_job(request))
+    return job_response(job, response, 202)
+
+@app.get("/api/jobs/stats")
+async def job_stats():
+    """Active jobs, queue bounds and completion counters"""
+    return job_manager.stats()
+
+@app.get("/api/jobs/{job_id}")
+async def get_job(job_id: str, wait: float = Query(default=0, ge=0)):
+    """
+    Status of a job, with its result once it succeeded. With wait=N the
+    request long-polls: it returns as soon as the job finishes, or after
+    N seconds (at most ML_JOB_MAX_WAIT_SECONDS)
+    """
+    job = await job_manager.wait(job_id, min(wait, MAX_JOB_WAIT_SECONDS))
+    return job_response(job)
+
+@app.delete("/api/jobs/{job_id}")
+async def cancel_job(job_id: str):
+    """Cancel a job (a running trajectory stops at its next step)"""
+    return job_response(job_manager.cancel(job_id))
+
 # ============================================
 # RUN SERVER
 # ============================================
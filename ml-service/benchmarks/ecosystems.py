@@ -0,0 +1,108 @@
+"""
+ecosystems.py
+
+BEGINNER GUIDE: Synthetic ecosystems for benchmarking
+
+The frontend ships five hand-made biomes (client/src/data/biomes.js),
+each with one species per trophic level. Benchmarks need the same kind
+of data at every scale, from those 4 species up to 100,000.
+
+We read the templates straight from biomes.js (so the numbers stay in
+sync with the app) and grow them into bigger ecosystems:
+
+    species i  = template species (i mod number of templates)
+    name       = "<template name> <i>"   (unique)
+    numbers    = template numbers x random factor in [0.5, 1.5)
+
+The random factor comes from a seeded generator, so every run (and
+every commit) benchmarks exactly the same ecosystem.
+"""
+
+import os
+import re
+import numpy as np
+from typing import Dict, List
+
+BIOMES_JS = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)),
+    '..', '..', 'client', 'src', 'data', 'biomes.js'
+)
+
+# One species object literal: { name: 'Grass', trophicLevel: 'producer', ... }
+_SPECIES_PATTERN = re.compile(r"\{\s*name:\s*'[^']*'[^{}]*\}")
+_FIELD_PATTERN = re.compile(r"(\w+):\s*(?:'([^']*)'|([-\d.eE]+))")
+
+NUMERIC_FIELDS = ('biomass', 'energy', 'population')
+
+
+def load_templates(path: str = BIOMES_JS) -> List[Dict]:
+    """
+    Parse every species of every biome template in biomes.js
+    """
+    with open(path, encoding='utf-8') as f:
+        source = f.read()
+
+    templates = []
+    for match in _SPECIES_PATTERN.finditer(source):
+        species = {}
+        for key, text, number in _FIELD_PATTERN.findall(match.group(0)):
+            species[key] = float(number) if number else text
+        templates.append(species)
+
+    if not templates:
+        raise ValueError(f"No species templates found in {path}")
+    return templates
+
+
+def make_ecosystem(num_species: int, templates: List[Dict] = None,
+                   seed: int = 0) -> List[Dict]:
+    """
+    Build a synthetic species list with `num_species` entries
+
+    The first len(templates) species are the templates themselves, so
+    num_species=4 is exactly the first biome.
+    """
+    if templates is None:
+        templates = load_templates()
+
+    rng = np.random.default_rng(seed)
+    factors = rng.uniform(0.5, 1.5, size=(num_species, len(NUMERIC_FIELDS)))
+
+    species_list = []
+    for i in range(num_species):
+        template = templates[i % len(templates)]
+        species = {
+            'name': template['name'] if i < len(templates) else f"{template['name']} {i}",
+            'icon': template.get('icon', '🔹'),
+            'trophicLevel': template['trophicLevel']
+        }
+        for j, field in enumerate(NUMERIC_FIELDS):
+            value = template[field] if i < len(templates) else template[field] * factors[i, j]
+            species[field] = round(float(value), 2)
+        species_list.append(species)
+
+    return species_list
+
+
+def to_columns(species_list: List[Dict]) -> Dict[str, List]:
+    """
+    The same ecosystem as a columnar payload (speciesColumns)
+    """
+    return {
+        'name': [s['name'] for s in species_list],
+        'trophicLevel': [s['trophicLevel'] for s in species_list],
+        'biomass': [s['biomass'] for s in species_list],
+        'energy': [s['energy'] for s in species_list],
+        'population': [s['population'] for s in species_list],
+        'icon': [s['icon'] for s in species_list]
+    }
+
+
+def pick_species(species_list: List[Dict], trophic_level: str) -> Dict:
+    """
+    First species at a trophic level (cascade targets, invaders)
+    """
+    for species in species_list:
+        if species['trophicLevel'] == trophic_level:
+            return species
+    return species_list[0]
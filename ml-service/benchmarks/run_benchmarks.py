@@ -0,0 +1,312 @@
+"""
+run_benchmarks.py
+
+BEGINNER GUIDE: Benchmark suite for the ML service
+
+Answers "did my change make the service faster or slower?".
+
+Two groups of timings, for ecosystems of 4 up to 100,000 species
+(built by ecosystems.py from the biome templates):
+
+    model/<analysis>/<size>  -> the four analyses called in-process
+                                (analyze_cascade, analyze_invasive,
+                                 predict_populations, assess_extinction_risks)
+                                plus the coupled Lotka-Volterra trajectory
+                                over a long horizon
+    http/<endpoint>/<size>   -> the FastAPI endpoints through an
+                                in-process ASGI client (validation,
+                                model and JSON encoding, no network)
+
+Each case runs until it has at least --min-time seconds of samples
+(between --min-repeats and --max-repeats runs) and records the median
+and minimum. Results are saved as JSON so two commits can be compared:
+
+    cd ml-service
+    pip install -r benchmarks/requirements.txt
+
+    python benchmarks/run_benchmarks.py run --output before.json
+    ... change code ...
+    python benchmarks/run_benchmarks.py run --output after.json
+    python benchmarks/run_benchmarks.py compare before.json after.json --threshold 0.10
+
+compare exits with status 1 if any case got slower than the threshold
+(10% by default), so it can gate CI.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from typing import Callable, Dict, List
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+SERVICE_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, SERVICE_DIR)
+sys.path.insert(0, BENCH_DIR)
+
+from ecosystems import load_templates, make_ecosystem, pick_species  # noqa: E402
+
+DEFAULT_SIZES = [4, 100, 1000, 10000, 100000]
+# JSON payloads of 100k species mostly measure the JSON parser
+DEFAULT_HTTP_SIZES = [4, 100, 1000, 10000]
+TIME_STEPS = 12
+# Reported steps of the long-horizon Lotka-Volterra case
+LOTKA_VOLTERRA_STEPS = [0, 10, 100, 1000, 10000]
+
+
+# ============================================
+# TIMING
+# ============================================
+
+def time_call(fn: Callable[[], object], min_time: float,
+              min_repeats: int, max_repeats: int) -> Dict:
+    """
+    Call fn() repeatedly and summarize the wall-clock times (seconds)
+    """
+    samples = []
+    started = time.perf_counter()
+    while len(samples) < max_repeats:
+        t0 = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - t0)
+        if len(samples) >= min_repeats and time.perf_counter() - started >= min_time:
+            break
+
+    return {
+        'median': statistics.median(samples),
+        'min': min(samples),
+        'repeats': len(samples)
+    }
+
+
+def report(name: str, result: Dict):
+    print(f"  {name:<40} median {result['median'] * 1000:10.2f} ms"
+          f"   min {result['min'] * 1000:10.2f} ms   ({result['repeats']} runs)")
+
+
+# ============================================
+# IN-PROCESS MODEL BENCHMARKS
+# ============================================
+
+def bench_model(sizes: List[int], templates: List[Dict], options) -> Dict:
+    from model.cascade_model import (
+        analyze_cascade, analyze_invasive, predict_populations, assess_extinction_risks
+    )
+
+    results = {}
+    for size in sizes:
+        species = make_ecosystem(size, templates, seed=options.seed)
+        target = pick_species(species, 'primary_consumer')
+        invader = dict(pick_species(species, 'tertiary_consumer'), name='Invader')
+
+        cases = {
+            'cascade': lambda: analyze_cascade(species, target, seed=options.seed),
+            'invasive': lambda: analyze_invasive(species, invader, 5),
+            'trajectory': lambda: predict_populations(species, TIME_STEPS),
+            'lotka_volterra': lambda: predict_populations(
+                species, TIME_STEPS, 'lotka_volterra_rk45', LOTKA_VOLTERRA_STEPS
+            ),
+            'risk': lambda: assess_extinction_risks(species)
+        }
+
+        print(f"\nmodel, {size} species")
+        for analysis, fn in cases.items():
+            name = f"model/{analysis}/{size}"
+            results[name] = time_call(
+                fn, options.min_time, options.min_repeats, options.max_repeats
+            )
+            report(name, results[name])
+    return results
+
+
+# ============================================
+# HTTP (ASGI) BENCHMARKS
+# ============================================
+
+def bench_http(sizes: List[int], templates: List[Dict], options) -> Dict:
+    import httpx
+    from app import app, model_executors
+
+    async def run_all() -> Dict:
+        results = {}
+        transport = httpx.ASGITransport(app=app)
+        # no-store: measure the real computation, not the result cache
+        headers = {'Cache-Control': 'no-store'}
+
+        async with httpx.AsyncClient(transport=transport, base_url='http://bench',
+                                     headers=headers, timeout=None) as client:
+            for size in sizes:
+                species = make_ecosystem(size, templates, seed=options.seed)
+                target = pick_species(species, 'primary_consumer')
+                invader = dict(pick_species(species, 'tertiary_consumer'), name='Invader')
+
+                cases = {
+                    'cascade': ('/api/analyze/cascade',
+                                {'speciesArray': species, 'targetSpecies': target}),
+                    'invasive': ('/api/analyze/invasive',
+                                 {'currentSpecies': species, 'invasiveSpecies': invader,
+                                  'invasionStrength': 5}),
+                    'trajectory': ('/api/predict/trajectory',
+                                   {'species': species, 'timeSteps': TIME_STEPS}),
+                    'health': ('/api/ecosystem/health', {'species': species})
+                }
+
+                print(f"\nhttp, {size} species")
+                for endpoint, (path, payload) in cases.items():
+                    # Encode once: we time the service, not the client
+                    body = json.dumps(payload).encode('utf-8')
+                    name = f"http/{endpoint}/{size}"
+                    results[name] = await time_request(client, path, body, options)
+                    report(name, results[name])
+        return results
+
+    try:
+        return asyncio.run(run_all())
+    finally:
+        model_executors.shutdown()
+
+
+async def time_request(client, path: str, body: bytes, options) -> Dict:
+    """
+    Async twin of time_call() for one POST endpoint
+    """
+    samples = []
+    started = time.perf_counter()
+    while len(samples) < options.max_repeats:
+        t0 = time.perf_counter()
+        response = await client.post(
+            path, content=body, headers={'Content-Type': 'application/json'}
+        )
+        samples.append(time.perf_counter() - t0)
+        if response.status_code != 200:
+            raise RuntimeError(f"{path} returned {response.status_code}: {response.text[:200]}")
+        if len(samples) >= options.min_repeats and time.perf_counter() - started >= options.min_time:
+            break
+
+    return {
+        'median': statistics.median(samples),
+        'min': min(samples),
+        'repeats': len(samples)
+    }
+
+
+# ============================================
+# RESULTS FILES
+# ============================================
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=SERVICE_DIR,
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def environment() -> Dict:
+    import numpy as np
+    return {
+        'commit': git_commit(),
+        'timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count()
+    }
+
+
+def compare(baseline: Dict, current: Dict, threshold: float) -> List[str]:
+    """
+    Print a comparison table; returns the names of regressed cases
+    """
+    regressions = []
+    print(f"{'case':<40} {'baseline':>12} {'current':>12} {'change':>9}")
+    for name, before in sorted(baseline['results'].items()):
+        after = current['results'].get(name)
+        if after is None:
+            print(f"{name:<40} {before['median'] * 1000:10.2f}ms {'missing':>12}")
+            continue
+
+        change = after['median'] / before['median'] - 1 if before['median'] > 0 else 0.0
+        flag = ''
+        if change > threshold:
+            flag = '  REGRESSION'
+            regressions.append(name)
+        elif change < -threshold:
+            flag = '  faster'
+        print(f"{name:<40} {before['median'] * 1000:10.2f}ms "
+              f"{after['median'] * 1000:10.2f}ms {change:+8.1%}{flag}")
+
+    for name in sorted(set(current['results']) - set(baseline['results'])):
+        print(f"{name:<40} {'new':>12} {current['results'][name]['median'] * 1000:10.2f}ms")
+    return regressions
+
+
+# ============================================
+# COMMAND LINE
+# ============================================
+
+def parse_sizes(text: str) -> List[int]:
+    return [int(size) for size in text.split(',') if size.strip()]
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description='Benchmark the ML service')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    run = commands.add_parser('run', help='run the benchmarks and save the results')
+    run.add_argument('--sizes', type=parse_sizes, default=DEFAULT_SIZES,
+                     help='ecosystem sizes for the model benchmarks (comma separated)')
+    run.add_argument('--http-sizes', type=parse_sizes, default=DEFAULT_HTTP_SIZES,
+                     help='ecosystem sizes for the HTTP benchmarks (empty to skip)')
+    run.add_argument('--skip-http', action='store_true', help='only run the model benchmarks')
+    run.add_argument('--min-time', type=float, default=1.0,
+                     help='minimum seconds of samples per case')
+    run.add_argument('--min-repeats', type=int, default=3)
+    run.add_argument('--max-repeats', type=int, default=50)
+    run.add_argument('--seed', type=int, default=0, help='seed for the synthetic ecosystems')
+    run.add_argument('--output', help='results file (default: benchmarks/results/<commit>.json)')
+
+    cmp = commands.add_parser('compare', help='compare two results files')
+    cmp.add_argument('baseline')
+    cmp.add_argument('current')
+    cmp.add_argument('--threshold', type=float, default=0.10,
+                     help='relative slowdown of the median that counts as a regression')
+
+    options = parser.parse_args(argv)
+
+    if options.command == 'compare':
+        with open(options.baseline) as f:
+            baseline = json.load(f)
+        with open(options.current) as f:
+            current = json.load(f)
+        regressions = compare(baseline, current, options.threshold)
+        if regressions:
+            print(f"\n❌ {len(regressions)} case(s) slower than {options.threshold:.0%}")
+            return 1
+        print(f"\n✅ No regressions above {options.threshold:.0%}")
+        return 0
+
+    templates = load_templates()
+    results = bench_model(options.sizes, templates, options)
+    if not options.skip_http and options.http_sizes:
+        results.update(bench_http(options.http_sizes, templates, options))
+
+    env = environment()
+    output = options.output or os.path.join(BENCH_DIR, 'results', f"{env['commit']}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump({'environment': env, 'results': results}, f, indent=2)
+    print(f"\n✅ Results saved to {output}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
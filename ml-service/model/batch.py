@@ -0,0 +1,375 @@
+"""
+batch.py
+
+BEGINNER GUIDE: Analysing many ecosystems in one call
+
+A classroom may send hundreds of small pyramids at once. Analysing them
+one by one repeats the same per-call work (model object, rule tables,
+NumPy calls on tiny arrays) hundreds of times.
+
+EcosystemBatch packs all pyramids into ONE set of "ragged" columns:
+
+    levels      [ eco 0 species | eco 1 species | eco 2 species ... ]
+    population  [ ...same layout... ]
+    offsets     [0, n0, n0 + n1, ...]   -> eco e is offsets[e]:offsets[e + 1]
+    ecosystem   [0, 0, 0, 1, 1, 2, ...] -> which pyramid each species is in
+
+Per-ecosystem values (target level, invasion strength, ...) are spread
+to the species with `values[batch.ecosystem]`, so each analysis becomes a
+handful of array operations over all species of all pyramids. Only the
+final per-ecosystem result dicts are built in Python.
+
+The results are the same as the single-ecosystem functions in
+cascade_model.py (for the cascade, given the same seed per ecosystem).
+"""
+
+import numpy as np
+from typing import Dict, List, Optional, Sequence
+
+from model.cascade_model import EcosystemCascadeModel
+from model.ecosystem import (
+    CompiledEcosystem,
+    NUM_TROPHIC_LEVELS,
+    SpeciesInput,
+    compile_ecosystem
+)
+from model.health_metrics import batch_trajectory_health
+from model.population_engine import (
+    LOTKA_VOLTERRA_MODES,
+    PopulationEngine,
+    TRAJECTORY_MODES,
+    timeline_from_matrix
+)
+
+
+class EcosystemBatch:
+    """
+    Several ecosystems stored as one set of concatenated columns
+    """
+
+    def __init__(self, ecosystems: Sequence[SpeciesInput]):
+        self.ecosystems: List[CompiledEcosystem] = [compile_ecosystem(e) for e in ecosystems]
+        self.sizes = np.array([len(e) for e in self.ecosystems], dtype=np.int64)
+        self.offsets = np.concatenate(([0], np.cumsum(self.sizes))).astype(np.int64)
+        self.ecosystem = np.repeat(np.arange(len(self.ecosystems)), self.sizes)
+
+        self.levels = _concat([e.levels for e in self.ecosystems], np.int64)
+        self.population = _concat([e.population for e in self.ecosystems], np.float64)
+        self.biomass = _concat([e.biomass for e in self.ecosystems], np.float64)
+
+    def __len__(self) -> int:
+        return len(self.ecosystems)
+
+    @property
+    def num_species(self) -> int:
+        return int(self.offsets[-1])
+
+    def segment(self, index: int) -> slice:
+        """Slice of the concatenated columns holding ecosystem `index`"""
+        return slice(int(self.offsets[index]), int(self.offsets[index + 1]))
+
+
+def as_batch(ecosystems) -> EcosystemBatch:
+    if isinstance(ecosystems, EcosystemBatch):
+        return ecosystems
+    return EcosystemBatch(ecosystems)
+
+
+# ================================================
+# CASCADE
+# ================================================
+
+def batch_cascade(ecosystems, targets: Sequence[Dict],
+                  seeds: Sequence[Optional[int]] = None,
+                  ensemble_size: int = None) -> List[Dict]:
+    """
+    predict_cascade_effect for every (ecosystem, target) pair
+
+    seeds: optional seed per ecosystem (same answer as analyze_cascade
+           with that seed)
+    """
+    batch = as_batch(ecosystems)
+    if len(targets) != len(batch):
+        raise ValueError("Need one target species per ecosystem")
+    seeds = list(seeds) if seeds is not None else [None] * len(batch)
+    model = EcosystemCascadeModel()
+
+    # Rule tables [target_level, species_level]
+    rule_loss = np.zeros((NUM_TROPHIC_LEVELS, NUM_TROPHIC_LEVELS))
+    rule_direct = np.zeros((NUM_TROPHIC_LEVELS, NUM_TROPHIC_LEVELS), dtype=bool)
+    for t in range(NUM_TROPHIC_LEVELS):
+        for l in range(NUM_TROPHIC_LEVELS):
+            rule_loss[t, l], rule_direct[t, l] = model._impact_rule(t, l)
+
+    target_names = [target['name'] for target in targets]
+    target_levels = np.array(
+        [model.get_trophic_level(target.get('trophicLevel')) for target in targets],
+        dtype=np.int64
+    )
+    species_target = target_levels[batch.ecosystem]
+    base_loss = rule_loss[species_target, batch.levels]
+    direct = rule_direct[species_target, batch.levels]
+
+    # Affected: rule says so, and not the target itself (by name)
+    not_target = np.ones(batch.num_species, dtype=bool)
+    for index, eco in enumerate(batch.ecosystems):
+        if len(eco):
+            not_target[batch.segment(index)] = eco.name_array != target_names[index]
+    affected = ((base_loss > 0) | direct) & not_target
+
+    # Direct-predator jitter: one draw per direct predator, in species
+    # order, from the ecosystem's own random source (as analyze_cascade)
+    loss = base_loss.copy()
+    ensembles = [None] * len(batch)
+    is_direct = affected & direct
+    for index, seed in enumerate(seeds):
+        sl = batch.segment(index)
+        if ensemble_size:
+            columns = np.flatnonzero(affected[sl])
+            ensembles[index] = EcosystemCascadeModel(seed=seed)._ensemble_losses(
+                base_loss[sl][columns], direct[sl][columns], ensemble_size
+            )
+            continue
+        direct_columns = np.flatnonzero(is_direct[sl]) + sl.start
+        if len(direct_columns):
+            rng = np.random.RandomState(seed) if seed is not None else np.random
+            loss[direct_columns] += rng.uniform(-10, 10, size=len(direct_columns))
+
+    # Reasons only depend on (target level, species level)
+    reasons = [
+        [model._impact_reason(t, l, name) for l in range(NUM_TROPHIC_LEVELS)]
+        for t, name in zip(target_levels.tolist(), target_names)
+    ]
+
+    results = []
+    for index, eco in enumerate(batch.ecosystems):
+        sl = batch.segment(index)
+        columns = np.flatnonzero(affected[sl])
+        ensemble = ensembles[index]
+        if ensemble is not None:
+            losses = np.asarray(ensemble['mean'], dtype=np.float64)
+        else:
+            losses = loss[sl][columns]
+
+        # Highest population loss first; lexsort is stable like list.sort
+        order = np.lexsort((-np.maximum(0, losses),))
+        entry_levels = batch.levels[sl][columns].tolist()
+        entry_direct = direct[sl][columns].tolist()
+        loss_values = losses.tolist()
+        target_reasons = reasons[index]
+
+        entries = []
+        total_health_loss = 0
+        for k in order.tolist():
+            species = int(columns[k])
+            value = loss_values[k]
+            if ensemble is None and not entry_direct[k]:
+                value = int(value)  # rule losses are whole numbers
+            entry = {
+                'name': eco.names[species],
+                'icon': eco.icons[species],
+                'population_loss': max(0, value),
+                'extinction_probability': min(1.0, max(0, value / 100)),
+                'reason': target_reasons[entry_levels[k]],
+                'affected_by': 'direct' if entry_direct[k] else 'cascade'
+            }
+            if ensemble is not None:
+                entry['extinction_probability'] = ensemble['extinction_probability'][k]
+                entry['population_loss_p5'] = ensemble['p5'][k]
+                entry['population_loss_p95'] = ensemble['p95'][k]
+                entry['prob_loss_over_90'] = ensemble['prob_over_90'][k]
+            entries.append(entry)
+            total_health_loss += min(-1, -abs(value) / 100)
+
+        result = {
+            'target_species': target_names[index],
+            'affected_species': entries,
+            'ecosystem_health_change': max(-100, total_health_loss),
+            'extinctions_predicted': sum(1 for e in entries if e['population_loss'] > 90),
+            'num_species_affected': len(entries),
+            'cascade_depth': model._cascade_depth_for_count(len(entries))
+        }
+        if ensemble is not None:
+            result['ensemble_size'] = ensemble_size
+            result['expected_extinctions'] = round(sum(ensemble['prob_over_90']), 4)
+        results.append(result)
+    return results
+
+
+# ================================================
+# INVASIVE SPECIES
+# ================================================
+
+def batch_invasive(ecosystems, invasives: Sequence[Dict],
+                   strengths: Sequence[int]) -> List[Dict]:
+    """
+    predict_invasive_species_impact for every (ecosystem, invasive,
+    strength) triple
+    """
+    batch = as_batch(ecosystems)
+    if not (len(invasives) == len(strengths) == len(batch)):
+        raise ValueError("Need one invasive species and strength per ecosystem")
+    model = EcosystemCascadeModel()
+
+    invasive_levels = np.array(
+        [model.get_trophic_level(inv.get('trophicLevel')) for inv in invasives],
+        dtype=np.int64
+    )
+    competition = np.array([strength / 10 for strength in strengths], dtype=np.float64)
+
+    # Level difference to the invasive decides the effect
+    distance = batch.levels - invasive_levels[batch.ecosystem]
+    factor = competition[batch.ecosystem]
+    loss = np.zeros(batch.num_species)
+    kind = np.zeros(batch.num_species, dtype=np.int8)
+    for code, mask, value in (
+        (1, distance == 0, 30 + factor * 50),
+        (2, distance == -1, 20 + factor * 40),
+        (3, distance == 1, np.full(batch.num_species, -30.0)),
+        (4, distance < -1, np.maximum(5, 20 + distance * 5.0))
+    ):
+        loss[mask] = value[mask]
+        kind[mask] = code
+    impact_types = (None, 'competition', 'predation', 'predator_benefit', 'cascade')
+    # Losses of the fixed-value effects are whole numbers in the model
+    whole = (kind == 3) | (kind == 4)
+
+    results = []
+    for index, eco in enumerate(batch.ecosystems):
+        sl = batch.segment(index)
+        columns = np.flatnonzero(loss[sl] != 0)
+        values = loss[sl][columns].tolist()
+        kinds = kind[sl][columns].tolist()
+        wholes = whole[sl][columns].tolist()
+
+        entries = []
+        for species, value, code, is_whole in zip(columns.tolist(), values, kinds, wholes):
+            if is_whole:
+                value = int(value)
+            entries.append({
+                'species': eco.names[species],
+                'icon': eco.icons[species],
+                'population_change': value,
+                'impact_type': impact_types[code],
+                'probability': min(1.0, abs(value) / 100)
+            })
+
+        results.append({
+            'invasive_species': invasives[index]['name'],
+            'invasion_strength': strengths[index],
+            'affected_species': entries,
+            'total_impact': sum(e['population_change'] for e in entries),
+            'outcome_prediction': model._predict_invasive_outcome(entries, strengths[index])
+        })
+    return results
+
+
+# ================================================
+# POPULATION TRAJECTORY
+# ================================================
+
+def batch_trajectory(ecosystems, time_steps: int = 12, mode: str = 'iterative',
+                     steps: List[int] = None) -> List[List[Dict]]:
+    """
+    predict_population_trajectory for every ecosystem
+
+    The logistic modes advance all species of all ecosystems as one
+    vector (species never interact there). The coupled Lotka-Volterra
+    modes couple species within an ecosystem, so those are integrated
+    one ecosystem at a time.
+    """
+    if mode not in TRAJECTORY_MODES:
+        raise ValueError(f"Unknown trajectory mode: {mode}")
+    if steps is not None and any(step < 0 for step in steps):
+        raise ValueError("Trajectory steps must be non-negative")
+    batch = as_batch(ecosystems)
+    model = EcosystemCascadeModel()
+
+    if mode in LOTKA_VOLTERRA_MODES:
+        return [
+            model.predict_population_trajectory(eco, time_steps, mode, steps)
+            for eco in batch.ecosystems
+        ]
+
+    engine = PopulationEngine(range(batch.num_species), batch.population, batch.levels)
+    report_steps, matrix = engine.population_matrix(time_steps, steps, mode)
+    return [
+        timeline_from_matrix(eco.names, report_steps, matrix[:, batch.segment(index)])
+        for index, eco in enumerate(batch.ecosystems)
+    ]
+
+
+def batch_health_curves(ecosystems, time_steps: int = 12, mode: str = 'iterative',
+                        steps: Optional[Sequence[int]] = None) -> List[Dict]:
+    """
+    predict_health_curves for every ecosystem: all trajectories side by
+    side in one matrix, every metric one reduction over all of them
+    """
+    if mode not in TRAJECTORY_MODES:
+        raise ValueError(f"Unknown trajectory mode: {mode}")
+    if steps is not None and any(step < 0 for step in steps):
+        raise ValueError("Trajectory steps must be non-negative")
+    batch = as_batch(ecosystems)
+    model = EcosystemCascadeModel()
+
+    if mode in LOTKA_VOLTERRA_MODES:
+        # Coupled systems: one integration per ecosystem, same report steps
+        matrices = []
+        report_steps = None
+        for eco in batch.ecosystems:
+            engine = model._trajectory_engine(eco, mode)
+            report_steps, matrix = engine.population_matrix(time_steps, steps, mode)
+            matrices.append(matrix)
+        matrix = np.hstack(matrices)
+    else:
+        engine = PopulationEngine(range(batch.num_species), batch.population, batch.levels)
+        report_steps, matrix = engine.population_matrix(time_steps, steps, mode)
+
+    return batch_trajectory_health(
+        report_steps, matrix, batch.levels, batch.population, batch.biomass, batch.offsets
+    )
+
+
+# ================================================
+# EXTINCTION RISK
+# ================================================
+
+def batch_risk(ecosystems) -> List[List[Dict]]:
+    """
+    calculate_extinction_risk for every ecosystem, scored in one pass
+    """
+    batch = as_batch(ecosystems)
+    model = EcosystemCascadeModel()
+
+    scores, codes = model.risk_scores(batch.population, batch.levels, batch.biomass)
+    # Factor list for every combination of the factor flags
+    factor_lists = [
+        model.risk_factor_labels(code) for code in range(1 << len(model.RISK_FACTORS))
+    ]
+    level_names = {score: model.risk_level(score) for score in np.unique(scores).tolist()}
+
+    # One stable sort: by ecosystem, then highest risk first (like list.sort)
+    order = np.lexsort((-scores, batch.ecosystem))
+    names = [name for eco in batch.ecosystems for name in eco.names]
+    icons = [icon for eco in batch.ecosystems for icon in eco.icons]
+
+    results = [[] for _ in range(len(batch))]
+    rows = zip(
+        order.tolist(), batch.ecosystem[order].tolist(),
+        scores[order].tolist(), codes[order].tolist()
+    )
+    for species, index, score, code in rows:
+        results[index].append({
+            'species': names[species],
+            'icon': icons[species],
+            'risk_level': level_names[score],
+            'risk_score': min(100, score),
+            'risk_factors': list(factor_lists[code])
+        })
+    return results
+
+
+def _concat(columns: List[np.ndarray], dtype) -> np.ndarray:
+    if not columns:
+        return np.empty(0, dtype=dtype)
+    return np.concatenate(columns).astype(dtype, copy=False)
@@ -13,9 +13,26 @@ Using: Simple Python algorithms (no external ML frameworks for beginners)
 """
 
 import numpy as np
-from typing import List, Dict, Tuple
+from typing import List, Dict, Tuple, Iterator
 import math
 
+from model.ecosystem import (
+    CompiledEcosystem,
+    SpeciesInput,
+    TROPHIC_LEVELS,
+    NUM_TROPHIC_LEVELS,
+    compile_ecosystem
+)
+from model.food_web import FoodWeb, build_food_web
+from model.health_metrics import trajectory_health
+from model.lotka_volterra import LotkaVolterraSystem
+from model.population_engine import (
+    LOTKA_VOLTERRA_MODES,
+    LotkaVolterraEngine,
+    PopulationEngine,
+    TRAJECTORY_MODES
+)
+
 class EcosystemCascadeModel:
     """
     Main model for predicting ecosystem cascade effects
@@ -26,10 +43,17 @@ class EcosystemCascadeModel:
     PREDATION_RATE = 0.01  # How much predators eat
     NATURAL_MORTALITY = 0.05  # Species natural death rate
     CARRYING_CAPACITY_FACTOR = 1000  # Food → population multiplier
+    NUM_TROPHIC_LEVELS = NUM_TROPHIC_LEVELS  # producer .. tertiary_consumer
+    ENSEMBLE_CHUNK_ELEMENTS = 1 << 22  # Max Monte Carlo samples held at once
     
-    def __init__(self, verbose=False):
+    def __init__(self, verbose=False, seed=None):
         self.verbose = verbose
         self.simulation_history = []
+        self.seed = seed
+        
+        # Random source for the jitter in cascade predictions. With a seed
+        # the same request always gives the same answer.
+        self.rng = np.random.RandomState(seed) if seed is not None else np.random
     
     # ================================================
     # 1. SPECIES CLASSIFICATION
@@ -40,13 +64,7 @@ class EcosystemCascadeModel:
         Convert trophic level string to number
         producer=0, primary_consumer=1, secondary_consumer=2, tertiary_consumer=3
         """
-        levels = {
-            'producer': 0,
-            'primary_consumer': 1,
-            'secondary_consumer': 2,
-            'tertiary_consumer': 3
-        }
-        return levels.get(trophic_level_str, 0)
+        return TROPHIC_LEVELS.get(trophic_level_str, 0)
     
     def classify_species(self, species: Dict) -> Dict:
         """
@@ -87,7 +105,8 @@ class EcosystemCascadeModel:
     # 2. CASCADE EFFECT PREDICTION
     # ================================================
     
-    def predict_cascade_effect(self, species_list: List[Dict], target_species: Dict) -> Dict:
+    def predict_cascade_effect(self, species_list: SpeciesInput, target_species: Dict,
+                               ensemble_size: int = None, food_web=None) -> Dict:
         """
         MAIN FUNCTION: Predict what happens when target species is removed
         
@@ -97,6 +116,15 @@ class EcosystemCascadeModel:
         3. Apply cascade through food chain
         4. Calculate extinction probability for each species
         
+        ensemble_size: if set, draw that many Monte Carlo samples of the
+        direct-predator jitter instead of one. Each affected species then
+        reports the mean loss, its 5th/95th percentiles and the probability
+        that the loss exceeds 90%.
+        
+        food_web: optional predator -> prey links (see model/food_web.py).
+        When given, the cascade follows the real links instead of the
+        trophic-level rules (see _predict_food_web_cascade).
+        
         Returns: {
             'affected_species': [
                 {
@@ -111,32 +139,69 @@ class EcosystemCascadeModel:
         }
         """
         
+        eco = compile_ecosystem(species_list)
+        if food_web is not None:
+            return self._predict_food_web_cascade(
+                eco, target_species, build_food_web(eco.names, food_web), ensemble_size
+            )
+        
         target_level = self.get_trophic_level(target_species.get('trophicLevel'))
+        target_name = target_species['name']
+        
+        # The rules only depend on levels: evaluate them once per level
+        level_rules = [self._impact_rule(target_level, l) for l in range(NUM_TROPHIC_LEVELS)]
+        level_reasons = [
+            self._impact_reason(target_level, l, target_name) for l in range(NUM_TROPHIC_LEVELS)
+        ]
+        affected_levels = [
+            l for l, (loss, direct) in enumerate(level_rules) if loss > 0 or direct
+        ]
+        
+        # Species at affected levels, skipping the target itself (by name)
+        candidates = np.flatnonzero(
+            np.isin(eco.levels, affected_levels) & (eco.name_array != target_name)
+        )
+        candidate_levels = eco.levels[candidates].tolist()
+        
+        if ensemble_size:
+            ensemble = self._ensemble_losses(
+                np.array([level_rules[l][0] for l in candidate_levels], dtype=np.float64),
+                np.array([level_rules[l][1] for l in candidate_levels], dtype=bool),
+                ensemble_size
+            )
+            jitter = iter([])
+        else:
+            # One jitter draw per direct predator, in species order
+            ensemble = None
+            num_direct = candidate_levels.count(target_level + 1)
+            jitter = iter(self.rng.uniform(-10, 10, size=num_direct).tolist() if num_direct else [])
+        
         affected = []
         total_health_loss = 0
         
-        for species in species_list:
-            if species['name'] == target_species['name']:
-                continue
-            
-            species_level = self.get_trophic_level(species.get('trophicLevel'))
-            impact = self._calculate_impact(
-                target_level, 
-                species_level,
-                target_species,
-                species
-            )
+        for k, (index, species_level) in enumerate(zip(candidates.tolist(), candidate_levels)):
+            base_loss, direct = level_rules[species_level]
+            if ensemble is not None:
+                base_loss = ensemble['mean'][k]
+            elif direct:
+                base_loss = base_loss + next(jitter)
+            impact = self._impact_from_loss(base_loss, direct, level_reasons[species_level])
             
-            if impact['population_loss'] > 0:
-                affected.append({
-                    'name': species['name'],
-                    'icon': species.get('icon', '🔹'),
-                    'population_loss': impact['population_loss'],
-                    'extinction_probability': impact['extinction_prob'],
-                    'reason': impact['reason'],
-                    'affected_by': 'direct' if impact['direct'] else 'cascade'
-                })
-                total_health_loss += impact['health_impact']
+            entry = {
+                'name': eco.names[index],
+                'icon': eco.icons[index],
+                'population_loss': impact['population_loss'],
+                'extinction_probability': impact['extinction_prob'],
+                'reason': impact['reason'],
+                'affected_by': 'direct' if impact['direct'] else 'cascade'
+            }
+            if ensemble is not None:
+                entry['extinction_probability'] = ensemble['extinction_probability'][k]
+                entry['population_loss_p5'] = ensemble['p5'][k]
+                entry['population_loss_p95'] = ensemble['p95'][k]
+                entry['prob_loss_over_90'] = ensemble['prob_over_90'][k]
+            affected.append(entry)
+            total_health_loss += impact['health_impact']
         
         # Sort by impact (highest first)
         affected.sort(key=lambda x: x['population_loss'], reverse=True)
@@ -144,7 +209,7 @@ class EcosystemCascadeModel:
         # Count species likely to go extinct (>90% loss)
         extinctions = sum(1 for s in affected if s['population_loss'] > 90)
         
-        return {
+        result = {
             'target_species': target_species['name'],
             'affected_species': affected,
             'ecosystem_health_change': max(-100, total_health_loss),
@@ -152,37 +217,148 @@ class EcosystemCascadeModel:
             'num_species_affected': len(affected),
             'cascade_depth': self._calculate_cascade_depth(affected)
         }
+        if ensemble is not None:
+            result['ensemble_size'] = ensemble_size
+            result['expected_extinctions'] = round(sum(ensemble['prob_over_90']), 4)
+        return result
     
-    def _calculate_impact(self, target_level: int, species_level: int, 
-                         target_species: Dict, species: Dict) -> Dict:
-        """
-        Calculate impact on a single species when target is removed
+    def _predict_food_web_cascade(self, eco: CompiledEcosystem, target_species: Dict,
+                                  food_web: FoodWeb, ensemble_size: int = None) -> Dict:
         """
+        Cascade along real predator -> prey links
         
-        # RULE 1: Direct predators lose most
-        if species_level == target_level + 1:
-            base_loss = 60 + np.random.uniform(-10, 10)
-            reason = f"Direct predator of {target_species['name']}"
-            direct = True
+        1. Breadth-first search from the target up through its
+           predators gives every species' distance d (in links)
+        2. Base loss by distance: 60 +/-10 for direct predators (d = 1),
+           max(10, 50 - 15d) further up
+        3. The base loss is scaled by diet dependency: the share of the
+           species' prey that were removed or affected (one sparse
+           matrix-vector product)
         
-        # RULE 2: Competitors benefit (less competition)
-        elif species_level == target_level:
-            base_loss = -30  # Negative = population INCREASE
-            reason = "Less competition for resources"
-            direct = False
+        Species the target cannot reach are unaffected, and cascade_depth
+        is the largest distance reached.
+        """
+        target_name = target_species['name']
+        sources = np.flatnonzero(eco.name_array == target_name)
         
-        # RULE 3: Cascade effects further up food chain
-        elif species_level > target_level + 1:
-            levels_removed = species_level - target_level
-            base_loss = max(10, 50 - (levels_removed * 15))
-            reason = f"Food chain disrupted ({levels_removed} levels)"
-            direct = False
+        distance = food_web.predator_distances(sources)
+        dependency = food_web.diet_lost(distance >= 0)
         
-        # RULE 4: Prey at lower levels unaffected
+        affected_index = np.flatnonzero(distance > 0)
+        hops = distance[affected_index]
+        direct = hops == 1
+        base_losses = np.where(direct, 60.0, np.maximum(10, 50 - 15 * hops)).astype(np.float64)
+        scale = dependency[affected_index]
+        
+        if ensemble_size:
+            ensemble = self._ensemble_losses(base_losses, direct, ensemble_size, scale)
+            losses = np.array(ensemble['mean'])
         else:
-            base_loss = 0
-            reason = "Not directly affected"
-            direct = False
+            ensemble = None
+            # One jitter draw per direct predator, in species order
+            jittered = base_losses.copy()
+            jittered[direct] += self.rng.uniform(-10, 10, size=int(direct.sum()))
+            losses = jittered * scale
+        
+        population_loss = np.maximum(0, losses)
+        extinction_prob = np.clip(losses / 100, 0, 1)
+        health_impact = np.minimum(-1, -np.abs(losses) / 100)
+        
+        # Highest loss first (stable, like list.sort); plain lists make
+        # the per-species loop below cheap
+        order = np.argsort(-population_loss, kind='stable')
+        rows = zip(
+            affected_index[order].tolist(), hops[order].tolist(),
+            population_loss[order].tolist(), extinction_prob[order].tolist(),
+            np.round(scale[order], 4).tolist(), order.tolist()
+        )
+        
+        affected = []
+        for index, hop, loss, extinction, dependency, k in rows:
+            if hop == 1:
+                reason = f"Direct predator of {target_name} ({dependency:.0%} of diet lost)"
+            else:
+                reason = f"Food chain disrupted ({hop} links, {dependency:.0%} of diet lost)"
+            entry = {
+                'name': eco.names[index],
+                'icon': eco.icons[index],
+                'population_loss': loss,
+                'extinction_probability': extinction,
+                'reason': reason,
+                'affected_by': 'direct' if hop == 1 else 'cascade',
+                'distance': hop,
+                'diet_dependency': dependency
+            }
+            if ensemble is not None:
+                entry['extinction_probability'] = ensemble['extinction_probability'][k]
+                entry['population_loss_p5'] = ensemble['p5'][k]
+                entry['population_loss_p95'] = ensemble['p95'][k]
+                entry['prob_loss_over_90'] = ensemble['prob_over_90'][k]
+            affected.append(entry)
+        
+        health_change = float(health_impact.sum())
+        if health_change.is_integer():
+            health_change = int(health_change)
+        
+        result = {
+            'target_species': target_name,
+            'affected_species': affected,
+            'ecosystem_health_change': max(-100, health_change),
+            'extinctions_predicted': int((population_loss > 90).sum()),
+            'num_species_affected': len(affected),
+            'cascade_depth': int(hops.max()) if len(hops) else 0,
+            'food_web': food_web.stats()
+        }
+        if ensemble is not None:
+            result['ensemble_size'] = ensemble_size
+            result['expected_extinctions'] = round(sum(ensemble['prob_over_90']), 4)
+        return result
+    
+    def _ensemble_losses(self, base_losses: np.ndarray, direct: np.ndarray,
+                         ensemble_size: int, scale: np.ndarray = None) -> Dict[str, List[float]]:
+        """
+        Monte Carlo summary of population losses
+        
+        Only direct predators are random (base loss +/-10), so samples are
+        drawn for those columns only, as one (samples x species) array per
+        chunk from a seeded Generator. Deterministic species get their
+        fixed loss for every statistic. `scale` optionally multiplies each
+        species' loss after the jitter (food-web diet dependency).
+        """
+        generator = np.random.default_rng(self.seed)
+        if scale is None:
+            scale = np.ones_like(base_losses)
+        
+        scaled = base_losses * scale
+        losses = np.maximum(0, scaled)
+        stats = {
+            'mean': losses.copy(),
+            'p5': losses.copy(),
+            'p95': losses.copy(),
+            'prob_over_90': (losses > 90).astype(np.float64),
+            'extinction_probability': np.clip(scaled / 100, 0, 1)
+        }
+        
+        columns = np.flatnonzero(direct)
+        chunk = max(1, self.ENSEMBLE_CHUNK_ELEMENTS // ensemble_size)
+        for start in range(0, len(columns), chunk):
+            cols = columns[start:start + chunk]
+            samples = base_losses[cols] + generator.uniform(-10, 10, size=(ensemble_size, len(cols)))
+            samples *= scale[cols]
+            
+            stats['mean'][cols] = np.maximum(0, samples).mean(axis=0)
+            stats['p5'][cols], stats['p95'][cols] = np.percentile(
+                np.maximum(0, samples), [5, 95], axis=0
+            )
+            stats['prob_over_90'][cols] = (samples > 90).mean(axis=0)
+            stats['extinction_probability'][cols] = np.clip(samples / 100, 0, 1).mean(axis=0)
+        
+        return {name: values.tolist() for name, values in stats.items()}
+    
+    def _impact_from_loss(self, base_loss: float, direct: bool, reason: str) -> Dict:
+        """
+        Turn a base population loss into the impact record
+        """
         
         # Calculate extinction probability
         extinction_prob = min(1.0, max(0, base_loss / 100))
@@ -198,24 +374,166 @@ class EcosystemCascadeModel:
             'health_impact': health_impact
         }
     
+    def _impact_reason(self, target_level: int, species_level: int, target_name: str) -> str:
+        """
+        Explain why a species at `species_level` is (not) affected
+        """
+        
+        # RULE 1: Direct predators lose most
+        if species_level == target_level + 1:
+            return f"Direct predator of {target_name}"
+        
+        # RULE 2: Competitors benefit (less competition)
+        elif species_level == target_level:
+            return "Less competition for resources"
+        
+        # RULE 3: Cascade effects further up food chain
+        elif species_level > target_level + 1:
+            levels_removed = species_level - target_level
+            return f"Food chain disrupted ({levels_removed} levels)"
+        
+        # RULE 4: Prey at lower levels unaffected
+        else:
+            return "Not directly affected"
+    
+    def _impact_rule(self, target_level: int, species_level: int) -> Tuple[float, bool]:
+        """
+        Expected population loss (percent) of a species at `species_level`
+        when a species at `target_level` is removed, and whether the
+        effect is direct. Direct predators get +/-10 jitter on top.
+        """
+        if species_level == target_level + 1:
+            return 60, True
+        elif species_level == target_level:
+            return -30, False  # Negative = population INCREASE
+        elif species_level > target_level + 1:
+            levels_removed = species_level - target_level
+            return max(10, 50 - (levels_removed * 15)), False
+        else:
+            return 0, False
+    
     def _calculate_cascade_depth(self, affected_list: List[Dict]) -> int:
         """
         How many 'levels' of cascade occurred
         """
-        if len(affected_list) == 0:
+        return self._cascade_depth_for_count(len(affected_list))
+    
+    def _cascade_depth_for_count(self, num_affected: int) -> int:
+        """
+        Cascade depth from the number of affected species
+        """
+        if num_affected == 0:
             return 0
-        elif len(affected_list) <= 2:
+        elif num_affected <= 2:
             return 1
-        elif len(affected_list) <= 5:
+        elif num_affected <= 5:
             return 2
         else:
             return 3
     
+    def predict_keystone_sweep(self, species_list: SpeciesInput) -> Dict:
+        """
+        KEYSTONE SWEEP: Predict the removal of EVERY species in one pass
+        
+        The impact of a removal only depends on the trophic levels of the
+        target and of each other species, so species are grouped by level
+        once and every target is scored from the per-level counts
+        (roughly O(N + L^2) instead of N separate cascade analyses).
+        Direct-predator losses use their expected value (no jitter).
+        
+        Returns: {
+            'keystone_ranking': [
+                {
+                    'rank': 1..N (1 = removal hurts the ecosystem most),
+                    'target_species': str,
+                    'ecosystem_health_change': -100 to 0,
+                    'extinctions_predicted': int,
+                    'num_species_affected': int,
+                    ...
+                }
+            ],
+            'num_species': int
+        }
+        """
+        eco = compile_ecosystem(species_list)
+        num_levels = NUM_TROPHIC_LEVELS
+        names = eco.names
+        levels = eco.levels.tolist()
+        level_counts = eco.level_counts
+        
+        # Rule tables: [target_level, species_level]
+        expected_loss = np.zeros((num_levels, num_levels))
+        is_direct = np.zeros((num_levels, num_levels), dtype=bool)
+        for t in range(num_levels):
+            for l in range(num_levels):
+                expected_loss[t, l], is_direct[t, l] = self._impact_rule(t, l)
+        is_affected = expected_loss > 0
+        health_impact = np.where(is_affected, np.minimum(-1, -np.abs(expected_loss) / 100), 0)
+        
+        def summarize(target_level: int, counts: np.ndarray) -> Dict:
+            num_affected = int(counts.sum())
+            total_loss = float(np.dot(counts, expected_loss[target_level]))
+            health_change = float(np.dot(counts, health_impact[target_level]))
+            if health_change.is_integer():
+                health_change = int(health_change)
+            return {
+                'trophic_level': target_level,
+                'ecosystem_health_change': max(-100, health_change),
+                'extinctions_predicted': int(counts[expected_loss[target_level] > 90].sum()),
+                'num_species_affected': num_affected,
+                'direct_predators_affected': int(counts[is_direct[target_level]].sum()),
+                'mean_population_loss': round(total_loss / num_affected, 2) if num_affected else 0,
+                'cascade_depth': self._cascade_depth_for_count(num_affected)
+            }
+        
+        # One summary per target level (L x L work)
+        affected_per_level = is_affected * level_counts
+        level_summaries = [summarize(t, affected_per_level[t]) for t in range(num_levels)]
+        
+        # Species sharing the target's name are skipped by the cascade
+        # analysis, so duplicated names need their own correction
+        name_levels = {}
+        for name, level in zip(names, levels):
+            name_levels.setdefault(name, []).append(level)
+        
+        rows = []
+        for name, icon, target_level in zip(names, eco.icons, levels):
+            same_name = name_levels[name]
+            
+            if len(same_name) > 1:
+                counts = affected_per_level[target_level] - is_affected[target_level] * np.bincount(
+                    same_name, minlength=num_levels
+                )
+                summary = summarize(target_level, counts)
+            else:
+                summary = level_summaries[target_level]
+            
+            rows.append({
+                'target_species': name,
+                'icon': icon,
+                **summary
+            })
+        
+        # Most damaging removals first
+        rows.sort(key=lambda r: (
+            r['ecosystem_health_change'],
+            -r['extinctions_predicted'],
+            -r['num_species_affected'],
+            -r['mean_population_loss']
+        ))
+        for rank, row in enumerate(rows, start=1):
+            row['rank'] = rank
+        
+        return {
+            'keystone_ranking': rows,
+            'num_species': len(eco)
+        }
+    
     # ================================================
     # 3. INVASIVE SPECIES IMPACT
     # ================================================
     
-    def predict_invasive_species_impact(self, species_list: List[Dict], 
+    def predict_invasive_species_impact(self, species_list: SpeciesInput, 
                                        invasive_species: Dict,
                                        invasion_strength: int = 5) -> Dict:
         """
@@ -230,47 +548,29 @@ class EcosystemCascadeModel:
         invasion_strength: 1-10 scale (10 = super invasive)
         """
         
+        eco = compile_ecosystem(species_list)
         invasive_level = self.get_trophic_level(invasive_species.get('trophicLevel'))
         affected = []
         
         competition_factor = invasion_strength / 10  # 0.1 to 1.0
         
-        for species in species_list:
-            species_level = self.get_trophic_level(species.get('trophicLevel'))
-            
-            impact_type = None
-            population_loss = 0
-            
-            # Same level: direct competition
-            if species_level == invasive_level:
-                # Invasive usually wins (more aggressive)
-                population_loss = 30 + (competition_factor * 50)
-                impact_type = 'competition'
-            
-            # Prey of invasive: get hunted more
-            elif species_level == invasive_level - 1:
-                population_loss = 20 + (competition_factor * 40)
-                impact_type = 'predation'
-            
-            # Predators of invasive: more food available
-            elif species_level == invasive_level + 1:
-                population_loss = -30  # Increase
-                impact_type = 'predator_benefit'
-            
-            # Cascade effects
-            elif species_level < invasive_level:
-                levels_removed = invasive_level - species_level
-                population_loss = max(5, 20 - (levels_removed * 5))
-                impact_type = 'cascade'
-            
-            if population_loss != 0:
-                affected.append({
-                    'species': species['name'],
-                    'icon': species.get('icon', '🔹'),
-                    'population_change': population_loss,
-                    'impact_type': impact_type,
-                    'probability': min(1.0, abs(population_loss) / 100)
-                })
+        # The effect only depends on the level: evaluate it once per level
+        level_effects = [
+            self._invasive_effect(invasive_level, l, competition_factor)
+            for l in range(NUM_TROPHIC_LEVELS)
+        ]
+        affected_levels = [l for l, (loss, _) in enumerate(level_effects) if loss != 0]
+        
+        candidates = np.flatnonzero(np.isin(eco.levels, affected_levels))
+        for index, species_level in zip(candidates.tolist(), eco.levels[candidates].tolist()):
+            population_loss, impact_type = level_effects[species_level]
+            affected.append({
+                'species': eco.names[index],
+                'icon': eco.icons[index],
+                'population_change': population_loss,
+                'impact_type': impact_type,
+                'probability': min(1.0, abs(population_loss) / 100)
+            })
         
         return {
             'invasive_species': invasive_species['name'],
@@ -280,6 +580,33 @@ class EcosystemCascadeModel:
             'outcome_prediction': self._predict_invasive_outcome(affected, invasion_strength)
         }
     
+    def _invasive_effect(self, invasive_level: int, species_level: int,
+                         competition_factor: float) -> Tuple[float, str]:
+        """
+        Population loss (percent) and impact type for a native species
+        at `species_level` when the invasive sits at `invasive_level`
+        """
+        
+        # Same level: direct competition
+        if species_level == invasive_level:
+            # Invasive usually wins (more aggressive)
+            return 30 + (competition_factor * 50), 'competition'
+        
+        # Prey of invasive: get hunted more
+        elif species_level == invasive_level - 1:
+            return 20 + (competition_factor * 40), 'predation'
+        
+        # Predators of invasive: more food available
+        elif species_level == invasive_level + 1:
+            return -30, 'predator_benefit'  # Increase
+        
+        # Cascade effects
+        elif species_level < invasive_level:
+            levels_removed = invasive_level - species_level
+            return max(5, 20 - (levels_removed * 5)), 'cascade'
+        
+        return 0, None
+    
     def _predict_invasive_outcome(self, affected: List[Dict], strength: int) -> str:
         """
         Predict final outcome of invasive species
@@ -294,15 +621,95 @@ class EcosystemCascadeModel:
             return 'COEXISTENCE'
         else:
             return 'INVASIVE_CONTAINED'
-    
+
+    def predict_invasive_sweep(self, species_list: SpeciesInput,
+                               candidates: List[Dict],
+                               strengths: List[int] = None) -> Dict:
+        """
+        INVASIVE SWEEP: Every candidate invasive at every strength in one pass
+
+        The effect on a native only depends on the invasive's level, the
+        native's level and the strength, so the rules are tabulated once
+        (levels x levels x strengths) and the full
+        candidates x strengths x natives tensor is a single lookup.
+        Each cell equals predict_invasive_species_impact for that
+        candidate and strength (unaffected natives have change 0).
+
+        Returns: {
+            'candidates': [str], 'strengths': [int], 'species': [str],
+            'population_change': [candidate][strength][species],
+            'impact_types': [candidate][species] (None = unaffected),
+            'total_impact': [candidate][strength],
+            'outcome_prediction': [candidate][strength],
+            'num_affected': [candidate]
+        }
+        """
+        eco = compile_ecosystem(species_list)
+        strengths = list(range(1, 11)) if strengths is None else list(strengths)
+        num_levels = NUM_TROPHIC_LEVELS
+
+        # Rule tables: [invasive_level, species_level, strength]
+        loss_table = np.zeros((num_levels, num_levels, len(strengths)))
+        type_table = [[None] * num_levels for _ in range(num_levels)]
+        for i in range(num_levels):
+            for l in range(num_levels):
+                for s, strength in enumerate(strengths):
+                    loss_table[i, l, s], type_table[i][l] = self._invasive_effect(
+                        i, l, strength / 10
+                    )
+
+        candidate_levels = np.array(
+            [self.get_trophic_level(c.get('trophicLevel')) for c in candidates],
+            dtype=np.int64
+        )
+        # [candidate, strength, species]
+        changes = loss_table[candidate_levels[:, None], eco.levels[None, :], :].transpose(0, 2, 1)
+
+        affected = loss_table[candidate_levels[:, None], eco.levels[None, :], 0] != 0
+        num_affected = affected.sum(axis=1)
+        losses = (changes > 20).sum(axis=2)
+
+        # Same branches as _predict_invasive_outcome
+        strength_grid = np.broadcast_to(np.array(strengths), losses.shape)
+        outcomes = np.select(
+            [strength_grid >= 8, losses > num_affected[:, None] * 0.7, strength_grid >= 5],
+            ['ECOSYSTEM_COLLAPSE', 'NATIVE_DECLINE', 'COEXISTENCE'],
+            'INVASIVE_CONTAINED'
+        )
+
+        levels = eco.levels.tolist()
+        return {
+            'candidates': [c['name'] for c in candidates],
+            'strengths': strengths,
+            'species': eco.names,
+            'population_change': changes.tolist(),
+            'impact_types': [
+                [type_table[level][l] for l in levels] for level in candidate_levels.tolist()
+            ],
+            'total_impact': changes.sum(axis=2).tolist(),
+            'outcome_prediction': outcomes.tolist(),
+            'num_affected': num_affected.tolist()
+        }
+
     # ================================================
     # 4. POPULATION DYNAMICS
     # ================================================
     
-    def predict_population_trajectory(self, species_list: List[Dict], 
-                                     time_steps: int = 12) -> List[Dict]:
+    def predict_population_trajectory(self, species_list: SpeciesInput, 
+                                     time_steps: int = 12,
+                                     mode: str = 'iterative',
+                                     steps: List[int] = None) -> List[Dict]:
         """
-        Predict population over time using Lotka-Volterra equations
+        Predict population over time
+        
+        mode:  'iterative' simulates every step in turn (independent
+               logistic growth per species)
+               'analytic' evaluates the closed-form solution directly at
+               each requested step (cheap for very long horizons)
+               'lotka_volterra' / 'lotka_volterra_rk45' integrate the
+               coupled predator-prey equations (error-controlled
+               RK4 or adaptive RK45)
+        steps: optional list of steps to report instead of 0..time_steps-1
         
         Returns: [{
             'step': 0-12,
@@ -311,41 +718,173 @@ class EcosystemCascadeModel:
             'ecosystem_health': 0-100
         }]
         """
+        return list(self.iter_population_trajectory(species_list, time_steps, mode, steps))
+    
+    def iter_population_trajectory(self, species_list: SpeciesInput,
+                                   time_steps: int = 12,
+                                   mode: str = 'iterative',
+                                   steps: List[int] = None) -> Iterator[Dict]:
+        """
+        Same as predict_population_trajectory, but yields one timeline
+        entry at a time (for streaming long simulations)
+        """
+        if mode not in TRAJECTORY_MODES:
+            raise ValueError(f"Unknown trajectory mode: {mode}")
+        if steps is not None and any(step < 0 for step in steps):
+            raise ValueError("Trajectory steps must be non-negative")
         
-        trajectory = []
-        current_species = [dict(s) for s in species_list]  # Copy
-        
-        for step in range(time_steps):
-            # Simulate one time step for each species
-            for species in current_species:
-                # Get food available
-                level = self.get_trophic_level(species.get('trophicLevel'))
-                
-                if level == 0:
-                    # Producer: limited by sun/resources
-                    growth_rate = 0.05
-                else:
-                    # Consumer: depends on food below
-                    growth_rate = 0.03
-                
-                # Apply logistic growth
-                K = species.get('population', 100) * 2  # Carrying capacity
-                P = species.get('population', 100)
-                dP = growth_rate * P * (1 - P / K)
-                
-                species['population'] = max(0, P + dP)
-            
-            # Calculate health
-            health = self._calculate_ecosystem_health(current_species)
-            
-            trajectory.append({
-                'step': step,
-                'month': f'Month {step}',
-                'species_data': {s['name']: int(s['population']) for s in current_species},
-                'ecosystem_health': health
-            })
+        eco = compile_ecosystem(species_list)
+        engine = self._trajectory_engine(eco, mode)
+        
+        if mode == 'analytic':
+            return engine.iter_analytic(time_steps, steps)
+        
+        # All species advance together, one vector update per step
+        return engine.iter_run(time_steps, steps)
+    
+    def predict_population_checkpointed(self, species_list: SpeciesInput,
+                                        time_steps: int = 12,
+                                        mode: str = 'iterative',
+                                        steps: List[int] = None,
+                                        checkpoint: Dict = None) -> Dict:
+        """
+        predict_population_trajectory that can continue an earlier run
+        
+        checkpoint: engine state returned by an earlier call for the
+                    same ecosystem and mode. The run continues from its
+                    step N: steps N..N+time_steps-1 (or the requested
+                    `steps`, none before N) are reported, as if the
+                    whole run had been simulated in one go
+        
+        Returns: {
+            'timeline':   [...] (as predict_population_trajectory),
+            'checkpoint': engine state after the last reported step
+        }
+        """
+        if mode not in TRAJECTORY_MODES:
+            raise ValueError(f"Unknown trajectory mode: {mode}")
+        if steps is not None and any(step < 0 for step in steps):
+            raise ValueError("Trajectory steps must be non-negative")
+        
+        eco = compile_ecosystem(species_list)
+        engine = self._trajectory_engine(eco, mode)
+        if checkpoint is not None:
+            engine.restore(checkpoint)
+        
+        if mode == 'analytic':
+            timeline = engine.run_analytic(time_steps, steps)
+        else:
+            timeline = engine.run(time_steps, steps)
+        return {
+            'timeline': timeline,
+            'checkpoint': engine.checkpoint()
+        }
+    
+    def predict_population_table(self, species_list: SpeciesInput,
+                                 time_steps: int = 12,
+                                 mode: str = 'iterative',
+                                 steps: List[int] = None) -> Dict:
+        """
+        Same trajectory as predict_population_trajectory, as a matrix
+        
+        Returns: {
+            'names': [species names],
+            'steps': [reported steps],
+            'ecosystem_health': [0-100 per step],
+            'populations': NumPy array [steps, species]
+        }
+        """
+        if mode not in TRAJECTORY_MODES:
+            raise ValueError(f"Unknown trajectory mode: {mode}")
+        if steps is not None and any(step < 0 for step in steps):
+            raise ValueError("Trajectory steps must be non-negative")
+        
+        eco = compile_ecosystem(species_list)
+        engine = self._trajectory_engine(eco, mode)
+        return engine.run_table(time_steps, steps, mode)
+    
+    def predict_health_curves(self, species_list: SpeciesInput,
+                              time_steps: int = 12,
+                              mode: str = 'iterative',
+                              steps: List[int] = None) -> Dict:
+        """
+        Health and diversity of every step of the trajectory
+        (see model/health_metrics.py for the metrics)
+        
+        Returns: {
+            'steps': [...], 'ecosystem_health': [...],
+            'shannon': [...], 'simpson': [...], 'stability': [...],
+            'level_biomass': {level: [...]},
+            'biomass_ratios': {'level/level below': [...]}
+        }
+        """
+        if mode not in TRAJECTORY_MODES:
+            raise ValueError(f"Unknown trajectory mode: {mode}")
+        if steps is not None and any(step < 0 for step in steps):
+            raise ValueError("Trajectory steps must be non-negative")
+        
+        eco = compile_ecosystem(species_list)
+        engine = self._trajectory_engine(eco, mode)
+        report_steps, matrix = engine.population_matrix(time_steps, steps, mode)
+        return trajectory_health(report_steps, matrix, eco.levels, eco.population, eco.biomass)
+    
+    def _trajectory_engine(self, eco: CompiledEcosystem, mode: str) -> PopulationEngine:
+        if mode in LOTKA_VOLTERRA_MODES:
+            return LotkaVolterraEngine(
+                eco.names, eco.population, eco.levels, eco.biomass,
+                self.lotka_volterra_parameters(), LOTKA_VOLTERRA_MODES[mode]
+            )
+        return PopulationEngine(eco.names, eco.population, eco.levels)
+    
+    def lotka_volterra_parameters(self) -> Dict[str, float]:
+        """
+        Parameters of the coupled model, from the ecological constants
+        """
+        return {
+            'producer_growth_rate': PopulationEngine.PRODUCER_GROWTH_RATE,
+            'consumer_growth_rate': PopulationEngine.CONSUMER_GROWTH_RATE,
+            'predation_rate': self.PREDATION_RATE,
+            'natural_mortality': self.NATURAL_MORTALITY,
+            'energy_transfer_efficiency': self.ENERGY_TRANSFER_EFFICIENCY,
+            'carrying_capacity_factor': self.CARRYING_CAPACITY_FACTOR
+        }
+    
+    def simulate_parameter_batch(self, species_list: SpeciesInput,
+                                 parameter_sets: Dict[str, np.ndarray],
+                                 time_steps: int = 12, steps: List[int] = None,
+                                 method: str = 'rk45') -> Dict:
+        """
+        Integrate the coupled model for many parameter sets at once
+        
+        parameter_sets: arrays of equal length B for any of the
+                        lotka_volterra_parameters() names; the others
+                        keep their default value
+        
+        Returns: {
+            'names': [species names],
+            'steps': [reported steps],
+            'parameters': {name: array [B]},
+            'populations': NumPy array [B, steps, species]
+        }
+        """
+        unknown = set(parameter_sets) - set(self.lotka_volterra_parameters())
+        if unknown:
+            raise ValueError(f"Unknown Lotka-Volterra parameters: {sorted(unknown)}")
+        if steps is not None and any(step < 0 for step in steps):
+            raise ValueError("Trajectory steps must be non-negative")
+        
+        eco = compile_ecosystem(species_list)
+        parameters = {**self.lotka_volterra_parameters(), **parameter_sets}
+        system = LotkaVolterraSystem(eco.population, eco.levels, eco.biomass, parameters)
         
-        return trajectory
+        report_steps = list(range(time_steps)) if steps is None else sorted(set(steps))
+        populations = system.integrate([step + 1 for step in report_steps], method)
+        return {
+            'names': eco.names,
+            'steps': report_steps,
+            'parameters': system.parameters,
+            'populations': populations
+        }
     
     def _calculate_ecosystem_health(self, species_list: List[Dict]) -> int:
         """
@@ -369,10 +908,28 @@ class EcosystemCascadeModel:
     # 5. EXTINCTION RISK ASSESSMENT
     # ================================================
     
-    def calculate_extinction_risk(self, species_list: List[Dict]) -> List[Dict]:
+    # Risk factors as (points, label), in the order species_risk lists them
+    RISK_FACTORS = (
+        (30, 'Low population'),
+        (20, 'Apex predator (food chain dependent)'),
+        (10, 'Specialized diet'),
+        (15, 'Low biomass')
+    )
+    
+    def calculate_extinction_risk(self, species_list: SpeciesInput,
+                                  top_k: int = None,
+                                  min_score: int = None) -> List[Dict]:
         """
         Assess extinction risk for each species
         
+        Scores are computed for the whole ecosystem with NumPy masks;
+        the result dicts (and their factor lists) are only built for the
+        rows returned:
+        
+        top_k:     only the k riskiest species (partial selection, no
+                   full sort)
+        min_score: only species with risk_score >= min_score
+        
         Returns: [
             {
                 'species': str,
@@ -380,89 +937,204 @@ class EcosystemCascadeModel:
                 'risk_score': 0-100,
                 'risk_factors': [str]
             }
+        ]  (highest risk first, ties in input order)
+        """
+        eco = compile_ecosystem(species_list)
+        scores, codes = self.risk_scores(eco.population, eco.levels, eco.biomass)
+        rows = self.riskiest_rows(scores, top_k, min_score)
+        scores, codes = scores[rows].tolist(), codes[rows].tolist()
+        
+        # Few distinct scores and factor combinations: name each one once
+        level_names = {score: self.risk_level(score) for score in set(scores)}
+        factor_lists = {code: self.risk_factor_labels(code) for code in set(codes)}
+        
+        return [
+            {
+                'species': eco.names[row],
+                'icon': eco.icons[row],
+                'risk_level': level_names[score],
+                'risk_score': min(100, score),
+                'risk_factors': list(factor_lists[code])
+            }
+            for row, score, code in zip(rows.tolist(), scores, codes)
         ]
+    
+    def risk_scores(self, population: np.ndarray, levels: np.ndarray,
+                    biomass: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        species_risk for whole columns: risk scores (before the 100 cap)
+        and a bit code per species of which RISK_FACTORS apply
+        """
+        masks = (population < 50, levels >= 2, levels > 0, biomass < 100)
+        scores = np.full(len(levels), 20, dtype=np.int64)
+        codes = np.zeros(len(levels), dtype=np.int64)
+        for bit, (mask, (points, _)) in enumerate(zip(masks, self.RISK_FACTORS)):
+            scores += points * mask
+            codes |= mask.astype(np.int64) << bit
+        return scores, codes
+    
+    def risk_factor_labels(self, code: int) -> List[str]:
+        """
+        Factor strings for a bit code from risk_scores
+        """
+        return [label for bit, (_, label) in enumerate(self.RISK_FACTORS) if code >> bit & 1]
+    
+    def riskiest_rows(self, scores: np.ndarray, top_k: int = None,
+                      min_score: int = None) -> np.ndarray:
+        """
+        Row indices ordered by risk (highest first, ties in input order),
+        keeping rows >= min_score and at most top_k of them
         """
-        risks = []
+        rows = np.arange(len(scores))
+        if min_score is not None:
+            rows = rows[np.minimum(scores[rows], 100) >= min_score]
         
-        for species in species_list:
-            risk_factors = []
-            risk_score = 20  # Base risk
-            
-            # Low population = higher risk
-            pop = species.get('population', 100)
-            if pop < 50:
-                risk_score += 30
-                risk_factors.append('Low population')
-            
-            # High trophic level = higher risk
-            level = self.get_trophic_level(species.get('trophicLevel'))
-            if level >= 2:
-                risk_score += 20
-                risk_factors.append('Apex predator (food chain dependent)')
-            
-            # Specialized diet = higher risk
-            # (Herbivores less risky, carnivores more risky)
-            if level > 0:
-                risk_score += 10
-                risk_factors.append('Specialized diet')
-            
-            # Low biomass = higher risk
-            biomass = species.get('biomass', 100)
-            if biomass < 100:
-                risk_score += 15
-                risk_factors.append('Low biomass')
-            
-            # Determine risk level
-            if risk_score >= 80:
-                risk_level = 'CRITICAL 🔴'
-            elif risk_score >= 60:
-                risk_level = 'HIGH 🟠'
-            elif risk_score >= 40:
-                risk_level = 'MODERATE 🟡'
-            else:
-                risk_level = 'LOW 🟢'
-            
-            risks.append({
-                'species': species['name'],
-                'icon': species.get('icon', '🔹'),
-                'risk_level': risk_level,
-                'risk_score': min(100, risk_score),
-                'risk_factors': risk_factors
-            })
+        # Unique sort key: score descending, then row ascending
+        keys = -scores[rows] * len(scores) + rows
+        if top_k is not None and top_k < len(rows):
+            # Partial selection of the k smallest keys, then sort only those
+            rows = rows[np.argpartition(keys, top_k - 1)[:top_k]]
+            keys = -scores[rows] * len(scores) + rows
+        return rows[np.argsort(keys)]
+    
+    def species_risk(self, population: float, level: int, biomass: float) -> Tuple[int, List[str]]:
+        """
+        Risk score (before the 100 cap) and risk factors of one species
+        """
+        risk_factors = []
+        risk_score = 20  # Base risk
+        
+        # Low population = higher risk
+        if population < 50:
+            risk_score += 30
+            risk_factors.append('Low population')
+        
+        # High trophic level = higher risk
+        if level >= 2:
+            risk_score += 20
+            risk_factors.append('Apex predator (food chain dependent)')
+        
+        # Specialized diet = higher risk
+        # (Herbivores less risky, carnivores more risky)
+        if level > 0:
+            risk_score += 10
+            risk_factors.append('Specialized diet')
         
-        # Sort by risk (highest first)
-        risks.sort(key=lambda x: x['risk_score'], reverse=True)
+        # Low biomass = higher risk
+        if biomass < 100:
+            risk_score += 15
+            risk_factors.append('Low biomass')
         
-        return risks
+        return risk_score, risk_factors
+    
+    def risk_level(self, risk_score: int) -> str:
+        """
+        Risk category for a risk score
+        """
+        if risk_score >= 80:
+            return 'CRITICAL 🔴'
+        elif risk_score >= 60:
+            return 'HIGH 🟠'
+        elif risk_score >= 40:
+            return 'MODERATE 🟡'
+        else:
+            return 'LOW 🟢'
 
 # ================================================
 # EXPORTED FUNCTIONS FOR API
 # ================================================
+# Every entry point accepts a species list or a CompiledEcosystem from
+# compile_ecosystem(), so several analyses of the same pyramid can share
+# one compiled copy.
 
-def analyze_cascade(species_data: List[Dict], target_species: Dict) -> Dict:
+def analyze_cascade(species_data: SpeciesInput, target_species: Dict,
+                    seed: int = None, ensemble_size: int = None,
+                    food_web=None) -> Dict:
     """
     Main entry point for cascade analysis
+    (pass a seed for reproducible results, and optionally the
+    predator -> prey links of the food web)
+    """
+    model = EcosystemCascadeModel(seed=seed)
+    return model.predict_cascade_effect(species_data, target_species, ensemble_size, food_web)
+
+def analyze_keystones(species_data: SpeciesInput) -> Dict:
+    """
+    Main entry point for the all-targets keystone sweep
     """
     model = EcosystemCascadeModel()
-    return model.predict_cascade_effect(species_data, target_species)
+    return model.predict_keystone_sweep(species_data)
 
-def analyze_invasive(species_data: List[Dict], invasive: Dict, strength: int = 5) -> Dict:
+def analyze_invasive(species_data: SpeciesInput, invasive: Dict, strength: int = 5) -> Dict:
     """
     Main entry point for invasive species analysis
     """
     model = EcosystemCascadeModel()
     return model.predict_invasive_species_impact(species_data, invasive, strength)
 
-def predict_populations(species_data: List[Dict], time_steps: int = 12) -> List[Dict]:
+def analyze_invasive_sweep(species_data: SpeciesInput, candidates: List[Dict],
+                           strengths: List[int] = None) -> Dict:
+    """
+    Main entry point for the candidates x strengths invasive sweep
+    """
+    model = EcosystemCascadeModel()
+    return model.predict_invasive_sweep(species_data, candidates, strengths)
+
+def predict_populations(species_data: SpeciesInput, time_steps: int = 12,
+                        mode: str = 'iterative', steps: List[int] = None) -> List[Dict]:
     """
     Main entry point for population trajectory prediction
     """
     model = EcosystemCascadeModel()
-    return model.predict_population_trajectory(species_data, time_steps)
+    return model.predict_population_trajectory(species_data, time_steps, mode, steps)
+
+def predict_populations_checkpointed(species_data: SpeciesInput, time_steps: int = 12,
+                                    mode: str = 'iterative', steps: List[int] = None,
+                                    checkpoint: Dict = None) -> Dict:
+    """
+    Main entry point for trajectories that continue from / return a checkpoint
+    """
+    model = EcosystemCascadeModel()
+    return model.predict_population_checkpointed(species_data, time_steps, mode, steps, checkpoint)
+
+def predict_population_table(species_data: SpeciesInput, time_steps: int = 12,
+                             mode: str = 'iterative', steps: List[int] = None) -> Dict:
+    """
+    Main entry point for matrix-shaped trajectory prediction
+    """
+    model = EcosystemCascadeModel()
+    return model.predict_population_table(species_data, time_steps, mode, steps)
+
+def predict_health_curves(species_data: SpeciesInput, time_steps: int = 12,
+                          mode: str = 'iterative', steps: List[int] = None) -> Dict:
+    """
+    Main entry point for per-step health and diversity curves
+    """
+    model = EcosystemCascadeModel()
+    return model.predict_health_curves(species_data, time_steps, mode, steps)
+
+def simulate_parameter_batch(species_data: SpeciesInput, parameter_sets: Dict,
+                             time_steps: int = 12, steps: List[int] = None,
+                             method: str = 'rk45') -> Dict:
+    """
+    Main entry point for batched Lotka-Volterra runs (parameter sweeps)
+    """
+    model = EcosystemCascadeModel()
+    return model.simulate_parameter_batch(species_data, parameter_sets, time_steps, steps, method)
+
+def stream_populations(species_data: SpeciesInput, time_steps: int = 12,
+                       mode: str = 'iterative', steps: List[int] = None) -> Iterator[Dict]:
+    """
+    Main entry point for streamed trajectory prediction (one step at a time)
+    """
+    model = EcosystemCascadeModel()
+    return model.iter_population_trajectory(species_data, time_steps, mode, steps)
 
-def assess_extinction_risks(species_data: List[Dict]) -> List[Dict]:
+def assess_extinction_risks(species_data: SpeciesInput, top_k: int = None,
+                            min_score: int = None) -> List[Dict]:
     """
     Main entry point for extinction risk assessment
+    (optionally only the top_k riskiest / those scoring >= min_score)
     """
     model = EcosystemCascadeModel()
-    return model.calculate_extinction_risk(species_data)
\ No newline at end of file
+    return model.calculate_extinction_risk(species_data, top_k, min_score)
\ No newline at end of file
@@ -0,0 +1,152 @@
+"""
+ecosystem.py
+
+BEGINNER GUIDE: Compiled ecosystem representation
+
+Every analysis needs the same things from a species list: each
+species' trophic level as a number, the groups of species per level,
+and the numeric columns (biomass, energy, population).
+
+CompiledEcosystem builds all of that ONCE per species list:
+
+    levels        -> int8 level code per species (producer = 0)
+    level_index   -> indices of the species at each level
+    level_counts  -> number of species at each level
+    biomass, energy, population -> float64 columns
+
+The model functions accept either a plain species list or a
+CompiledEcosystem, so a client running several analyses on the same
+pyramid only pays the parsing and grouping cost once.
+"""
+
+import hashlib
+import json
+import numpy as np
+from typing import List, Dict, Sequence, Union
+
+# Trophic level string -> level code (unknown strings count as producers)
+TROPHIC_LEVELS = {
+    'producer': 0,
+    'primary_consumer': 1,
+    'secondary_consumer': 2,
+    'tertiary_consumer': 3
+}
+TROPHIC_LEVEL_NAMES = list(TROPHIC_LEVELS)
+NUM_TROPHIC_LEVELS = len(TROPHIC_LEVELS)
+
+DEFAULT_ICON = '🔹'
+
+
+class CompiledEcosystem:
+    """
+    Column-oriented, read-only view of a species list
+    """
+
+    def __init__(self, names: Sequence[str], levels: Sequence[int],
+                 biomass: Sequence[float], energy: Sequence[float],
+                 population: Sequence[float], icons: Sequence[str] = None):
+        self.names = list(names)
+        self.icons = list(icons) if icons is not None else [DEFAULT_ICON] * len(self.names)
+
+        self.levels = _frozen(np.asarray(levels, dtype=np.int8).reshape(-1))
+        self.biomass = _frozen(np.asarray(biomass, dtype=np.float64).reshape(-1))
+        self.energy = _frozen(np.asarray(energy, dtype=np.float64).reshape(-1))
+        self.population = _frozen(np.asarray(population, dtype=np.float64).reshape(-1))
+
+        # Level index: which species sit at each trophic level
+        order = np.argsort(self.levels, kind='stable')
+        self.level_counts = _frozen(np.bincount(self.levels, minlength=NUM_TROPHIC_LEVELS))
+        bounds = np.concatenate(([0], np.cumsum(self.level_counts)))
+        self.level_index = [
+            _frozen(order[bounds[level]:bounds[level + 1]])
+            for level in range(NUM_TROPHIC_LEVELS)
+        ]
+
+        self._name_array = None
+        self._fingerprint = None
+
+    @classmethod
+    def from_species(cls, species_list: List[Dict]) -> 'CompiledEcosystem':
+        """
+        Compile a list of species dicts (as sent by the frontend)
+        """
+        return cls(
+            names=[s['name'] for s in species_list],
+            levels=[TROPHIC_LEVELS.get(s.get('trophicLevel'), 0) for s in species_list],
+            biomass=[s.get('biomass', 100) for s in species_list],
+            energy=[s.get('energy', 0) for s in species_list],
+            population=[s.get('population', 100) for s in species_list],
+            icons=[s.get('icon', DEFAULT_ICON) for s in species_list]
+        )
+
+    @classmethod
+    def from_columns(cls, name: Sequence[str], trophicLevel: Sequence[str],
+                     biomass: Sequence[float], energy: Sequence[float],
+                     population: Sequence[float],
+                     icon: Sequence[str] = None) -> 'CompiledEcosystem':
+        """
+        Compile parallel arrays (one entry per species) without building
+        a dict per species. Numeric columns may already be NumPy arrays.
+        """
+        return cls(
+            names=name,
+            levels=[TROPHIC_LEVELS.get(level, 0) for level in trophicLevel],
+            biomass=biomass,
+            energy=energy,
+            population=population,
+            icons=icon
+        )
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    @property
+    def name_array(self) -> np.ndarray:
+        """
+        Names as a NumPy object array (for vectorized comparisons)
+        """
+        if self._name_array is None:
+            self._name_array = _frozen(np.array(self.names, dtype=object).reshape(-1))
+        return self._name_array
+
+    def fingerprint(self) -> str:
+        """
+        SHA-256 of the columns a trajectory depends on (names, levels,
+        biomass, population): equal for the same ecosystem, whether it
+        was sent as records or as columns
+        """
+        if self._fingerprint is None:
+            digest = hashlib.sha256()
+            digest.update(json.dumps(self.names, ensure_ascii=False).encode('utf-8'))
+            for column in (self.levels, self.biomass, self.population):
+                digest.update(b'\0')
+                digest.update(column.tobytes())
+            self._fingerprint = digest.hexdigest()
+        return self._fingerprint
+
+    def level_totals(self, column: np.ndarray) -> np.ndarray:
+        """
+        Sum of a per-species column for each trophic level
+        """
+        return np.bincount(self.levels, weights=column, minlength=NUM_TROPHIC_LEVELS)
+
+
+# What the model functions accept: raw species dicts or a compiled ecosystem
+SpeciesInput = Union[List[Dict], CompiledEcosystem]
+
+
+def compile_ecosystem(species: SpeciesInput) -> CompiledEcosystem:
+    """
+    Return `species` as a CompiledEcosystem (no-op if already compiled)
+    """
+    if isinstance(species, CompiledEcosystem):
+        return species
+    return CompiledEcosystem.from_species(species)
+
+
+def _frozen(array: np.ndarray) -> np.ndarray:
+    """
+    Mark an array read-only so it can be shared between analyses safely
+    """
+    array.setflags(write=False)
+    return array
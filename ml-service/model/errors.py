@@ -0,0 +1,10 @@
+"""
+errors.py
+
+Errors the model raises on purpose. Kept free of NumPy and other heavy
+imports so the API can register its handlers without loading the model.
+"""
+
+
+class PopulationOverflow(ValueError):
+    """Populations grew too large (or undefined) to be represented"""
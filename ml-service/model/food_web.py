@@ -0,0 +1,218 @@
+"""
+food_web.py
+
+BEGINNER GUIDE: Sparse food-web graph
+
+Without a food web, the cascade model assumes every species one
+trophic level above the target eats it. With a food web, the client
+says exactly who eats whom:
+
+    links = [('Fox', 'Rabbit'), ('Hawk', 'Rabbit'), ('Hawk', 'Mouse'), ...]
+             (predator, prey)
+
+Millions of links would be far too many Python objects, so the graph is
+stored as two CSR ("compressed sparse row") arrays, one per direction:
+
+    prey_of       row = predator, columns = its prey
+    predators_of  row = prey,     columns = its predators
+
+    indptr[i]:indptr[i + 1]  -> slice of `indices` holding row i
+
+Removing a species then becomes two array passes:
+
+    1. breadth-first search from the target UP through predators_of,
+       one whole frontier at a time -> graph distance of every species
+    2. one sparse matrix-vector product over prey_of -> for every
+       predator, the share of its diet that was lost
+"""
+
+import numpy as np
+from typing import Dict, Sequence, Union
+
+# A link endpoint: species index or species name
+SpeciesRef = Union[int, str]
+
+
+class FoodWeb:
+    """
+    Predator -> prey links of an ecosystem, in CSR form (both directions)
+    """
+
+    def __init__(self, num_species: int, predators: Sequence[int], prey: Sequence[int]):
+        """
+        num_species: number of species (graph nodes)
+        predators:   predator index of every link
+        prey:        prey index of every link (same length)
+        """
+        predators = np.asarray(predators, dtype=np.int64).reshape(-1)
+        prey = np.asarray(prey, dtype=np.int64).reshape(-1)
+        if len(predators) != len(prey):
+            raise ValueError("Food web needs as many predators as prey")
+        if len(predators) and (
+            min(predators.min(), prey.min()) < 0
+            or max(predators.max(), prey.max()) >= num_species
+        ):
+            raise ValueError("Food web link refers to an unknown species")
+
+        # Each link as one int64 code, sorted by (predator, prey); plain
+        # sorts of int64 codes are much faster than argsort/np.unique
+        keep = predators != prey  # no self-loops
+        codes = _unique(predators[keep] * num_species + prey[keep])
+        predators, prey = np.divmod(codes, num_species)
+
+        self.num_species = num_species
+        self.num_links = len(codes)
+
+        # predator -> prey rows
+        self.link_predator = predators
+        self.prey_indptr = _indptr(predators, num_species)
+        self.prey_indices = prey
+
+        # prey -> predator rows: the same links sorted by (prey, predator)
+        reverse = np.sort(prey * num_species + predators)
+        self.predator_indptr = _indptr(reverse // num_species, num_species)
+        self.predator_indices = reverse % num_species
+
+        # Diet breadth: number of prey of each species
+        self.diet_size = np.diff(self.prey_indptr)
+
+    @classmethod
+    def from_links(cls, names: Sequence[str], predators: Sequence[SpeciesRef],
+                   prey: Sequence[SpeciesRef]) -> 'FoodWeb':
+        """
+        Build from link endpoints given as species indices or names
+
+        Names refer to the first species with that name.
+        """
+        return cls(
+            len(names),
+            resolve_species(names, predators),
+            resolve_species(names, prey)
+        )
+
+    def predators(self, species: int) -> np.ndarray:
+        """Indices of the species that eat `species`"""
+        return self.predator_indices[self.predator_indptr[species]:self.predator_indptr[species + 1]]
+
+    def prey(self, species: int) -> np.ndarray:
+        """Indices of the species eaten by `species`"""
+        return self.prey_indices[self.prey_indptr[species]:self.prey_indptr[species + 1]]
+
+    def predator_distances(self, sources: Sequence[int]) -> np.ndarray:
+        """
+        Breadth-first search from `sources` up the food web
+
+        Returns the number of predator links between each species and
+        the nearest source (0 for the sources, -1 if unreachable).
+        """
+        distance = np.full(self.num_species, -1, dtype=np.int64)
+        frontier = _unique(np.asarray(sources, dtype=np.int64))
+        distance[frontier] = 0
+
+        depth = 0
+        while len(frontier):
+            depth += 1
+            neighbours = _gather_rows(self.predator_indptr, self.predator_indices, frontier)
+            frontier = _unique(neighbours[distance[neighbours] < 0])
+            distance[frontier] = depth
+        return distance
+
+    def diet_lost(self, lost: np.ndarray) -> np.ndarray:
+        """
+        Share of each species' diet that is lost (0-1)
+
+        `lost` flags the species that are gone or declining. One sparse
+        matrix-vector product: lost prey per predator / diet size.
+        """
+        lost_prey = np.bincount(
+            self.link_predator, weights=lost[self.prey_indices].astype(np.float64),
+            minlength=self.num_species
+        )
+        with np.errstate(divide='ignore', invalid='ignore'):
+            share = lost_prey / self.diet_size
+        share[self.diet_size == 0] = 0
+        return share
+
+    def stats(self) -> Dict:
+        return {
+            'num_species': self.num_species,
+            'num_links': self.num_links,
+            'max_diet_size': int(self.diet_size.max()) if self.num_species else 0
+        }
+
+
+def resolve_species(names: Sequence[str], refs: Sequence[SpeciesRef]) -> np.ndarray:
+    """
+    Turn link endpoints (indices or names) into species indices
+    """
+    if isinstance(refs, np.ndarray) and refs.dtype.kind in 'iu':
+        return refs.astype(np.int64)
+    refs = list(refs)
+    if all(isinstance(ref, (int, np.integer)) for ref in refs):
+        return np.asarray(refs, dtype=np.int64).reshape(-1)
+
+    index_of = {}
+    for index, name in enumerate(names):
+        index_of.setdefault(name, index)
+
+    indices = np.empty(len(refs), dtype=np.int64)
+    for k, ref in enumerate(refs):
+        if isinstance(ref, str):
+            if ref not in index_of:
+                raise ValueError(f"Food web link refers to unknown species '{ref}'")
+            indices[k] = index_of[ref]
+        else:
+            indices[k] = int(ref)
+    return indices
+
+
+def _unique(values: np.ndarray) -> np.ndarray:
+    """Sorted unique values (sort + mask; faster than np.unique here)"""
+    values = np.sort(values)
+    if len(values) < 2:
+        return values
+    return values[np.concatenate(([True], values[1:] != values[:-1]))]
+
+
+def _indptr(rows: np.ndarray, num_rows: int) -> np.ndarray:
+    """CSR row pointer for row indices sorted ascending"""
+    indptr = np.zeros(num_rows + 1, dtype=np.int64)
+    np.cumsum(np.bincount(rows, minlength=num_rows), out=indptr[1:])
+    return indptr
+
+
+def _gather_rows(indptr: np.ndarray, indices: np.ndarray, rows: np.ndarray) -> np.ndarray:
+    """
+    Concatenate the CSR rows `rows` without a Python loop
+    """
+    starts = indptr[rows]
+    counts = indptr[rows + 1] - starts
+    total = int(counts.sum())
+    if total == 0:
+        return np.empty(0, dtype=indices.dtype)
+
+    # Position k of the output reads indices[start of its row + offset in row]
+    row_offsets = np.cumsum(counts) - counts
+    positions = np.repeat(starts - row_offsets, counts) + np.arange(total)
+    return indices[positions]
+
+
+def build_food_web(names: Sequence[str], links) -> FoodWeb:
+    """
+    Accept the food web in any of the shapes clients send:
+
+        FoodWeb instance                          -> used as is
+        {'predator': [...], 'prey': [...]}        -> parallel columns
+        [(predator, prey), ...]                   -> list of pairs
+
+    Endpoints may be species indices or names.
+    """
+    if isinstance(links, FoodWeb):
+        if links.num_species != len(names):
+            raise ValueError("Food web was built for a different ecosystem")
+        return links
+    if isinstance(links, dict):
+        return FoodWeb.from_links(names, links['predator'], links['prey'])
+    predators = [link[0] for link in links]
+    prey = [link[1] for link in links]
+    return FoodWeb.from_links(names, predators, prey)
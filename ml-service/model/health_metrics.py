@@ -0,0 +1,190 @@
+"""
+health_metrics.py
+
+BEGINNER GUIDE: Health curves for whole trajectories
+
+The timeline only scores each step with one number (ecosystem_health:
+species count + population variance). This module describes every step
+of a trajectory in more detail, straight from the steps x species
+population matrix:
+
+    ecosystem_health  the usual 0-100 score (same as the timeline)
+    shannon           Shannon diversity  H = -sum(p * ln p)
+    simpson           Simpson diversity  D = 1 - sum(p^2)
+                      (p = share of each species in the total population)
+    level_biomass     biomass of each trophic level (a species' biomass
+                      grows and shrinks with its population)
+    biomass_ratios    biomass of each level / the level below it
+                      (a healthy pyramid is around 0.1)
+    stability         1 - Bray-Curtis change since the previous step:
+                      1 = nothing changed, 0 = completely different
+                      (the first step is compared with the start state)
+
+Every metric is ONE column-wise reduction over the whole matrix (a
+per-species term summed per group with np.add.reduceat); there is no
+Python loop over steps. Groups are ecosystems, or (ecosystem, level)
+pairs, so a batch of ecosystems stored side by side (model/batch.py)
+is handled by the very same reductions.
+"""
+
+import numpy as np
+from typing import Dict, List, Sequence
+
+from model.ecosystem import NUM_TROPHIC_LEVELS, TROPHIC_LEVEL_NAMES
+from model.population_engine import ecosystem_health_rows
+
+# Digits kept in the reported floats
+_DIGITS = 6
+
+
+def trajectory_health(steps: Sequence[int], matrix: np.ndarray, levels: Sequence[int],
+                      initial_populations: Sequence[float],
+                      biomass: Sequence[float]) -> Dict:
+    """
+    Health curves of one trajectory
+
+    steps:               reported step of each matrix row
+    matrix:              populations [steps, species]
+    levels:              trophic level code of each species
+    initial_populations: start population of each species
+    biomass:             start biomass of each species
+
+    Returns: {
+        'steps': [...],
+        'ecosystem_health': [0-100 per step],
+        'shannon': [...], 'simpson': [...], 'stability': [...],
+        'level_biomass': {'producer': [...], ...},
+        'biomass_ratios': {'primary_consumer/producer': [...], ...}
+                          (None where the level below has no biomass)
+    }
+    """
+    num_species = np.shape(matrix)[1]
+    return batch_trajectory_health(
+        steps, matrix, levels, initial_populations, biomass, [0, num_species]
+    )[0]
+
+
+def batch_trajectory_health(steps: Sequence[int], matrix: np.ndarray,
+                            levels: Sequence[int], initial_populations: Sequence[float],
+                            biomass: Sequence[float], offsets: Sequence[int]) -> List[Dict]:
+    """
+    trajectory_health for several ecosystems stored side by side:
+    ecosystem e owns columns offsets[e]:offsets[e + 1] of every input
+    """
+    matrix = np.asarray(matrix, dtype=np.float64).reshape(len(steps), -1)
+    offsets = np.asarray(offsets, dtype=np.int64)
+    metrics = health_metrics(
+        matrix, levels, initial_populations, biomass,
+        np.repeat(np.arange(len(offsets) - 1), np.diff(offsets)), len(offsets) - 1
+    )
+    steps = list(steps)
+    # Per ecosystem lists, each converted in one go: [ecosystem][(level,) step]
+    curves = {name: _rounded(values) for name, values in metrics.items()}
+    ratio_names = [
+        f'{TROPHIC_LEVEL_NAMES[level + 1]}/{TROPHIC_LEVEL_NAMES[level]}'
+        for level in range(NUM_TROPHIC_LEVELS - 1)
+    ]
+
+    results = []
+    for index in range(len(offsets) - 1):
+        columns = slice(int(offsets[index]), int(offsets[index + 1]))
+        results.append({
+            'steps': steps,
+            'ecosystem_health': ecosystem_health_rows(matrix[:, columns]),
+            'shannon': curves['shannon'][index],
+            'simpson': curves['simpson'][index],
+            'stability': curves['stability'][index],
+            'level_biomass': dict(zip(TROPHIC_LEVEL_NAMES, curves['level_biomass'][index])),
+            'biomass_ratios': dict(zip(ratio_names, curves['biomass_ratios'][index]))
+        })
+    return results
+
+
+def health_metrics(matrix: np.ndarray, levels: Sequence[int],
+                   initial_populations: Sequence[float], biomass: Sequence[float],
+                   ecosystem: Sequence[int], num_ecosystems: int) -> Dict[str, np.ndarray]:
+    """
+    The raw metric arrays
+
+    ecosystem: ecosystem index of each species (column)
+
+    Returns: {
+        'shannon', 'simpson', 'stability': [steps, ecosystems],
+        'level_biomass':  [steps, ecosystems, levels],
+        'biomass_ratios': [steps, ecosystems, levels - 1] (NaN where
+                          the level below has no biomass)
+    }
+    """
+    levels = np.asarray(levels, dtype=np.int64)
+    ecosystem = np.asarray(ecosystem, dtype=np.int64)
+    initial = np.asarray(initial_populations, dtype=np.float64)
+    biomass = np.asarray(biomass, dtype=np.float64)
+    num_steps = len(matrix)
+
+    with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+        totals = _group_sums(matrix, ecosystem, num_ecosystems)
+        alive = totals > 0
+
+        # Diversity from each species' share of its ecosystem
+        share = matrix / totals[:, ecosystem]
+        shannon = -_group_sums(np.where(share > 0, share * np.log(share), 0.0),
+                               ecosystem, num_ecosystems)
+        simpson = 1 - _group_sums(share * share, ecosystem, num_ecosystems)
+
+        # Biomass per species scales with its population
+        per_individual = np.where(initial > 0, biomass / initial, 0.0)
+        level_biomass = _group_sums(
+            matrix * per_individual, ecosystem * NUM_TROPHIC_LEVELS + levels,
+            num_ecosystems * NUM_TROPHIC_LEVELS
+        ).reshape(num_steps, num_ecosystems, NUM_TROPHIC_LEVELS)
+        below = level_biomass[:, :, :-1]
+        ratios = np.where(below > 0, level_biomass[:, :, 1:] / below, np.nan)
+
+        # Bray-Curtis change from the previous row (the start state for row 0)
+        previous = np.vstack((initial[None, :], matrix[:-1])) if num_steps else matrix
+        previous_totals = np.vstack((
+            _group_sums(initial[None, :], ecosystem, num_ecosystems), totals[:-1]
+        )) if num_steps else totals
+        change = _group_sums(np.abs(matrix - previous), ecosystem, num_ecosystems)
+        scale = totals + previous_totals
+        stability = np.where(scale > 0, 1 - change / scale, 1.0)
+
+    return {
+        'shannon': np.where(alive, shannon, 0.0),
+        'simpson': np.where(alive, simpson, 0.0),
+        'stability': stability,
+        'level_biomass': level_biomass,
+        'biomass_ratios': ratios
+    }
+
+
+def _group_sums(values: np.ndarray, group: np.ndarray, num_groups: int) -> np.ndarray:
+    """
+    Sum the columns of `values` [rows, columns] per group -> [rows, groups]
+    (one np.add.reduceat over the columns sorted by group)
+    """
+    counts = np.bincount(group, minlength=num_groups)
+    result = np.zeros((values.shape[0], num_groups))
+    nonempty = counts > 0
+    if values.shape[0] == 0 or not nonempty.any():
+        return result
+
+    if np.all(group[:-1] <= group[1:]):
+        ordered = values
+    else:
+        ordered = values[:, np.argsort(group, kind='stable')]
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    result[:, nonempty] = np.add.reduceat(ordered, starts[nonempty], axis=1)
+    return result
+
+
+def _rounded(values: np.ndarray) -> List:
+    """
+    [steps, ecosystems, ...] array -> nested lists [ecosystem][...][step]
+    of rounded floats, NaN / inf as None (JSON has neither)
+    """
+    rounded = np.moveaxis(np.round(values, _DIGITS), 0, -1)
+    finite = np.isfinite(rounded)
+    if finite.all():
+        return rounded.tolist()
+    return np.where(finite, rounded, None).tolist()
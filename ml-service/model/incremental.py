@@ -0,0 +1,331 @@
+"""
+incremental.py
+
+BEGINNER GUIDE: An ecosystem that updates itself change by change
+
+The builder UI changes one organism at a time. Re-analysing the whole
+species list after every drag costs O(N). IncrementalEcosystem keeps
+the numbers the analyses need and adjusts them for each change:
+
+    per trophic level  -> species count, biomass, energy, population
+    populations        -> running mean and variance (Welford's method,
+                          which also works backwards for removals)
+    every species      -> its extinction risk score and factors
+    risk categories    -> how many species are CRITICAL / HIGH / ...
+
+add / remove / update are O(1) (a few additions), so the ecosystem
+health and the level summary are always ready without a full pass.
+
+Running sums collect floating-point rounding over many changes, so all
+aggregates are recomputed from scratch every RESYNC_EVERY changes
+(amortized O(1) per change).
+
+For the full analyses (cascade, trajectory, ...) compiled() returns a
+CompiledEcosystem of the current species, rebuilt only after changes.
+That rebuild is O(N); a server takes a snapshot() instead (a cheap
+copy of the record list), compiles it with compile_records() off the
+event loop and hands the result back with store_compiled().
+"""
+
+import math
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from model.cascade_model import EcosystemCascadeModel
+from model.ecosystem import (
+    CompiledEcosystem,
+    DEFAULT_ICON,
+    NUM_TROPHIC_LEVELS,
+    TROPHIC_LEVELS,
+    TROPHIC_LEVEL_NAMES
+)
+
+# Fields a species update may change
+SPECIES_FIELDS = ('name', 'icon', 'trophicLevel', 'biomass', 'energy', 'population')
+
+# Rough memory cost of one species (dict, floats, factor list) in bytes
+SPECIES_BYTES = 640
+
+
+class IncrementalEcosystem:
+    """
+    Species keyed by integer id, with aggregates maintained per change
+    """
+
+    RESYNC_EVERY = 4096
+
+    def __init__(self, species_list: Iterable[Dict] = ()):
+        self._risk_model = EcosystemCascadeModel()
+        self._species: Dict[int, Dict] = {}
+        self._next_id = 0
+        self.version = 0
+        self._changes_since_resync = 0
+        self._compiled: Optional[CompiledEcosystem] = None
+        self._compiled_version = -1
+
+        # Bulk load: insert everything, then compute the aggregates once
+        for species in species_list:
+            self._species[self._next_id] = self._make_record(species)
+            self._next_id += 1
+        self.resync()
+
+    # ================================================
+    # CHANGES
+    # ================================================
+
+    def add(self, species: Dict) -> int:
+        """Add a species, returns its id"""
+        species_id = self._next_id
+        self._next_id += 1
+
+        record = self._make_record(species)
+        self._species[species_id] = record
+        self._include(record)
+        self._changed()
+        return species_id
+
+    def remove(self, species_id: int) -> Dict:
+        """Remove a species, returns its data"""
+        record = self._species.pop(self._existing(species_id))
+        self._exclude(record)
+        self._changed()
+        return self._public(record)
+
+    def update(self, species_id: int, changes: Dict) -> Dict:
+        """Change some fields of a species (keeps its id and position)"""
+        old = self._species[self._existing(species_id)]
+        merged = {field: old[field] for field in SPECIES_FIELDS}
+        merged.update({k: v for k, v in changes.items() if k in SPECIES_FIELDS and v is not None})
+
+        record = self._make_record(merged)
+        self._exclude(old)
+        self._species[species_id] = record
+        self._include(record)
+        self._changed()
+        return self._public(record)
+
+    def __contains__(self, species_id: int) -> bool:
+        return species_id in self._species
+
+    def __len__(self) -> int:
+        return len(self._species)
+
+    @property
+    def next_id(self) -> int:
+        """Id the next added species will get"""
+        return self._next_id
+
+    def ids(self) -> List[int]:
+        return list(self._species)
+
+    # ================================================
+    # QUERIES (O(levels))
+    # ================================================
+
+    def population_stats(self) -> Dict:
+        """Mean and (population) variance of the species populations"""
+        if self._n == 0:
+            return {'mean': 0.0, 'variance': 0.0}
+        return {'mean': self._mean, 'variance': max(0.0, self._m2 / self._n)}
+
+    def ecosystem_health(self) -> int:
+        """
+        Same score as EcosystemCascadeModel._calculate_ecosystem_health
+        """
+        if self._n == 0:
+            return 0
+
+        diversity = min(50, self._n * 10)
+        stats = self.population_stats()
+        if stats['mean'] == 0:
+            stability = 0  # 0/0 in the batch version, which counts as 0
+        else:
+            stability = max(0, 50 - stats['variance'] / stats['mean'] * 10)
+        if math.isnan(stability):
+            stability = 0
+        return int(diversity + stability)
+
+    def level_summary(self) -> List[Dict]:
+        return [
+            {
+                'trophic_level': TROPHIC_LEVEL_NAMES[level],
+                'count': self._level_count[level],
+                'biomass': self._level_biomass[level],
+                'energy': self._level_energy[level],
+                'population': self._level_population[level]
+            }
+            for level in range(NUM_TROPHIC_LEVELS)
+        ]
+
+    def risk_counts(self) -> Dict[str, int]:
+        return dict(self._risk_counts)
+
+    def summary(self) -> Dict:
+        return {
+            'num_species': self._n,
+            'version': self.version,
+            'ecosystem_health': self.ecosystem_health(),
+            'population': self.population_stats(),
+            'levels': self.level_summary(),
+            'risk_counts': self.risk_counts()
+        }
+
+    # ================================================
+    # FULL VIEWS (O(N))
+    # ================================================
+
+    def risks(self) -> List[Dict]:
+        """
+        Same list as calculate_extinction_risk, from the kept scores
+        """
+        risks = [
+            {
+                'species': record['name'],
+                'icon': record['icon'],
+                'risk_level': record['risk_level'],
+                'risk_score': min(100, record['risk_score']),
+                'risk_factors': list(record['risk_factors'])
+            }
+            for record in self._species.values()
+        ]
+        risks.sort(key=lambda x: x['risk_score'], reverse=True)
+        return risks
+
+    def species(self) -> List[Dict]:
+        """Current species, with their ids, in insertion order"""
+        return [
+            {'id': species_id, **self._public(record)}
+            for species_id, record in self._species.items()
+        ]
+
+    def compiled(self) -> CompiledEcosystem:
+        """
+        CompiledEcosystem of the current species (cached per version)
+        """
+        if self._compiled_version != self.version:
+            self.store_compiled(self.version, compile_records(self._species.values()))
+        return self._compiled
+
+    def snapshot(self) -> Tuple[int, List[Dict]]:
+        """
+        (version, species records) as they are now
+
+        Changes replace records instead of editing them, so later changes
+        do not reach the snapshot: it can be compiled on another thread.
+        """
+        return self.version, list(self._species.values())
+
+    def compiled_for(self, version: int) -> Optional[CompiledEcosystem]:
+        """The cached CompiledEcosystem of `version`, if there is one"""
+        return self._compiled if self._compiled_version == version else None
+
+    def store_compiled(self, version: int, compiled: CompiledEcosystem):
+        """Cache the compile_records() of a snapshot (unless a newer one is cached)"""
+        if version >= self._compiled_version:
+            self._compiled = compiled
+            self._compiled_version = version
+
+    def memory_estimate(self) -> int:
+        """Approximate memory use in bytes"""
+        return 1024 + SPECIES_BYTES * len(self._species)
+
+    # ================================================
+    # AGGREGATE BOOKKEEPING
+    # ================================================
+
+    def _make_record(self, species: Dict) -> Dict:
+        trophic_level = species.get('trophicLevel', 'producer')
+        level = TROPHIC_LEVELS.get(trophic_level, 0)
+        population = float(species.get('population', 100))
+        biomass = float(species.get('biomass', 100))
+        risk_score, risk_factors = self._risk_model.species_risk(population, level, biomass)
+        return {
+            'name': species['name'],
+            'icon': species.get('icon', DEFAULT_ICON),
+            'trophicLevel': trophic_level,
+            'level': level,
+            'biomass': biomass,
+            'energy': float(species.get('energy', 0)),
+            'population': population,
+            'risk_score': risk_score,
+            'risk_factors': risk_factors,
+            'risk_level': self._risk_model.risk_level(risk_score)
+        }
+
+    def _public(self, record: Dict) -> Dict:
+        return {field: record[field] for field in SPECIES_FIELDS}
+
+    def _existing(self, species_id: int) -> int:
+        if species_id not in self._species:
+            raise KeyError(f"Unknown species id {species_id}")
+        return species_id
+
+    def _reset_aggregates(self):
+        self._n = 0
+        self._mean = 0.0
+        self._m2 = 0.0
+        self._level_count = [0] * NUM_TROPHIC_LEVELS
+        self._level_biomass = [0.0] * NUM_TROPHIC_LEVELS
+        self._level_energy = [0.0] * NUM_TROPHIC_LEVELS
+        self._level_population = [0.0] * NUM_TROPHIC_LEVELS
+        self._risk_counts = {
+            self._risk_model.risk_level(score): 0 for score in (80, 60, 40, 0)
+        }
+
+    def _include(self, record: Dict):
+        level = record['level']
+        self._level_count[level] += 1
+        self._level_biomass[level] += record['biomass']
+        self._level_energy[level] += record['energy']
+        self._level_population[level] += record['population']
+        self._risk_counts[record['risk_level']] += 1
+
+        # Welford: add one observation
+        x = record['population']
+        self._n += 1
+        delta = x - self._mean
+        self._mean += delta / self._n
+        self._m2 += delta * (x - self._mean)
+
+    def _exclude(self, record: Dict):
+        level = record['level']
+        self._level_count[level] -= 1
+        self._level_biomass[level] -= record['biomass']
+        self._level_energy[level] -= record['energy']
+        self._level_population[level] -= record['population']
+        self._risk_counts[record['risk_level']] -= 1
+
+        # Welford in reverse: remove one observation
+        x = record['population']
+        if self._n <= 1:
+            self._n, self._mean, self._m2 = 0, 0.0, 0.0
+            return
+        old_mean = self._mean
+        self._n -= 1
+        self._mean = (old_mean * (self._n + 1) - x) / self._n
+        self._m2 = max(0.0, self._m2 - (x - old_mean) * (x - self._mean))
+
+    def _changed(self):
+        self.version += 1
+        self._changes_since_resync += 1
+        if self._changes_since_resync >= self.RESYNC_EVERY:
+            self.resync()
+
+    def resync(self):
+        """Recompute every aggregate from the species (O(N))"""
+        self._reset_aggregates()
+        for record in self._species.values():
+            self._include(record)
+        self._changes_since_resync = 0
+
+
+def compile_records(records: Sequence[Dict]) -> CompiledEcosystem:
+    """CompiledEcosystem of session records (see snapshot())"""
+    records = list(records)
+    return CompiledEcosystem(
+        names=[r['name'] for r in records],
+        levels=[r['level'] for r in records],
+        biomass=[r['biomass'] for r in records],
+        energy=[r['energy'] for r in records],
+        population=[r['population'] for r in records],
+        icons=[r['icon'] for r in records]
+    )
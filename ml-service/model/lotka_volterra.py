@@ -0,0 +1,567 @@
+"""
+lotka_volterra.py
+
+BEGINNER GUIDE: Coupled predator-prey dynamics
+
+PopulationEngine grows every species on its own. Here the trophic
+levels interact, Lotka-Volterra style:
+
+    producers  grow (logistic, limited by their biomass) and are eaten
+    consumers  gain from the level below, are eaten by the level above,
+               and die at the natural mortality rate
+
+Each species is tracked as its RELATIVE abundance x = P / P0 (1 at the
+start), which keeps very large and very small populations on the same
+scale. Level l only "sees" the other levels through the population-
+weighted mean of its members:
+
+    X_l = sum(P0_i * x_i for i in level l) / N0_l     (N0_l = level's start total)
+
+and every species i of level l follows
+
+    dx_i/dt = x_i * (g_l + sum_k M[l, k] * X_k - s_i * x_i)
+
+    g_l      own rate: producer growth, or -natural mortality for consumers
+    M[l, k]  level interaction matrix:
+               M[l, l-1] = +efficiency * capacity_factor * predation_rate
+                           * B0_{l-1} / N0_l        (food from below)
+               M[l, l+1] = -predation_rate          (eaten from above)
+    s_i      self-limitation g / K: K is the carrying capacity relative
+             to the start population (capacity_factor * biomass for
+             producers, capacity_factor * efficiency * food biomass for
+             consumers)
+
+The right-hand side is a few vector operations over the whole species
+vector, and everything carries a leading BATCH dimension: many
+parameter sets (or start states) are integrated at once, e.g. for
+sensitivity sweeps. Two integrators:
+
+    rk4   classic Runge-Kutta, at most 1 / `substeps` time units per
+          step, with error control by step doubling: each step is also
+          taken as two half steps, and the difference between the two
+          results (Richardson's estimate) decides whether the step is
+          accepted and how large the next one may be
+    rk45  adaptive Dormand-Prince: large steps while the system changes
+          slowly; once it has nearly settled, it continues with the
+          error-controlled RK4 steps above
+
+A fixed step is NOT enough: as the biome populations build up, their
+Jacobian eigenvalues grow past 5 per time unit (RK4 with h = 1 is only
+stable below about 2.8), so fixed steps overshoot, drive species below
+zero and (after clipping) wipe them out for good, or diverge. Both
+integrators therefore reject any step that fails the tolerance or
+makes an abundance negative, and retry it smaller. Once the system has
+nearly settled, the step is also capped below the RK4 stability limit
+(estimated from the Jacobian's spectral radius), where the error
+estimate alone stops being reliable.
+
+Both stop integrating once the system has settled (every surviving
+abundance changes by less than `steady_tol` of itself per time unit;
+relative, so a nearly extinct species that is still recovering keeps
+the integration going): later states are the same, so a horizon of a
+million steps costs no more than the time it takes to reach
+equilibrium.
+
+LotkaVolterraIntegrator keeps the state between calls, so a trajectory
+can be advanced report time by report time (or one time unit at a
+time) without starting over.
+
+Levels without species, without biomass or without food below are
+handled explicitly (no divisions by zero): they simply cannot grow.
+"""
+
+import numpy as np
+from typing import Dict, Iterable, Iterator, Optional, Sequence, Tuple, Union
+
+from model.ecosystem import NUM_TROPHIC_LEVELS
+
+INTEGRATION_METHODS = ('rk4', 'rk45')
+
+# Parameters that may vary across the batch (scalars or 1-D arrays)
+PARAMETER_NAMES = (
+    'producer_growth_rate',
+    'consumer_growth_rate',
+    'predation_rate',
+    'natural_mortality',
+    'energy_transfer_efficiency',
+    'carrying_capacity_factor'
+)
+
+ArrayLike = Union[float, Sequence[float], np.ndarray]
+
+# Dormand-Prince 5(4) tableau
+_DP_A = (
+    (),
+    (1 / 5,),
+    (3 / 40, 9 / 40),
+    (44 / 45, -56 / 15, 32 / 9),
+    (19372 / 6561, -25360 / 2187, 64448 / 6561, -212 / 729),
+    (9017 / 3168, -355 / 33, 46732 / 5247, 49 / 176, -5103 / 18656)
+)
+_DP_B = (35 / 384, 0.0, 500 / 1113, 125 / 192, -2187 / 6784, 11 / 84)
+# Largest h * |eigenvalue| that keeps RK4 stable, with some margin
+_RK4_STABILITY_LIMIT = 2.0
+# Steps this small are accepted whatever their error, so a stiff or
+# blowing-up system cannot stall the integration
+_MIN_STEP = 1e-6
+# 5th minus 4th order weights (7th stage = derivative at the new point)
+_DP_E = (
+    35 / 384 - 5179 / 57600,
+    0.0,
+    500 / 1113 - 7571 / 16695,
+    125 / 192 - 393 / 640,
+    -2187 / 6784 + 92097 / 339200,
+    11 / 84 - 187 / 2100,
+    -1 / 40
+)
+
+
+class LotkaVolterraSystem:
+    """
+    Trophic-level Lotka-Volterra system, integrated for a batch of
+    parameter sets at once
+    """
+
+    def __init__(self, populations: Sequence[float], levels: Sequence[int],
+                 biomass: Sequence[float], parameters: Dict[str, ArrayLike]):
+        """
+        populations: start population of each species (P0)
+        levels:      trophic level code of each species (0 = producer)
+        biomass:     biomass of each species (B0)
+        parameters:  every name in PARAMETER_NAMES, as a scalar or a
+                     1-D array; arrays of length B make a batch of B
+        """
+        levels = np.asarray(levels, dtype=np.int64).reshape(-1)
+        populations = np.asarray(populations, dtype=np.float64).reshape(-1)
+        biomass = np.asarray(biomass, dtype=np.float64).reshape(-1)
+        if not (len(levels) == len(populations) == len(biomass)):
+            raise ValueError("populations, levels and biomass need one entry per species")
+
+        # Work in level order so every level is one contiguous slice
+        self.order = np.argsort(levels, kind='stable')
+        self.num_species = len(levels)
+        counts = np.bincount(levels, minlength=NUM_TROPHIC_LEVELS)
+        bounds = np.concatenate(([0], np.cumsum(counts)))
+        self.slices = [
+            slice(int(bounds[level]), int(bounds[level + 1]))
+            for level in range(NUM_TROPHIC_LEVELS)
+        ]
+        self.initial_populations = populations[self.order]
+        species_biomass = biomass[self.order]
+
+        self.parameters = _batch_parameters(parameters)
+        self.batch_size = len(self.parameters['predation_rate'])
+
+        self._build_terms(self.initial_populations, species_biomass)
+
+    # ================================================
+    # MODEL TERMS
+    # ================================================
+
+    def _build_terms(self, P0: np.ndarray, B0: np.ndarray):
+        p = self.parameters
+        L = NUM_TROPHIC_LEVELS
+        level_pop = np.array([P0[sl].sum() for sl in self.slices])
+        level_biomass = np.array([B0[sl].sum() for sl in self.slices])
+
+        # Weights of the population-weighted level means X_l
+        self.weights = np.zeros(self.num_species)
+        for level, sl in enumerate(self.slices):
+            if level_pop[level] > 0:
+                self.weights[sl] = P0[sl] / level_pop[level]
+
+        # Own rates g [batch, level]
+        self.growth = np.empty((self.batch_size, L))
+        self.growth[:, 0] = p['producer_growth_rate']
+        self.growth[:, 1:] = -p['natural_mortality'][:, None]
+
+        # Interaction matrix M [batch, level, level]
+        food_gain = p['energy_transfer_efficiency'] * p['carrying_capacity_factor'] * p['predation_rate']
+        self.interaction = np.zeros((self.batch_size, L, L))
+        for level in range(1, L):
+            if level_pop[level] > 0:
+                self.interaction[:, level, level - 1] = (
+                    food_gain * level_biomass[level - 1] / level_pop[level]
+                )
+        for level in range(L - 1):
+            self.interaction[:, level, level + 1] = -p['predation_rate']
+
+        # Self-limitation s_i = limit[batch, level] * shape_i
+        #   producers: r0 / (capacity_factor * B0_i / P0_i)  (per species)
+        #   consumers: rc / (capacity_factor * efficiency * B0_{l-1} / N0_l)
+        self.limit = np.zeros((self.batch_size, L))
+        self.shape = np.ones(self.num_species)
+
+        producers = self.slices[0]
+        if level_biomass[0] > 0:
+            # Species without biomass of their own share the level average
+            ratio = np.full(producers.stop - producers.start, level_pop[0] / level_biomass[0])
+            has_biomass = B0[producers] > 0
+            ratio[has_biomass] = P0[producers][has_biomass] / B0[producers][has_biomass]
+            self.shape[producers] = ratio
+            self.limit[:, 0] = p['producer_growth_rate'] / p['carrying_capacity_factor']
+        else:
+            # No biomass at all: producers cannot grow, only die off
+            self.growth[:, 0] = -p['natural_mortality']
+
+        for level in range(1, L):
+            food = level_biomass[level - 1]
+            if food > 0:
+                self.limit[:, level] = (
+                    p['consumer_growth_rate'] * level_pop[level]
+                    / (p['carrying_capacity_factor'] * p['energy_transfer_efficiency'] * food)
+                )
+
+        # s_i for every batch row and species [batch, species]
+        self.self_limitation = np.empty((self.batch_size, self.num_species))
+        for level, sl in enumerate(self.slices):
+            self.self_limitation[:, sl] = self.limit[:, level, None] * self.shape[sl]
+
+    def level_means(self, x: np.ndarray) -> np.ndarray:
+        """Population-weighted mean relative abundance X [batch, level]"""
+        means = np.zeros((x.shape[0], NUM_TROPHIC_LEVELS))
+        for level, sl in enumerate(self.slices):
+            if sl.stop > sl.start:
+                means[:, level] = x[:, sl] @ self.weights[sl]
+        return means
+
+    def derivative(self, x: np.ndarray) -> np.ndarray:
+        """dx/dt for a batch of relative abundances x [batch, species]"""
+        rates = self.growth + np.einsum('blk,bk->bl', self.interaction, self.level_means(x))
+        # x * (rate - s * x), in place to keep large batches cheap
+        dx = np.multiply(self.self_limitation, x)
+        for level, sl in enumerate(self.slices):
+            if sl.stop > sl.start:
+                np.subtract(rates[:, level, None], dx[:, sl], out=dx[:, sl])
+        dx *= x
+        return dx
+
+    # ================================================
+    # INTEGRATION
+    # ================================================
+
+    def initial_state(self, x0: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Start state [batch, species] in level order
+
+        x0: optional relative abundances in input order, [species] or
+            [batch, species] (default: 1 = the given populations)
+        """
+        if x0 is None:
+            return np.ones((self.batch_size, self.num_species))
+        x0 = np.asarray(x0, dtype=np.float64)
+        x0 = np.broadcast_to(x0, (self.batch_size, self.num_species))
+        return np.maximum(0, x0[:, self.order])
+
+    def iter_states(self, times: Iterable[float], method: str = 'rk4',
+                    x0: Optional[np.ndarray] = None, substeps: int = 1,
+                    rtol: float = 1e-6, atol: float = 1e-9,
+                    steady_tol: float = 1e-10) -> Iterator[Tuple[float, np.ndarray]]:
+        """
+        Integrate from t = 0 and yield (t, x) at each of `times`
+        (ascending). x is the [batch, species] state in level order;
+        only the current state is kept in memory.
+        """
+        integrator = LotkaVolterraIntegrator(
+            self, method, x0, substeps, rtol, atol, steady_tol
+        )
+        for target in times:
+            yield target, integrator.advance(target)
+
+    def integrate(self, times: Sequence[float], method: str = 'rk4',
+                  x0: Optional[np.ndarray] = None, **options) -> np.ndarray:
+        """
+        Populations at `times` as a [batch, times, species] array
+        (species in input order)
+        """
+        result = np.empty((self.batch_size, len(times), self.num_species))
+        for row, (_, x) in enumerate(self.iter_states(times, method, x0, **options)):
+            result[:, row] = self.populations(x)
+        return result
+
+    def populations(self, x: np.ndarray) -> np.ndarray:
+        """Level-order relative state -> populations in input order"""
+        result = np.empty_like(x)
+        result[..., self.order] = x * self.initial_populations
+        return result
+
+    def _rk4(self, x: np.ndarray, t: float, target: float, h: float,
+             max_step: float, rtol: float, atol: float, steady_tol: float,
+             detect_settled: bool):
+        """
+        Error-controlled RK4 steps up to `target` (step doubling)
+
+        Returns (x, t, h, settled, steady). Stops early ("settled") when
+        `detect_settled` is set and no abundance changes by more than
+        10 * rtol of itself per time unit, so the caller can cap the
+        step below the stability limit. "steady" means no abundance changes
+        by more than steady_tol of itself per time unit any more.
+        """
+        f = self.derivative
+        k1 = None
+        while t < target - 1e-12:
+            if k1 is None:
+                k1 = f(x)
+            if _max_relative_rate(k1, x) <= steady_tol:
+                return x, target, h, False, True
+            if detect_settled and _max_abs(k1 / (atol + np.abs(x))) <= 10 * rtol:
+                return x, t, h, True, False
+
+            step = min(h, max_step, target - t)
+            whole = self._rk4_step(x, k1, step)
+            half = self._rk4_step(x, k1, step / 2)
+            x_new = self._rk4_step(half, f(half), step / 2)
+
+            # Richardson: the two half steps are off by about (x_new - whole) / 15
+            error = (x_new - whole) / 15
+            norm = _error_norm(error, x, x_new, rtol, atol)
+            negative = bool((x_new < 0).any())
+
+            if (norm <= 1.0 and not negative) or step <= _MIN_STEP:
+                t += step
+                x = np.maximum(x_new, 0)
+                k1 = None
+                if not np.isfinite(x).all():
+                    # Blew up even at the smallest step: the caller reports it
+                    return x, target, h, False, True
+            if not norm <= 1.0 or negative or step == min(h, max_step):
+                # A step cut short to land on a report time keeps h as is
+                h = min(max_step, step * _step_factor(norm, negative))
+        return x, target, h, False, False
+
+    def _rk4_step(self, x: np.ndarray, k1: np.ndarray, h: float) -> np.ndarray:
+        """One classic RK4 step of size h from x (k1 = f(x) given)"""
+        f = self.derivative
+        k2 = f(x + 0.5 * h * k1)
+        k3 = f(x + 0.5 * h * k2)
+        k4 = f(x + h * k3)
+        return x + (h / 6) * (k1 + 2 * k2 + 2 * k3 + k4)
+
+    def _rk45(self, x: np.ndarray, t: float, target: float, h: float,
+              rtol: float, atol: float):
+        """
+        Dormand-Prince steps up to `target`
+
+        Stops early ("settled") once no abundance changes by more than
+        10 * rtol of itself per time unit. Past that point the error
+        control only chases its own rounding noise (the step size sits
+        at the stability limit and the state chatters at the tolerance
+        level), so the integrator finishes with RK4 steps capped below
+        that limit, which settle cleanly onto the equilibrium.
+        """
+        f = self.derivative
+        k_first = f(x)
+        previous_norm = 1e-4
+        while t < target - 1e-12:
+            if x.size == 0 or _max_abs(k_first / (atol + np.abs(x))) <= 10 * rtol:
+                return x, t, h, True
+
+            step = min(h, target - t)
+            k = [k_first]
+            for stage in range(1, 6):
+                increment = sum(a * kj for a, kj in zip(_DP_A[stage], k) if a)
+                k.append(f(x + step * increment))
+            x_new = x + step * sum(b * kj for b, kj in zip(_DP_B, k) if b)
+            negative = bool((x_new < 0).any())
+            np.maximum(x_new, 0, out=x_new)
+            k_new = f(x_new)
+            k.append(k_new)
+
+            # Scaled RMS error per batch row; the worst row decides
+            error = step * sum(e * kj for e, kj in zip(_DP_E, k) if e)
+            norm = _error_norm(error, x, x_new, rtol, atol)
+            accepted = norm <= 1.0 and not negative
+
+            if accepted or step <= _MIN_STEP:
+                t += step
+                x = x_new
+                k_first = k_new  # first-same-as-last
+                if not np.isfinite(x).all():
+                    # Blew up even at the smallest step: the caller reports it
+                    return x, target, h, False
+            if accepted:
+                # PI step control (Hairer & Wanner) damps the step size
+                # oscillation of plain error control
+                factor = 5.0 if norm == 0 else min(5.0, max(0.2, 0.9 * norm ** -0.17 * previous_norm ** 0.04))
+                previous_norm = max(norm, 1e-4)
+            else:
+                factor = _step_factor(norm, negative)
+            if not accepted or step == h:
+                # A step cut short to land on a report time keeps h as is
+                h = step * factor
+        return x, target, h, False
+
+    def spectral_radius(self, x: np.ndarray, iterations: int = 40) -> float:
+        """
+        Largest |eigenvalue| of the Jacobian at x (worst batch row)
+
+        Power iteration with finite-difference Jacobian products. The
+        dominant eigenvalues often come as a complex pair, for which
+        single ratios ||Jv|| / ||v|| oscillate, so the estimate is the
+        mean growth rate over the second half of the iterations.
+        """
+        if x.size == 0:
+            return 0.0
+        f = self.derivative
+        fx = f(x)
+        v = np.random.RandomState(0).standard_normal(x.shape)
+        v /= _row_norms(v)[:, None]
+        log_growth = np.zeros(x.shape[0])
+        warmup = iterations // 2
+        for iteration in range(iterations):
+            eps = 1e-7 * (1 + _row_norms(x))[:, None]
+            jv = (f(x + eps * v) - fx) / eps
+            growth = _row_norms(jv)
+            if not growth.all():
+                # Zero product: no dynamics left in this direction
+                return float(growth.max()) if growth.any() else 0.0
+            if iteration >= warmup:
+                log_growth += np.log(growth)
+            v = jv / growth[:, None]
+        return float(np.exp(log_growth / (iterations - warmup)).max())
+
+
+class LotkaVolterraIntegrator:
+    """
+    Integration of a LotkaVolterraSystem that advances on demand
+
+    Keeps the state x (level order, [batch, species]), the time t and
+    the step size between calls, so advance() can be called for each
+    report time in turn.
+    """
+
+    def __init__(self, system: LotkaVolterraSystem, method: str = 'rk4',
+                 x0: Optional[np.ndarray] = None, substeps: int = 1,
+                 rtol: float = 1e-6, atol: float = 1e-9, steady_tol: float = 1e-10):
+        if method not in INTEGRATION_METHODS:
+            raise ValueError(f"Unknown integration method: {method}")
+        self.system = system
+        self.method = method
+        self.rtol = rtol
+        self.atol = atol
+        self.steady_tol = steady_tol
+
+        self.x = system.initial_state(x0)
+        self.t = 0.0
+        # 'rk45' -> 'rk4' (once settled) -> 'steady' (nothing changes any
+        # more, or the state is no longer finite)
+        self.phase = method
+        self.h = 1.0 / max(1, substeps)
+        self.max_step = self.h if method == 'rk4' else np.inf
+        self._settled = False
+
+    def advance(self, target: float) -> np.ndarray:
+        """Integrate up to time `target` and return the state there"""
+        if target < self.t - 1e-12:
+            raise ValueError("Integration times must be ascending and non-negative")
+
+        system = self.system
+        while self.phase != 'steady' and self.t < target - 1e-12:
+            if self.phase == 'rk45':
+                self.x, self.t, self.h, settled = system._rk45(
+                    self.x, self.t, target, self.h, self.rtol, self.atol
+                )
+                if not np.isfinite(self.x).all():
+                    self.phase = 'steady'
+                elif settled:
+                    self._settle()
+                    self.phase = 'rk4'
+            else:
+                self.x, self.t, self.h, settled, steady = system._rk4(
+                    self.x, self.t, target, self.h, self.max_step,
+                    self.rtol, self.atol, self.steady_tol, not self._settled
+                )
+                if steady:
+                    self.phase = 'steady'
+                elif settled:
+                    self._settle()
+        self.t = max(self.t, target)
+        return self.x
+
+    def state(self) -> Dict:
+        """
+        Everything advance() needs to continue later (single parameter
+        set, JSON-able): the state x and the step size control
+        """
+        return {
+            'x': self.x[0].tolist(),
+            'h': self.h,
+            'max_step': None if np.isinf(self.max_step) else self.max_step,
+            'phase': self.phase,
+            'settled': self._settled
+        }
+
+    def restore(self, state: Dict, time: float):
+        """Continue from a state() taken at `time`"""
+        x = np.asarray(state['x'], dtype=np.float64).reshape(1, -1)
+        if x.shape != self.x.shape:
+            raise ValueError("Checkpoint does not match the number of species")
+        self.x = x
+        self.t = float(time)
+        self.h = float(state['h'])
+        self.max_step = np.inf if state['max_step'] is None else float(state['max_step'])
+        self.phase = state['phase']
+        self._settled = bool(state['settled'])
+
+    def _settle(self):
+        # Nearly at equilibrium: stay below the RK4 stability limit from now on
+        self._settled = True
+        radius = self.system.spectral_radius(self.x)
+        if radius > 0:
+            self.max_step = min(self.max_step, _RK4_STABILITY_LIMIT / radius)
+            self.h = min(self.h, self.max_step)
+
+
+def _error_norm(error: np.ndarray, x: np.ndarray, x_new: np.ndarray,
+                rtol: float, atol: float) -> float:
+    """Scaled RMS error per batch row; the worst row decides (NaN if undefined)"""
+    if error.size == 0:
+        return 0.0
+    scale = atol + rtol * np.maximum(np.abs(x), np.abs(x_new))
+    with np.errstate(over='ignore', invalid='ignore'):
+        norms = np.sqrt(np.mean((error / scale) ** 2, axis=1))
+    return float(norms.max()) if np.isfinite(norms).all() else float('nan')
+
+
+def _step_factor(norm: float, negative: bool) -> float:
+    """Step size multiplier after a rejected (or shortened) step"""
+    if not norm <= 1.0:
+        # Also NaN (the state blew up): shrink as much as allowed
+        return 0.2 if np.isnan(norm) else max(0.2, 0.9 * norm ** -0.2)
+    if negative:
+        # Accurate, but overshoots below zero: halve and retry
+        return 0.5
+    return 5.0 if norm == 0 else min(5.0, max(0.2, 0.9 * norm ** -0.2))
+
+
+def _row_norms(values: np.ndarray) -> np.ndarray:
+    """Euclidean norm of each batch row"""
+    return np.sqrt(np.einsum('bi,bi->b', values, values))
+
+
+def _max_relative_rate(dx: np.ndarray, x: np.ndarray) -> float:
+    """Largest |dx/dt| / x: how fast any (non-extinct) abundance still changes"""
+    if x.size == 0:
+        return 0.0
+    rates = np.divide(np.abs(dx), x, out=np.zeros_like(x), where=x > 0)
+    return float(rates.max())
+
+
+def _max_abs(values: np.ndarray) -> float:
+    return float(np.abs(values).max()) if values.size else 0.0
+
+
+def _batch_parameters(parameters: Dict[str, ArrayLike]) -> Dict[str, np.ndarray]:
+    """Every parameter as a float64 array of the common batch length"""
+    missing = [name for name in PARAMETER_NAMES if name not in parameters]
+    if missing:
+        raise ValueError(f"Missing Lotka-Volterra parameters: {missing}")
+    arrays = [np.atleast_1d(np.asarray(parameters[name], dtype=np.float64)) for name in PARAMETER_NAMES]
+    if any(array.ndim != 1 for array in arrays):
+        raise ValueError("Lotka-Volterra parameters must be scalars or 1-D arrays")
+    batch = dict(zip(PARAMETER_NAMES, (np.ascontiguousarray(a) for a in np.broadcast_arrays(*arrays))))
+    if any((array < 0).any() or not np.isfinite(array).all() for array in batch.values()):
+        raise ValueError("Lotka-Volterra parameters must be finite and non-negative")
+    if (batch['carrying_capacity_factor'] <= 0).any() or (batch['energy_transfer_efficiency'] <= 0).any():
+        raise ValueError("carrying_capacity_factor and energy_transfer_efficiency must be positive")
+    return batch
@@ -0,0 +1,33 @@
+"""
+numeric.py
+
+Float -> int conversion shared by the model and the response formats
+(service/trajectory_format.py), so both truncate populations the same
+way. NumPy is imported inside the function: the service can import
+this module without loading NumPy (see service/startup.py).
+"""
+
+from typing import List
+
+# Largest float that converts to a NumPy int64 without overflowing
+INT64_SAFE_LIMIT = float(2 ** 63 - 1024)
+
+
+def truncate_to_ints(values) -> List:
+    """
+    Truncate an array of populations (any shape) to nested lists of
+    Python ints, like int(population) per value
+    """
+    import numpy as np
+
+    values = np.asarray(values)
+    if values.size == 0 or values.max() < INT64_SAFE_LIMIT:
+        return values.astype(np.int64).tolist()
+    # Very large populations: fall back to arbitrary-precision ints
+    return _python_ints(values.tolist())
+
+
+def _python_ints(value):
+    if isinstance(value, list):
+        return [_python_ints(item) for item in value]
+    return int(value)
@@ -0,0 +1,213 @@
+"""
+sensitivity.py
+
+BEGINNER GUIDE: How much does each model constant matter?
+
+The coupled trajectory model (model/lotka_volterra.py) depends on six
+constants: the two logistic growth rates, PREDATION_RATE,
+NATURAL_MORTALITY, ENERGY_TRANSFER_EFFICIENCY and
+CARRYING_CAPACITY_FACTOR. A sensitivity analysis varies all of them at
+once and measures which ones the predictions actually depend on:
+
+1. SAMPLE the parameter space with a Latin hypercube: each parameter's
+   range is cut into N equal strata and every stratum is used exactly
+   once, so N samples cover every parameter evenly (much better than N
+   independent random draws).
+
+2. EVALUATE the model for every sample: the populations at the last
+   step, their total, the health score and the Shannon diversity.
+   simulate_parameter_batch integrates many samples in one batch.
+
+3. INDEX: the first-order sensitivity index of parameter i for output Y
+
+       S_i = Var(E[Y | X_i]) / Var(Y)
+
+   is the share of Y's variance explained by X_i alone (0 = no effect,
+   1 = Y is determined by X_i). E[Y | X_i] is estimated by sorting the
+   samples into equal-count bins of X_i and averaging Y per bin; the
+   noise those bin means carry is subtracted (adjusted correlation
+   ratio), so an irrelevant parameter scores close to 0.
+
+The cascade analysis is not part of this: its rules are fixed per
+trophic level and do not use any of these constants.
+"""
+
+import numpy as np
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from model.cascade_model import EcosystemCascadeModel
+from model.ecosystem import SpeciesInput, compile_ecosystem
+from model.health_metrics import health_metrics
+from model.lotka_volterra import PARAMETER_NAMES
+from model.population_engine import ecosystem_health_rows
+
+# Outputs reported for every ecosystem (plus one population per species)
+SUMMARY_OUTPUTS = ('total_population', 'ecosystem_health', 'shannon')
+
+
+def parameter_bounds(spread: float = 0.5,
+                     bounds: Optional[Dict[str, Tuple[float, float]]] = None,
+                     parameters: Optional[Sequence[str]] = None) -> Dict[str, Tuple[float, float]]:
+    """
+    (low, high) of every varied parameter
+
+    spread:     default range: each constant +/- this fraction of itself
+    bounds:     explicit ranges for some parameters
+    parameters: the parameters to vary (default: all six; the others
+                keep their constant value)
+    """
+    defaults = EcosystemCascadeModel().lotka_volterra_parameters()
+    names = list(parameters) if parameters is not None else list(PARAMETER_NAMES)
+    unknown = (set(names) | set(bounds or {})) - set(defaults)
+    if unknown:
+        raise ValueError(f"Unknown Lotka-Volterra parameters: {sorted(unknown)}")
+    if not 0 < spread < 1:
+        raise ValueError("spread must be between 0 and 1")
+
+    ranges = {}
+    for name in names:
+        low, high = (bounds or {}).get(name, (
+            defaults[name] * (1 - spread), defaults[name] * (1 + spread)
+        ))
+        if not 0 <= low < high:
+            raise ValueError(f"Range of {name} must satisfy 0 <= low < high")
+        ranges[name] = (float(low), float(high))
+    return ranges
+
+
+def latin_hypercube(num_samples: int, num_parameters: int, seed: Optional[int] = None) -> np.ndarray:
+    """
+    [samples, parameters] points in [0, 1): every column hits each of
+    the `num_samples` strata exactly once, at a random spot inside it
+    """
+    rng = np.random.default_rng(seed)
+    strata = np.argsort(rng.random((num_parameters, num_samples)), axis=1).T
+    return (strata + rng.random((num_samples, num_parameters))) / num_samples
+
+
+def scale_samples(unit: np.ndarray, bounds: Dict[str, Tuple[float, float]]) -> Dict[str, np.ndarray]:
+    """Unit-cube samples -> parameter values (one array per parameter)"""
+    return {
+        name: low + unit[:, column] * (high - low)
+        for column, (name, (low, high)) in enumerate(bounds.items())
+    }
+
+
+def output_names(species_names: Sequence[str]) -> List[str]:
+    return [f'population:{name}' for name in species_names] + list(SUMMARY_OUTPUTS)
+
+
+def evaluate_samples(species: SpeciesInput, parameter_sets: Dict[str, np.ndarray],
+                     time_steps: int = 12, method: str = 'rk45') -> np.ndarray:
+    """
+    Outputs [samples, outputs] (columns as output_names) at the last step
+    """
+    eco = compile_ecosystem(species)
+    model = EcosystemCascadeModel()
+    final = model.simulate_parameter_batch(
+        eco, parameter_sets, time_steps, [time_steps - 1], method
+    )['populations'][:, -1]
+
+    num_samples = len(final)
+    diversity = health_metrics(
+        final, eco.levels, eco.population, eco.biomass,
+        np.zeros(len(eco), dtype=np.int64), 1
+    )['shannon'][:, 0]
+    return np.column_stack((
+        final,
+        final.sum(axis=1),
+        np.asarray(ecosystem_health_rows(final), dtype=np.float64).reshape(num_samples),
+        diversity
+    ))
+
+
+def first_order_indices(unit: np.ndarray, outputs: np.ndarray,
+                        bins: Optional[int] = None) -> np.ndarray:
+    """
+    First-order indices [parameters, outputs] from the unit samples
+    [samples, parameters] and the model outputs [samples, outputs]
+
+    NaN where an output does not vary at all.
+    """
+    num_samples = len(unit)
+    if bins is None:
+        bins = int(np.sqrt(num_samples))
+    bins = max(2, min(bins, num_samples // 2))
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        total = outputs - outputs.mean(axis=0)
+        ss_total = (total * total).sum(axis=0)
+
+        indices = np.empty((unit.shape[1], outputs.shape[1]))
+        for column in range(unit.shape[1]):
+            # Equal-count bins of this parameter (by rank)
+            rank = np.argsort(np.argsort(unit[:, column], kind='stable'), kind='stable')
+            membership = np.zeros((num_samples, bins))
+            membership[np.arange(num_samples), rank * bins // num_samples] = 1
+            counts = membership.sum(axis=0)
+
+            bin_means = membership.T @ outputs / counts[:, None]
+            ss_between = (counts[:, None] * (bin_means - outputs.mean(axis=0)) ** 2).sum(axis=0)
+            ss_within = ss_total - ss_between
+            adjusted = ss_between - (bins - 1) * ss_within / (num_samples - bins)
+            indices[column] = np.clip(adjusted / ss_total, 0, 1)
+
+    # Outputs that never change (e.g. an extinct species) have no index
+    indices[:, ~(ss_total > 1e-12 * np.maximum(1, np.abs(outputs).max(axis=0)) ** 2)] = np.nan
+    return indices
+
+
+def sensitivity_report(species_names: Sequence[str], bounds: Dict[str, Tuple[float, float]],
+                       unit: np.ndarray, outputs: np.ndarray,
+                       bins: Optional[int] = None) -> Dict:
+    """
+    Returns: {
+        'num_samples': int,
+        'parameters': {name: {'default', 'low', 'high'}},
+        'outputs': {output: {
+            'mean', 'std',
+            'first_order': {parameter: 0-1 or None}
+        }}
+    }
+    """
+    defaults = EcosystemCascadeModel().lotka_volterra_parameters()
+    indices = first_order_indices(unit, outputs, bins)
+    means = outputs.mean(axis=0).tolist()
+    stds = outputs.std(axis=0).tolist()
+
+    report = {}
+    for column, name in enumerate(output_names(species_names)):
+        report[name] = {
+            'mean': round(means[column], 6),
+            'std': round(stds[column], 6),
+            'first_order': {
+                parameter: (
+                    None if np.isnan(indices[row, column])
+                    else round(float(indices[row, column]), 4)
+                )
+                for row, parameter in enumerate(bounds)
+            }
+        }
+    return {
+        'num_samples': len(unit),
+        'parameters': {
+            name: {'default': defaults[name], 'low': low, 'high': high}
+            for name, (low, high) in bounds.items()
+        },
+        'outputs': report
+    }
+
+
+def analyze_sensitivity(species: SpeciesInput, num_samples: int = 256, time_steps: int = 12,
+                        spread: float = 0.5, bounds: Dict[str, Tuple[float, float]] = None,
+                        parameters: Sequence[str] = None, seed: int = None,
+                        bins: int = None) -> Dict:
+    """
+    Whole analysis in this process (see service/parallel_samples.py for
+    the same, spread over a process pool)
+    """
+    eco = compile_ecosystem(species)
+    ranges = parameter_bounds(spread, bounds, parameters)
+    unit = latin_hypercube(num_samples, len(ranges), seed)
+    outputs = evaluate_samples(eco, scale_samples(unit, ranges), time_steps)
+    return sensitivity_report(eco.names, ranges, unit, outputs, bins)
@@ -0,0 +1,181 @@
+"""
+checkpoints.py
+
+BEGINNER GUIDE: Continuing a trajectory instead of starting over
+
+"Run another 12 months" used to resend the original species and
+simulate all 24 months again. Now every trajectory response carries a
+CHECKPOINT: the engine state after its last step (see
+model/population_engine.py). Sending it back continues the run from
+there, so extending a run only costs the new steps.
+
+The checkpoint travels as an opaque, signed token:
+
+    base64url(JSON {ecosystem, mode, state}) . base64url(HMAC-SHA256)
+
+The signature stops clients from feeding the engine made-up states,
+and the ecosystem fingerprint + mode stop a checkpoint from being
+applied to a different pyramid. Tokens are signed with
+ML_CHECKPOINT_SECRET; without it every process picks a random secret,
+so tokens then only work on the worker that issued them.
+
+The server also keeps the most recent checkpoints itself, keyed by
+(ecosystem fingerprint, mode, step), so a client that only says
+"continue from step 12" (startStep) resumes from the closest earlier
+checkpoint it still has. The cache is bounded by entries and bytes and
+drops the least recently used checkpoint first.
+"""
+
+import base64
+import bisect
+import hashlib
+import hmac
+import json
+import secrets
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+CHECKPOINT_VERSION = 1
+
+
+class InvalidCheckpoint(ValueError):
+    """Corrupted / foreign checkpoint, or one for another ecosystem or mode"""
+
+
+class CheckpointStore:
+    """
+    Signs / verifies checkpoint tokens and caches recent checkpoints
+    """
+
+    def __init__(self, secret: Optional[bytes] = None, max_entries: int = 1024,
+                 max_bytes: int = 32 * 1024 * 1024):
+        self._secret = secret or secrets.token_bytes(32)
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+
+        # (fingerprint, mode, step) -> (state, size_bytes); most recent at the end
+        self._entries: 'OrderedDict[Tuple[str, str, int], Tuple[Dict, int]]' = OrderedDict()
+        # (fingerprint, mode) -> sorted steps with a cached checkpoint
+        self._steps: Dict[Tuple[str, str], List[int]] = {}
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    # ================================================
+    # TOKENS
+    # ================================================
+
+    def encode(self, fingerprint: str, mode: str, state: Dict) -> str:
+        """Signed token for an engine checkpoint"""
+        payload = json.dumps({
+            'v': CHECKPOINT_VERSION,
+            'ecosystem': fingerprint,
+            'mode': mode,
+            'state': state
+        }, separators=(',', ':')).encode('utf-8')
+        return f"{_b64encode(payload)}.{_b64encode(self._sign(payload))}"
+
+    def decode(self, token: str, fingerprint: str, mode: str) -> Dict:
+        """
+        Engine checkpoint of a token, after checking its signature and
+        that it was made for this ecosystem and mode
+        """
+        try:
+            body, signature = token.split('.')
+            payload = _b64decode(body)
+            valid = hmac.compare_digest(_b64decode(signature), self._sign(payload))
+        except ValueError:
+            valid = False
+        if not valid:
+            raise InvalidCheckpoint("Checkpoint is invalid (corrupted, or issued by another server)")
+
+        checkpoint = json.loads(payload)
+        if checkpoint.get('v') != CHECKPOINT_VERSION:
+            raise InvalidCheckpoint("Checkpoint is from an older version of the service")
+        if checkpoint['ecosystem'] != fingerprint:
+            raise InvalidCheckpoint("Checkpoint belongs to a different ecosystem")
+        if checkpoint['mode'] != mode:
+            raise InvalidCheckpoint(f"Checkpoint was made in {checkpoint['mode']} mode, not {mode}")
+        return checkpoint['state']
+
+    def _sign(self, payload: bytes) -> bytes:
+        return hmac.new(self._secret, payload, hashlib.sha256).digest()
+
+    # ================================================
+    # CACHE
+    # ================================================
+
+    def put(self, fingerprint: str, mode: str, state: Dict):
+        """Remember a checkpoint (its 'step' is part of the key)"""
+        key = (fingerprint, mode, int(state['step']))
+        size = _state_size(state)
+        if size > self.max_bytes or self.max_entries <= 0:
+            return
+
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (state, size)
+            self._bytes += size
+            bisect.insort(self._steps.setdefault(key[:2], []), key[2])
+
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def latest(self, fingerprint: str, mode: str, step: int) -> Optional[Dict]:
+        """
+        Cached checkpoint with the highest step <= `step` (None if there
+        is none): resuming from it leaves the fewest steps to simulate
+        """
+        with self._lock:
+            steps = self._steps.get((fingerprint, mode), [])
+            index = bisect.bisect_right(steps, step)
+            if index == 0:
+                self.misses += 1
+                return None
+            key = (fingerprint, mode, steps[index - 1])
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return self._entries[key][0]
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_entries': self.max_entries,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions
+            }
+
+    def _remove(self, key: Tuple[str, str, int]):
+        _, size = self._entries.pop(key)
+        self._bytes -= size
+        steps = self._steps[key[:2]]
+        steps.remove(key[2])
+        if not steps:
+            del self._steps[key[:2]]
+
+
+def _state_size(state: Dict) -> int:
+    # float64 values plus a little for the dict itself
+    values = len(state['populations']) + len(state.get('integrator', {}).get('x', ()))
+    return 8 * values + 256
+
+
+def _b64encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b'=').decode('ascii')
+
+
+def _b64decode(text: str) -> bytes:
+    try:
+        return base64.urlsafe_b64decode(text + '=' * (-len(text) % 4))
+    except (ValueError, TypeError) as e:
+        raise ValueError(str(e))
@@ -0,0 +1,195 @@
+"""
+executor.py
+
+BEGINNER GUIDE: Running model code off the event loop
+
+FastAPI endpoints are `async def`, so they all share ONE event loop per
+worker. Calling slow NumPy/Python model code directly inside them
+blocks every other request (including /api/health) until it finishes.
+
+ModelExecutor hands the model call to a pool instead:
+
+    'thread'   -> ThreadPoolExecutor (NumPy releases the GIL for big ops)
+    'process'  -> ProcessPoolExecutor (true parallelism, arguments are pickled)
+    'inline'   -> run directly on the loop (old behaviour, for debugging)
+
+Each pool accepts at most `max_workers + max_queue` calls at a time.
+Beyond that, run() raises ExecutorBusy so the API can answer 503
+instead of piling up unbounded work.
+"""
+
+import asyncio
+import threading
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+EXECUTOR_KINDS = ('inline', 'thread', 'process')
+
+
+class ExecutorBusy(Exception):
+    """Raised when an executor's queue is full"""
+
+    def __init__(self, kind: str, retry_after: int = 1):
+        super().__init__(f"{kind} executor queue is full")
+        self.kind = kind
+        self.retry_after = retry_after
+
+
+class ModelExecutor:
+    """
+    Bounded thread/process pool for model calls
+    """
+
+    def __init__(self, kind: str = 'thread', max_workers: int = 4, max_queue: int = 64):
+        if kind not in EXECUTOR_KINDS:
+            raise ValueError(f"Unknown executor kind: {kind}")
+        self.kind = kind
+        self.max_workers = max(1, max_workers)
+        self.max_queue = max(0, max_queue)
+
+        self._pool: Optional[Executor] = None
+        self._lock = threading.Lock()  # Slots are released from worker threads
+        self._pending = 0
+        self.finished = 0
+        self.rejected = 0
+
+    @property
+    def capacity(self) -> int:
+        """Calls that may be running or waiting at the same time"""
+        return self.max_workers + self.max_queue
+
+    async def run(self, fn: Callable, *args, **kwargs) -> Any:
+        """
+        Run fn(*args, **kwargs) in the pool and wait for the result
+
+        The slot is held until the call itself finishes: if the awaiting
+        request is cancelled (client gone, timeout) a call that already
+        started keeps running in the pool and keeps counting against the
+        bound.
+        """
+        with self._lock:
+            if self._pending >= self.capacity:
+                self.rejected += 1
+                raise ExecutorBusy(self.kind)
+            self._pending += 1
+
+        if self.kind == 'inline':
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                self._release()
+
+        try:
+            future = self._get_pool().submit(fn, *args, **kwargs)
+        except BaseException:
+            self._release()
+            raise
+        # Runs when the call finishes, or when it is cancelled before starting
+        future.add_done_callback(lambda _: self._release())
+        return await asyncio.wrap_future(future)
+
+    def _release(self):
+        with self._lock:
+            self._pending -= 1
+            self.finished += 1
+
+    def _get_pool(self) -> Executor:
+        # Created on first use, so process workers fork after the app is set up
+        if self._pool is None:
+            if self.kind == 'process':
+                self._pool = ProcessPoolExecutor(max_workers=self.max_workers)
+            else:
+                self._pool = ThreadPoolExecutor(
+                    max_workers=self.max_workers, thread_name_prefix='model'
+                )
+        return self._pool
+
+    def shutdown(self):
+        """Stop the pool (waits for running calls)"""
+        if self._pool is not None:
+            self._pool.shutdown(wait=True, cancel_futures=True)
+            self._pool = None
+
+    def stats(self) -> Dict:
+        return {
+            'kind': self.kind,
+            'max_workers': self.max_workers,
+            'max_queue': self.max_queue,
+            'pending': self._pending,
+            'finished': self.finished,
+            'rejected': self.rejected
+        }
+
+
+class ExecutorRegistry:
+    """
+    One shared executor per kind, chosen per endpoint
+
+    overrides maps an endpoint name (e.g. 'trajectory') to an executor
+    kind; every other endpoint uses `default_kind`.
+    """
+
+    def __init__(self, default_kind: str = 'thread', max_workers: int = 4,
+                 max_queue: int = 64, overrides: Dict[str, str] = None):
+        self.default_kind = default_kind
+        self.overrides = dict(overrides or {})
+        for kind in [default_kind, *self.overrides.values()]:
+            if kind not in EXECUTOR_KINDS:
+                raise ValueError(f"Unknown executor kind: {kind}")
+
+        self._executors = {
+            kind: ModelExecutor(kind, max_workers, max_queue)
+            for kind in EXECUTOR_KINDS
+        }
+
+    def for_endpoint(self, endpoint: str) -> ModelExecutor:
+        return self._executors[self.overrides.get(endpoint, self.default_kind)]
+
+    def for_generator(self, endpoint: str) -> ModelExecutor:
+        """
+        Executor for pulling chunks from a generator (streaming endpoints)
+
+        A generator cannot be pickled into another process, so 'process'
+        is served by the thread pool instead.
+        """
+        executor = self.for_endpoint(endpoint)
+        return self._executors['thread'] if executor.kind == 'process' else executor
+
+    async def run(self, endpoint: str, fn: Callable, *args, **kwargs) -> Any:
+        """Run a model call on the executor configured for `endpoint`"""
+        return await self.for_endpoint(endpoint).run(fn, *args, **kwargs)
+
+    def shutdown(self):
+        for executor in self._executors.values():
+            executor.shutdown()
+
+    def stats(self) -> Dict:
+        used = {self.default_kind, *self.overrides.values()}
+        return {
+            'default': self.default_kind,
+            'overrides': self.overrides,
+            'executors': {
+                kind: executor.stats()
+                for kind, executor in self._executors.items() if kind in used
+            }
+        }
+
+
+def parse_overrides(spec: str) -> Dict[str, str]:
+    """
+    Parse "trajectory=process,cascade=thread" into a dict
+
+    Entries with an unknown kind are skipped with a warning, so a typo
+    leaves that endpoint on the default pool instead of stopping startup.
+    """
+    overrides = {}
+    for item in spec.split(','):
+        if '=' in item:
+            endpoint, kind = item.split('=', 1)
+            endpoint, kind = endpoint.strip(), kind.strip()
+            if kind not in EXECUTOR_KINDS:
+                print(f"⚠️ Ignoring executor override {endpoint}={kind}: "
+                      f"kind must be one of {', '.join(EXECUTOR_KINDS)}")
+                continue
+            overrides[endpoint] = kind
+    return overrides
@@ -0,0 +1,226 @@
+"""
+instrumentation.py
+
+BEGINNER GUIDE: Where does the time of a request go?
+
+A request to the ML service passes through three stages:
+
+    request arrives
+        |  validation  -> body read, JSON parsed, Pydantic models built
+    handler starts
+        |  model       -> our endpoint function (cache lookup + model call)
+    handler returns
+        |  encoding    -> result turned into JSON (and gzipped)
+    response starts
+        |  (body sent)
+    response finished  -> total
+
+MetricsMiddleware wraps the whole app and notes when the request
+arrives, when the response starts and when it ends. TimedRoute wraps
+every endpoint function so we also know when the handler itself starts
+and returns. The two meet through a context variable holding the
+RequestTiming of the current request.
+
+Everything is recorded in service.metrics histograms/counters and
+served on /metrics.
+"""
+
+import functools
+import inspect
+import time
+from contextvars import ContextVar
+from typing import Any, Callable, Optional
+
+from fastapi.routing import APIRoute
+
+from service.metrics import MetricsRegistry, SIZE_BUCKETS
+
+# Label used for requests that did not match any route (keeps the
+# number of series bounded whatever paths clients try)
+UNMATCHED = 'unmatched'
+
+
+class RequestTiming:
+    """
+    Timestamps and facts collected while one request is handled
+    """
+
+    __slots__ = ('started', 'handler_started', 'handler_finished',
+                 'response_started', 'endpoint', 'source', 'status',
+                 'request_bytes', 'response_bytes')
+
+    def __init__(self, started: float):
+        self.started = started
+        self.handler_started: Optional[float] = None
+        self.handler_finished: Optional[float] = None
+        self.response_started: Optional[float] = None
+        self.endpoint = UNMATCHED
+        self.source: Optional[str] = None
+        self.status = 500
+        self.request_bytes = 0
+        self.response_bytes = 0
+
+
+current_timing: ContextVar[Optional[RequestTiming]] = ContextVar('current_timing', default=None)
+
+
+def response_source(result: Any) -> Optional[str]:
+    """
+    'ml_model' / 'fallback' from an endpoint result, if it says
+    """
+    if isinstance(result, dict):
+        source = result.get('source')
+        return source if isinstance(source, str) else None
+    headers = getattr(result, 'headers', None)
+    if headers is not None:
+        return headers.get('x-model-source')
+    return None
+
+
+def timed_endpoint(endpoint: Callable, path: str) -> Callable:
+    """
+    Wrap an endpoint function so it records when it runs
+    """
+    def before():
+        timing = current_timing.get()
+        if timing is not None:
+            timing.endpoint = path
+            timing.handler_started = time.perf_counter()
+        return timing
+
+    def after(timing: Optional[RequestTiming], result: Any = None):
+        if timing is not None:
+            timing.handler_finished = time.perf_counter()
+            timing.source = response_source(result)
+
+    if inspect.iscoroutinefunction(endpoint):
+        @functools.wraps(endpoint)
+        async def wrapper(*args, **kwargs):
+            timing = before()
+            try:
+                result = await endpoint(*args, **kwargs)
+            except BaseException:
+                after(timing)
+                raise
+            after(timing, result)
+            return result
+    else:
+        @functools.wraps(endpoint)
+        def wrapper(*args, **kwargs):
+            timing = before()
+            try:
+                result = endpoint(*args, **kwargs)
+            except BaseException:
+                after(timing)
+                raise
+            after(timing, result)
+            return result
+
+    return wrapper
+
+
+class TimedRoute(APIRoute):
+    """
+    APIRoute whose endpoint reports its start/end to RequestTiming
+
+    Install with `app.router.route_class = TimedRoute` before the
+    endpoints are declared.
+    """
+
+    def __init__(self, path: str, endpoint: Callable, **kwargs):
+        super().__init__(path, timed_endpoint(endpoint, path), **kwargs)
+
+
+class RequestMetrics:
+    """
+    The metrics recorded for every HTTP request
+    """
+
+    STAGES = ('validation', 'model', 'encoding', 'total')
+
+    def __init__(self, registry: MetricsRegistry):
+        self.registry = registry
+        self.stage_seconds = registry.histogram(
+            'ml_request_stage_seconds',
+            'Time spent per request stage (validation, model, encoding, total)',
+            ('endpoint', 'stage')
+        )
+        self.requests = registry.counter(
+            'ml_requests_total', 'Responses sent, by status code',
+            ('endpoint', 'method', 'status')
+        )
+        self.sources = registry.counter(
+            'ml_responses_by_source_total', 'Responses from the ML model vs the fallback',
+            ('endpoint', 'source')
+        )
+        self.request_bytes = registry.histogram(
+            'ml_request_body_bytes', 'Request body size', ('endpoint',), SIZE_BUCKETS
+        )
+        self.response_bytes = registry.histogram(
+            'ml_response_body_bytes', 'Response body size (as sent, after compression)',
+            ('endpoint',), SIZE_BUCKETS
+        )
+
+    def record(self, method: str, timing: RequestTiming, finished: float):
+        endpoint = timing.endpoint
+        stage = self.stage_seconds
+
+        if timing.handler_started is not None:
+            stage.observe(timing.handler_started - timing.started,
+                          endpoint=endpoint, stage='validation')
+            if timing.handler_finished is not None:
+                stage.observe(timing.handler_finished - timing.handler_started,
+                              endpoint=endpoint, stage='model')
+                if timing.response_started is not None:
+                    stage.observe(timing.response_started - timing.handler_finished,
+                                  endpoint=endpoint, stage='encoding')
+        stage.observe(finished - timing.started, endpoint=endpoint, stage='total')
+
+        self.requests.inc(endpoint=endpoint, method=method, status=str(timing.status))
+        if timing.source is not None:
+            self.sources.inc(endpoint=endpoint, source=timing.source)
+        self.request_bytes.observe(timing.request_bytes, endpoint=endpoint)
+        self.response_bytes.observe(timing.response_bytes, endpoint=endpoint)
+
+
+class MetricsMiddleware:
+    """
+    Pure ASGI middleware feeding RequestMetrics (no extra buffering)
+    """
+
+    def __init__(self, app, metrics: RequestMetrics):
+        self.app = app
+        self.metrics = metrics
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        timing = RequestTiming(time.perf_counter())
+        token = current_timing.set(timing)
+
+        async def receive_wrapper():
+            message = await receive()
+            if message['type'] == 'http.request':
+                timing.request_bytes += len(message.get('body', b''))
+            return message
+
+        async def send_wrapper(message):
+            if message['type'] == 'http.response.start':
+                timing.response_started = time.perf_counter()
+                timing.status = message['status']
+            elif message['type'] == 'http.response.body':
+                timing.response_bytes += len(message.get('body', b''))
+            await send(message)
+
+        try:
+            await self.app(scope, receive_wrapper, send_wrapper)
+        finally:
+            current_timing.reset(token)
+            # The router stores the matched route in the scope, which also
+            # labels requests rejected before the handler ran (e.g. 422)
+            route = scope.get('route')
+            if route is not None and hasattr(route, 'path'):
+                timing.endpoint = route.path
+            self.metrics.record(scope.get('method', ''), timing, time.perf_counter())
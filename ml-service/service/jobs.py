@@ -0,0 +1,309 @@
+"""
+jobs.py
+
+BEGINNER GUIDE: Background jobs for long simulations
+
+A long trajectory or a large cascade analysis does not have to finish
+inside one HTTP request. The client submits a JOB instead:
+
+    POST   /api/jobs/trajectory     -> 202 {"id": ..., "status": "queued"}
+    GET    /api/jobs/{id}?wait=20   -> status (waits up to 20s for the end)
+    DELETE /api/jobs/{id}           -> cancel
+
+Jobs run on a small in-process thread pool. At most `max_workers` run
+at once and `max_queue` more may wait; beyond that submit() raises
+JobQueueFull, which the API answers with 429 and a Retry-After estimate
+(backpressure instead of an ever-growing backlog).
+
+Cancelling a queued job removes it right away. A running job gets its
+cancel flag set; the job function calls job.check_cancelled() between
+simulation steps, so the loop stops at the next step boundary.
+
+Finished jobs (and their results) are kept for `keep_seconds`, and at
+most `max_finished` of them, oldest dropped first.
+"""
+
+import asyncio
+import math
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+QUEUED = 'queued'
+RUNNING = 'running'
+SUCCEEDED = 'succeeded'
+FAILED = 'failed'
+CANCELLED = 'cancelled'
+FINISHED_STATES = (SUCCEEDED, FAILED, CANCELLED)
+
+
+class JobNotFound(KeyError):
+    """Unknown or expired job"""
+
+
+class JobQueueFull(Exception):
+    """Every worker is busy and the queue is full"""
+
+    def __init__(self, retry_after: int):
+        super().__init__(f"Job queue is full, retry in {retry_after}s")
+        self.retry_after = retry_after
+
+
+class JobCancelled(Exception):
+    """Raised inside a job function once the job was cancelled"""
+
+
+class Job:
+    """
+    One submitted job: its state, progress and (once done) its result
+    """
+
+    def __init__(self, job_id: str, kind: str, clock: Callable[[], float]):
+        self.id = job_id
+        self.kind = kind
+        self.status = QUEUED
+        self.progress = 0
+        self.total: Optional[int] = None
+        self.result: Any = None
+        self.error: Optional[str] = None
+        self._clock = clock
+        self.created_at = clock()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self._cancel = threading.Event()
+        self._future: Optional[Future] = None
+        # (loop, future) of requests long-polling this job
+        self._waiters: List = []
+
+    @property
+    def finished(self) -> bool:
+        return self.status in FINISHED_STATES
+
+    @property
+    def cancel_requested(self) -> bool:
+        return self._cancel.is_set()
+
+    def check_cancelled(self):
+        """Call between simulation steps: stops the job if it was cancelled"""
+        if self._cancel.is_set():
+            raise JobCancelled(self.id)
+
+    def report(self, progress: int, total: int = None):
+        """Progress of the job (e.g. steps simulated so far)"""
+        self.progress = progress
+        if total is not None:
+            self.total = total
+
+    def to_dict(self) -> Dict:
+        now = self._clock()
+        info = {
+            'id': self.id,
+            'kind': self.kind,
+            'status': self.status,
+            'progress': self.progress,
+            'total': self.total,
+            'cancel_requested': self.cancel_requested and not self.finished,
+            'queued_seconds': round((self.started_at or self.finished_at or now) - self.created_at, 4),
+            'run_seconds': (
+                round((self.finished_at or now) - self.started_at, 4)
+                if self.started_at is not None else None
+            )
+        }
+        if self.status == SUCCEEDED:
+            info['result'] = self.result
+        if self.status == FAILED:
+            info['error'] = self.error
+        return info
+
+
+class JobManager:
+    """
+    Bounded pool of background jobs with cancellation and long-polling
+    """
+
+    def __init__(self, max_workers: int = 2, max_queue: int = 16,
+                 keep_seconds: float = 600.0, max_finished: int = 256,
+                 clock: Callable[[], float] = time.monotonic):
+        self.max_workers = max(1, max_workers)
+        self.max_queue = max(0, max_queue)
+        self.keep_seconds = keep_seconds
+        self.max_finished = max_finished
+        self._clock = clock
+        self._pool: Optional[ThreadPoolExecutor] = None  # created on first submit
+
+        self._jobs: 'OrderedDict[str, Job]' = OrderedDict()
+        self._active = 0  # queued + running
+        self._lock = threading.Lock()
+
+        # Smoothed run time of finished jobs (for Retry-After)
+        self._mean_seconds: Optional[float] = None
+
+        self.submitted = 0
+        self.rejected = 0
+        self.completed = {SUCCEEDED: 0, FAILED: 0, CANCELLED: 0}
+
+    def submit(self, kind: str, fn: Callable[[Job], Any]) -> Job:
+        """
+        Queue fn(job) to run in the background, returns the job
+
+        Raises JobQueueFull when max_workers + max_queue jobs are active.
+        """
+        with self._lock:
+            self._expire()
+            if self._active >= self.max_workers + self.max_queue:
+                self.rejected += 1
+                raise JobQueueFull(self._retry_after())
+            job = Job(secrets.token_urlsafe(16), kind, self._clock)
+            self._jobs[job.id] = job
+            self._active += 1
+            self.submitted += 1
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(
+                    max_workers=self.max_workers, thread_name_prefix='ml-job'
+                )
+            job._future = self._pool.submit(self._run, job, fn)
+        return job
+
+    def get(self, job_id: str) -> Job:
+        with self._lock:
+            self._expire()
+            job = self._jobs.get(job_id)
+            if job is None:
+                raise JobNotFound(job_id)
+            return job
+
+    async def wait(self, job_id: str, timeout: float) -> Job:
+        """
+        Long-poll: the job once it has finished, or after `timeout` seconds
+        (without holding a thread while waiting)
+        """
+        job = self.get(job_id)
+        if timeout <= 0:
+            return job
+        loop = asyncio.get_running_loop()
+        waiter = loop.create_future()
+        with self._lock:
+            if job.finished:
+                return job
+            job._waiters.append((loop, waiter))
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), timeout)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            with self._lock:
+                if (loop, waiter) in job._waiters:
+                    job._waiters.remove((loop, waiter))
+        return job
+
+    def cancel(self, job_id: str) -> Job:
+        """
+        Cancel a job: queued jobs stop at once, running jobs at their
+        next check_cancelled(). Finished jobs are left as they are.
+        """
+        job = self.get(job_id)
+        job._cancel.set()
+        if job._future is not None and job._future.cancel():
+            # Never started: finish it here
+            self._finish(job, CANCELLED)
+        return job
+
+    def stats(self) -> Dict:
+        with self._lock:
+            self._expire()
+            by_status = {}
+            for job in self._jobs.values():
+                by_status[job.status] = by_status.get(job.status, 0) + 1
+            return {
+                'active': self._active,
+                'max_workers': self.max_workers,
+                'max_queue': self.max_queue,
+                'jobs': by_status,
+                'submitted': self.submitted,
+                'rejected': self.rejected,
+                'completed': dict(self.completed),
+                'mean_run_seconds': (
+                    round(self._mean_seconds, 4) if self._mean_seconds is not None else None
+                )
+            }
+
+    def shutdown(self):
+        """Cancel every job and stop the pool (a later submit starts a new one)"""
+        with self._lock:
+            jobs = list(self._jobs.values())
+        for job in jobs:
+            if not job.finished:
+                self.cancel(job.id)
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def _run(self, job: Job, fn: Callable[[Job], Any]):
+        with self._lock:
+            if job.finished:
+                return
+            job.status = RUNNING
+            job.started_at = self._clock()
+        try:
+            job.check_cancelled()
+            result = fn(job)
+        except JobCancelled:
+            self._finish(job, CANCELLED)
+        except Exception as e:
+            print(f"Error in {job.kind} job {job.id}: {e}")
+            self._finish(job, FAILED, error=str(e))
+        else:
+            self._finish(job, SUCCEEDED, result=result)
+
+    def _finish(self, job: Job, status: str, result: Any = None, error: str = None):
+        with self._lock:
+            if job.finished:
+                return
+            job.result = result
+            job.error = error
+            job.finished_at = self._clock()
+            job.status = status
+            self._active -= 1
+            self.completed[status] += 1
+            if job.started_at is not None:
+                seconds = job.finished_at - job.started_at
+                self._mean_seconds = (
+                    seconds if self._mean_seconds is None
+                    else 0.8 * self._mean_seconds + 0.2 * seconds
+                )
+            # Finished jobs move to the end: expiry walks from the front
+            self._jobs.move_to_end(job.id)
+            waiters, job._waiters = job._waiters, []
+            self._enforce_limits()
+        for loop, waiter in waiters:
+            loop.call_soon_threadsafe(_resolve, waiter)
+
+    def _retry_after(self) -> int:
+        # Time until a queue slot frees up, roughly
+        per_job = self._mean_seconds if self._mean_seconds is not None else 1.0
+        waves = (self._active - self.max_workers + 1) / self.max_workers
+        return int(min(60, max(1, math.ceil(per_job * max(1.0, waves)))))
+
+    def _finished_jobs(self):
+        return [job for job in self._jobs.values() if job.finished]
+
+    def _expire(self):
+        cutoff = self._clock() - self.keep_seconds
+        for job in self._finished_jobs():
+            if job.finished_at > cutoff:
+                break
+            del self._jobs[job.id]
+
+    def _enforce_limits(self):
+        finished = self._finished_jobs()
+        for job in finished[:max(0, len(finished) - self.max_finished)]:
+            del self._jobs[job.id]
+
+
+def _resolve(waiter: asyncio.Future):
+    if not waiter.done():
+        waiter.set_result(None)
@@ -0,0 +1,182 @@
+"""
+micro_batch.py
+
+BEGINNER GUIDE: Micro-batching concurrent requests
+
+At peak many classrooms send the same kind of request at the same
+moment, each with a small pyramid. For 4-20 species the model math is
+tiny; the fixed cost per call (executor hop, model object, NumPy calls
+on tiny arrays) dominates.
+
+A MicroBatcher collects the calls that arrive within a short WINDOW
+(a few milliseconds), or until MAX_BATCH calls are waiting, and runs
+them as ONE vectorized call (the functions of model/batch.py). Each
+caller then gets its own entry of the batch result:
+
+    t=0.0ms  request A arrives -> window opens
+    t=0.4ms  request B arrives
+    t=1.1ms  request C arrives
+    t=2.0ms  window closes     -> run_batch([A, B, C]) -> [a, b, c]
+
+Everything here runs on the event loop (no locks needed); the batch
+itself runs on the model executor like any other model call. Batch
+sizes and how long calls waited in the queue are recorded so the
+window can be tuned: a longer window gives bigger batches but adds
+that much latency to every request.
+"""
+
+import asyncio
+import time
+import weakref
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from service.metrics import LATENCY_BUCKETS, MetricsRegistry
+
+# Batch sizes: 1, 2, 4 ... 1024
+BATCH_SIZE_BUCKETS = tuple(2 ** i for i in range(11))
+
+
+class MicroBatcher:
+    """
+    Groups concurrent submit() calls into batches for run_batch
+
+    run_batch: async function, list of items -> list of results
+               (same length and order)
+    """
+
+    def __init__(self, name: str, run_batch: Callable[[List[Any]], Awaitable[List[Any]]],
+                 window_seconds: float, max_batch: int,
+                 on_batch: Callable[[str, int, List[float]], None] = None):
+        self.name = name
+        self.run_batch = run_batch
+        self.window_seconds = window_seconds
+        self.max_batch = max(1, max_batch)
+        self._on_batch = on_batch
+
+        # Waiting calls per event loop: [(item, future, queued_at)]
+        self._pending: 'weakref.WeakKeyDictionary' = weakref.WeakKeyDictionary()
+        self._timers: 'weakref.WeakKeyDictionary' = weakref.WeakKeyDictionary()
+        self._running = set()  # batch tasks (kept referenced until done)
+
+        self.batches = 0
+        self.items = 0
+        self.largest = 0
+        self.wait_seconds = 0.0
+
+    async def submit(self, item: Any) -> Any:
+        """Queue one item, returns its result once its batch has run"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        pending = self._pending.setdefault(loop, [])
+        pending.append((item, future, time.perf_counter()))
+
+        if len(pending) >= self.max_batch:
+            self._flush(loop)
+        elif loop not in self._timers:
+            self._timers[loop] = loop.call_later(self.window_seconds, self._flush, loop)
+        return await future
+
+    def stats(self) -> Dict:
+        return {
+            'batches': self.batches,
+            'items': self.items,
+            'largest_batch': self.largest,
+            'mean_batch_size': round(self.items / self.batches, 2) if self.batches else None,
+            'mean_wait_ms': (
+                round(1000 * self.wait_seconds / self.items, 3) if self.items else None
+            )
+        }
+
+    def _flush(self, loop):
+        timer = self._timers.pop(loop, None)
+        if timer is not None:
+            timer.cancel()
+        batch = self._pending.pop(loop, [])
+        if batch:
+            task = loop.create_task(self._run(batch))
+            self._running.add(task)
+            task.add_done_callback(self._running.discard)
+
+    async def _run(self, batch):
+        started = time.perf_counter()
+        waits = [started - queued_at for _, _, queued_at in batch]
+        self.batches += 1
+        self.items += len(batch)
+        self.largest = max(self.largest, len(batch))
+        self.wait_seconds += sum(waits)
+        if self._on_batch is not None:
+            self._on_batch(self.name, len(batch), waits)
+
+        try:
+            results = await self.run_batch([item for item, _, _ in batch])
+        except BaseException as e:
+            # One failed call fails every caller of the batch
+            for _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(e)
+            if not isinstance(e, Exception):
+                raise
+            return
+        for (_, future, _), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+
+
+class MicroBatchRegistry:
+    """
+    One MicroBatcher per analysis, sharing the window / size settings
+
+    window_seconds == 0 disables batching (submit is never used).
+    """
+
+    def __init__(self, window_seconds: float, max_batch: int, max_species: int,
+                 registry: Optional[MetricsRegistry] = None):
+        self.window_seconds = max(0.0, window_seconds)
+        self.max_batch = max(1, max_batch)
+        self.max_species = max_species
+        self._batchers: Dict[str, MicroBatcher] = {}
+
+        self._sizes = self._waits = None
+        if registry is not None:
+            self._sizes = registry.histogram(
+                'ml_microbatch_size', 'Calls per micro-batch', ('analysis',), BATCH_SIZE_BUCKETS
+            )
+            self._waits = registry.histogram(
+                'ml_microbatch_wait_seconds', 'Time a call waited for its micro-batch',
+                ('analysis',), LATENCY_BUCKETS
+            )
+
+    @property
+    def enabled(self) -> bool:
+        return self.window_seconds > 0
+
+    def accepts(self, species_data) -> bool:
+        """Only small ecosystems are batched (big ones gain nothing)"""
+        return self.enabled and len(species_data) <= self.max_species
+
+    async def submit(self, name: str, item: Any,
+                     run_batch: Callable[[List[Any]], Awaitable[List[Any]]]) -> Any:
+        """Run `item` as part of the next `name` batch"""
+        batcher = self._batchers.get(name)
+        if batcher is None:
+            batcher = self._batchers[name] = MicroBatcher(
+                name, run_batch, self.window_seconds, self.max_batch, self._record
+            )
+        return await batcher.submit(item)
+
+    def stats(self) -> Dict:
+        return {
+            'enabled': self.enabled,
+            'window_ms': round(1000 * self.window_seconds, 3),
+            'max_batch': self.max_batch,
+            'max_species': self.max_species,
+            'analyses': {name: b.stats() for name, b in self._batchers.items()}
+        }
+
+    def _record(self, name: str, size: int, waits: List[float]):
+        if self._sizes is None:
+            return
+        analysis = name.split(':')[0]
+        self._sizes.observe(size, analysis=analysis)
+        for wait in waits:
+            self._waits.observe(wait, analysis=analysis)
@@ -0,0 +1,79 @@
+"""
+parallel_samples.py
+
+BEGINNER GUIDE: Spreading many model evaluations over processes
+
+A sensitivity analysis evaluates the model for hundreds or thousands of
+parameter samples. Those evaluations are independent, so they are cut
+into CHUNKS and run on a process pool (one chunk per task, every core
+busy).
+
+Sending results back the usual way would pickle every chunk's result
+in the worker and unpickle it again in the server. Instead the server
+creates ONE shared-memory array for all results, [samples, outputs]
+float64, and each worker writes its rows straight into it:
+
+    server:  block = SharedMemory(samples x outputs x 8 bytes)
+    chunk k: rows start_k .. start_k + n_k  -> written by a worker
+    server:  waits for every chunk, copies the array out, frees block
+
+Only the block's name and the row offset travel to the worker; only
+the row count travels back. The chunks go through a ModelExecutor
+(service/executor.py), so they share its bound: too many queued chunks
+make run() raise ExecutorBusy like any other model call.
+"""
+
+import asyncio
+from multiprocessing import shared_memory
+from typing import Callable, Sequence, Tuple
+
+# NumPy is imported inside the functions (see service/startup.py)
+
+from service.executor import ModelExecutor
+
+
+async def gather_rows(executor: ModelExecutor, fn: Callable,
+                      calls: Sequence[Tuple[int, tuple]], shape: Tuple[int, int]):
+    """
+    Run fn(*args) for every (start_row, args) in `calls` on the executor
+    and return the rows they produced as one float64 array of `shape`
+
+    fn must be a module-level function (it is pickled to the workers)
+    returning an array [rows, shape[1]]; its rows land at start_row.
+    """
+    import numpy as np
+
+    block = shared_memory.SharedMemory(create=True, size=max(8, 8 * shape[0] * shape[1]))
+    try:
+        results = await asyncio.gather(
+            *(executor.run(_fill_rows, block.name, shape, start, fn, args)
+              for start, args in calls),
+            return_exceptions=True
+        )
+        # Every chunk has finished (or failed) before the block is freed
+        for result in results:
+            if isinstance(result, BaseException):
+                raise result
+
+        view = np.ndarray(shape, dtype=np.float64, buffer=block.buf)
+        rows = view.copy()
+        del view  # the block cannot close while a view exports its buffer
+        return rows
+    finally:
+        block.close()
+        block.unlink()
+
+
+def _fill_rows(name: str, shape: Tuple[int, int], start: int, fn: Callable, args: tuple) -> int:
+    """Worker side: compute one chunk and write it into the shared block"""
+    import numpy as np
+
+    rows = np.asarray(fn(*args), dtype=np.float64)
+    block = shared_memory.SharedMemory(name=name)
+    try:
+        view = np.ndarray(shape, dtype=np.float64, buffer=block.buf)
+        view[start:start + len(rows)] = rows
+        del view
+    finally:
+        block.close()
+    return len(rows)
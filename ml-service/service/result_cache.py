@@ -0,0 +1,166 @@
+"""
+result_cache.py
+
+BEGINNER GUIDE: Content-addressed cache for ML results
+
+The builder UI posts the same pyramid again every time a modal opens.
+Instead of recomputing, we hash the validated request and keep recent
+results in memory:
+
+    key   = SHA-256 of the request as canonical JSON
+    value = the response we sent last time, pickled
+
+Every hit unpickles a fresh copy, so a caller that changes the result
+it got cannot corrupt later hits. The pickle length is also the size
+the memory budget counts.
+
+The cache is bounded by number of entries AND by (approximate) bytes,
+evicts the least recently used entry first, and drops entries older
+than the TTL.
+"""
+
+import hashlib
+import json
+import pickle
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+
+
+def canonical_key(namespace: str, payload: Any) -> str:
+    """
+    Stable hash of a request payload
+
+    Keys are sorted and whitespace removed, so two requests with the
+    same content always map to the same key. NumPy arrays (columnar
+    payloads) are hashed from their raw bytes.
+    """
+    body = json.dumps(
+        payload, sort_keys=True, separators=(',', ':'),
+        ensure_ascii=False, default=_encode_special
+    )
+    digest = hashlib.sha256()
+    digest.update(namespace.encode('utf-8'))
+    digest.update(b'\0')
+    digest.update(body.encode('utf-8'))
+    return digest.hexdigest()
+
+
+def _encode_special(value: Any) -> Any:
+    """
+    JSON stand-in for values json can't encode (NumPy arrays, etc.)
+    """
+    if hasattr(value, 'tobytes') and hasattr(value, 'dtype'):
+        return {
+            '__ndarray__': hashlib.sha256(value.tobytes()).hexdigest(),
+            'dtype': str(value.dtype),
+            'shape': list(getattr(value, 'shape', ()))
+        }
+    return str(value)
+
+
+def seed_from_key(key: str) -> int:
+    """
+    Deterministic 32-bit RNG seed derived from a cache key
+
+    Seeding the model from the request content makes a fresh
+    computation return exactly what the cache would have returned.
+    """
+    return int(key[:8], 16)
+
+
+class ResultCache:
+    """
+    Thread-safe LRU + TTL cache with a memory budget
+    """
+
+    def __init__(self, max_entries: int = 256, max_bytes: int = 64 * 1024 * 1024,
+                 ttl_seconds: float = 300.0,
+                 clock: Callable[[], float] = time.monotonic):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._clock = clock
+
+        # key -> (pickled value, size_bytes, expires_at); most recent at the end
+        self._entries: 'OrderedDict[str, Tuple[bytes, int, float]]' = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: str) -> Tuple[bool, Any]:
+        """
+        Look up a key. Returns (hit, value); value is a private copy.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return False, None
+
+            value, size, expires_at = entry
+            if expires_at <= self._clock():
+                self._remove(key)
+                self.expirations += 1
+                self.misses += 1
+                return False, None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+        return True, pickle.loads(value)
+
+    def put(self, key: str, value: Any, size: Optional[int] = None) -> bool:
+        """
+        Store (a copy of) a value. Returns False if it is too large to cache.
+        """
+        value = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        if size is None:
+            size = len(value)
+        if size > self.max_bytes or self.max_entries <= 0:
+            return False
+
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+
+            self._entries[key] = (value, size, self._clock() + self.ttl_seconds)
+            self._bytes += size
+
+            # Evict least recently used entries until within budget
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+        return True
+
+    def clear(self):
+        """Drop every entry (counters are kept)"""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict:
+        """Counters and current usage"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_entries': self.max_entries,
+                'max_bytes': self.max_bytes,
+                'ttl_seconds': self.ttl_seconds,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+                'evictions': self.evictions,
+                'expirations': self.expirations
+            }
+
+    def _remove(self, key: str):
+        value, size, expires_at = self._entries.pop(key)
+        self._bytes -= size
@@ -0,0 +1,146 @@
+"""
+sessions.py
+
+BEGINNER GUIDE: Keeping ecosystems on the server between requests
+
+A session holds one IncrementalEcosystem so the client can send small
+changes instead of the whole species list every time.
+
+Sessions use memory, so the store is bounded two ways:
+
+    idle timeout -> a session not used for `idle_seconds` is dropped
+    memory cap   -> if all sessions together exceed `max_bytes` (or
+                    there are more than `max_sessions`), the least
+                    recently used sessions are dropped first
+
+Session ids are random and unguessable, so a client can only touch
+the sessions it created.
+"""
+
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Tuple
+
+
+class SessionNotFound(KeyError):
+    """Unknown, expired or evicted session"""
+
+
+class SessionTooLarge(Exception):
+    """A single session would not fit in the memory cap"""
+
+
+class SessionStore:
+    """
+    Thread-safe LRU store of sessions with idle timeout and memory cap
+
+    Stored objects must provide memory_estimate() -> bytes.
+    """
+
+    def __init__(self, max_sessions: int = 256, max_bytes: int = 256 * 1024 * 1024,
+                 idle_seconds: float = 1800.0,
+                 clock: Callable[[], float] = time.monotonic):
+        self.max_sessions = max_sessions
+        self.max_bytes = max_bytes
+        self.idle_seconds = idle_seconds
+        self._clock = clock
+
+        # id -> (session, size_bytes, last_used); most recent at the end
+        self._sessions: 'OrderedDict[str, Tuple[Any, int, float]]' = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+        self.created = 0
+        self.expired = 0
+        self.evicted = 0
+
+    def create(self, session: Any) -> str:
+        """Store a new session, returns its id"""
+        size = session.memory_estimate()
+        if size > self.max_bytes:
+            raise SessionTooLarge(f"Session needs ~{size} bytes, limit is {self.max_bytes}")
+
+        session_id = secrets.token_urlsafe(16)
+        with self._lock:
+            self._expire()
+            self._sessions[session_id] = (session, size, self._clock())
+            self._bytes += size
+            self.created += 1
+            self._enforce_limits(keep=session_id)
+        return session_id
+
+    def get(self, session_id: str) -> Any:
+        """Fetch a session and mark it as used"""
+        with self._lock:
+            self._expire()
+            entry = self._sessions.get(session_id)
+            if entry is None:
+                raise SessionNotFound(session_id)
+            session, size, _ = entry
+            self._sessions[session_id] = (session, size, self._clock())
+            self._sessions.move_to_end(session_id)
+            return session
+
+    def resize(self, session_id: str):
+        """
+        Re-measure a session after it changed (may evict other sessions)
+        """
+        with self._lock:
+            entry = self._sessions.get(session_id)
+            if entry is None:
+                raise SessionNotFound(session_id)
+            session, old_size, last_used = entry
+            size = session.memory_estimate()
+            if size > self.max_bytes:
+                self._remove(session_id)
+                raise SessionTooLarge(f"Session needs ~{size} bytes, limit is {self.max_bytes}")
+            self._sessions[session_id] = (session, size, last_used)
+            self._bytes += size - old_size
+            self._enforce_limits(keep=session_id)
+
+    def delete(self, session_id: str):
+        with self._lock:
+            if session_id not in self._sessions:
+                raise SessionNotFound(session_id)
+            self._remove(session_id)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            self._expire()
+            return {
+                'sessions': len(self._sessions),
+                'bytes': self._bytes,
+                'max_sessions': self.max_sessions,
+                'max_bytes': self.max_bytes,
+                'idle_seconds': self.idle_seconds,
+                'created': self.created,
+                'expired': self.expired,
+                'evicted': self.evicted
+            }
+
+    def _expire(self):
+        # Oldest-used sessions are at the front: stop at the first live one
+        cutoff = self._clock() - self.idle_seconds
+        while self._sessions:
+            session_id, (_, _, last_used) = next(iter(self._sessions.items()))
+            if last_used > cutoff:
+                break
+            self._remove(session_id)
+            self.expired += 1
+
+    def _enforce_limits(self, keep: str):
+        while len(self._sessions) > 1 and (
+            len(self._sessions) > self.max_sessions or self._bytes > self.max_bytes
+        ):
+            oldest = next(iter(self._sessions))
+            if oldest == keep:
+                self._sessions.move_to_end(keep)
+                continue
+            self._remove(oldest)
+            self.evicted += 1
+
+    def _remove(self, session_id: str):
+        _, size, _ = self._sessions.pop(session_id)
+        self._bytes -= size
@@ -0,0 +1,46 @@
+"""
+settings.py
+
+Small helpers for reading ML service settings from environment
+variables (or a .env file loaded by the process manager).
+"""
+
+import os
+from typing import Sequence
+
+
+def env_str(name: str, default: str) -> str:
+    """Read a string setting"""
+    value = os.getenv(name)
+    return default if value is None or value.strip() == '' else value.strip()
+
+
+def env_int(name: str, default: int) -> int:
+    """Read an integer setting (falls back to default if malformed)"""
+    try:
+        return int(env_str(name, str(default)))
+    except ValueError:
+        return default
+
+
+def env_float(name: str, default: float) -> float:
+    """Read a float setting (falls back to default if malformed)"""
+    try:
+        return float(env_str(name, str(default)))
+    except ValueError:
+        return default
+
+
+def env_flag(name: str, default: bool) -> bool:
+    """Read an on/off setting: 1/true/yes/on enable it"""
+    value = env_str(name, '1' if default else '0').lower()
+    return value in ('1', 'true', 'yes', 'on')
+
+
+def env_choice(name: str, default: str, choices: Sequence[str]) -> str:
+    """Read a setting limited to `choices` (warns and uses default otherwise)"""
+    value = env_str(name, default)
+    if value not in choices:
+        print(f"⚠️ {name}={value!r} is not one of {', '.join(choices)}; using {default!r}")
+        return default
+    return value
@@ -0,0 +1,177 @@
+"""
+species_catalog.py
+
+BEGINNER GUIDE: A shared, memory-mapped species catalog
+
+Most species in requests come from the same library (the species
+collection behind server/models/speciesModel.js and the biome
+templates), yet every request sends each full record again and every
+worker parses it again.
+
+A catalog file stores that library once, in a layout the service can
+memory-map read-only:
+
+    magic        4 bytes  b'ECOC'
+    version      uint16   1
+    reserved     uint16   0
+    num_species  uint32   rows
+    meta_size    uint32   bytes of the metadata section
+    metadata     UTF-8 JSON {"ids", "names", "icons", "trophicLevels"},
+                 padded to 8 bytes
+    biomass      float64 x num_species   (little-endian)
+    energy       float64 x num_species
+    population   float64 x num_species
+
+The numeric columns are NumPy views straight onto the mapped file: they
+are never parsed or copied as a whole, and since the file is mapped
+read-only the OS shares its pages between all uvicorn workers. A request
+then only names species by ID (plus optional overrides), and only the
+rows it asks for are gathered. The small metadata section is decoded
+once per worker.
+
+Build a catalog from a JSON array of species (e.g. `mongoexport
+--jsonArray` of the species collection, or the biome templates):
+
+    python -m service.species_catalog species.json species.ecocat
+
+and point ML_SPECIES_CATALOG at the result.
+"""
+
+import json
+import mmap
+import struct
+import numpy as np
+from typing import Dict, Iterable, List, Sequence
+
+CATALOG_MAGIC = b'ECOC'
+CATALOG_VERSION = 1
+_HEADER = struct.Struct('<4sHHII')
+
+NUMERIC_COLUMNS = ('biomass', 'energy', 'population')
+DEFAULT_ICON = '🔹'
+
+
+class SpeciesCatalog:
+    """
+    Read-only species catalog backed by a memory-mapped file
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, 'rb') as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, _, num_species, meta_size = _HEADER.unpack_from(self._map)
+        if magic != CATALOG_MAGIC or version != CATALOG_VERSION:
+            raise ValueError(f"{path} is not an ECOC v1 species catalog")
+
+        offset = _HEADER.size
+        meta = json.loads(bytes(self._map[offset:offset + meta_size]).decode('utf-8'))
+        offset += meta_size
+
+        self.ids: List[str] = meta['ids']
+        self.names: List[str] = meta['names']
+        self.icons: List[str] = meta['icons']
+        self.trophic_levels: List[str] = meta['trophicLevels']
+        self._rows = {species_id: row for row, species_id in enumerate(self.ids)}
+
+        # Read-only views onto the mapped file (no copy)
+        self.columns: Dict[str, np.ndarray] = {}
+        for name in NUMERIC_COLUMNS:
+            self.columns[name] = np.frombuffer(
+                self._map, dtype='<f8', count=num_species, offset=offset
+            )
+            offset += 8 * num_species
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def rows(self, ids: Sequence[str]) -> np.ndarray:
+        """
+        Row of each ID, raises ValueError naming unknown IDs
+        """
+        rows = [self._rows.get(species_id, -1) for species_id in ids]
+        if -1 in rows:
+            unknown = sorted({i for i, row in zip(ids, rows) if row == -1})
+            raise ValueError(f"Unknown species catalog IDs: {', '.join(unknown[:10])}")
+        return np.array(rows, dtype=np.int64)
+
+    def select(self, ids: Sequence[str]) -> Dict:
+        """
+        Columns of the requested species, in SpeciesColumns layout
+        (numeric columns are gathered from the mapped buffer)
+        """
+        rows = self.rows(ids)
+        selected = rows.tolist()
+        return {
+            'name': [self.names[row] for row in selected],
+            'trophicLevel': [self.trophic_levels[row] for row in selected],
+            'icon': [self.icons[row] for row in selected],
+            **{name: column[rows] for name, column in self.columns.items()}
+        }
+
+    def stats(self) -> Dict:
+        return {
+            "path": self.path,
+            "num_species": len(self),
+            "mapped_bytes": len(self._map)
+        }
+
+
+def write_catalog(path: str, species: Iterable[Dict]) -> int:
+    """
+    Write species dicts to a catalog file, returns the number of species
+
+    Each species needs an ID (`id`, or a MongoDB `_id` either as a
+    string or as {"$oid": ...}), a name and a trophicLevel.
+    """
+    species = list(species)
+    ids = [species_id(s) for s in species]
+    if len(set(ids)) != len(ids):
+        raise ValueError("Species catalog IDs must be unique")
+
+    meta = json.dumps({
+        'ids': ids,
+        'names': [s['name'] for s in species],
+        'icons': [s.get('icon', DEFAULT_ICON) for s in species],
+        'trophicLevels': [s['trophicLevel'] for s in species]
+    }, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    # Pad so the float64 columns start 8-byte aligned
+    meta += b' ' * (-(_HEADER.size + len(meta)) % 8)
+
+    columns = [
+        np.asarray([float(s.get(name, 0)) for s in species], dtype='<f8')
+        for name in NUMERIC_COLUMNS
+    ]
+    if not all(np.isfinite(column).all() for column in columns):
+        raise ValueError("Species catalog numbers must be finite")
+
+    with open(path, 'wb') as f:
+        f.write(_HEADER.pack(CATALOG_MAGIC, CATALOG_VERSION, 0, len(species), len(meta)))
+        f.write(meta)
+        for column in columns:
+            f.write(column.tobytes())
+    return len(species)
+
+
+def species_id(species: Dict) -> str:
+    """ID of a species record (plain `id`, or a MongoDB `_id`)"""
+    value = species.get('id', species.get('_id'))
+    if isinstance(value, dict):
+        value = value.get('$oid')
+    if value is None:
+        raise ValueError(f"Species '{species.get('name')}' has no id")
+    return str(value)
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Build a species catalog file")
+    parser.add_argument('source', help="JSON array of species records")
+    parser.add_argument('output', help="catalog file to write")
+    args = parser.parse_args()
+
+    with open(args.source, encoding='utf-8') as f:
+        count = write_catalog(args.output, json.load(f))
+    print(f"Wrote {count} species to {args.output}")
@@ -0,0 +1,110 @@
+"""
+startup.py
+
+BEGINNER GUIDE: Fast cold starts
+
+The service may run on a host that scales to zero: after a quiet period
+the process is stopped, and the next request has to wait for a fresh
+process to import everything and answer. Two things make that first
+request slow:
+
+    1. Imports   - NumPy and the model modules take a while to import
+    2. First use - the first call of each analysis pays for lazily
+                   created objects, caches and code paths
+
+ModelLoader runs the model import (`load`) at most once, from whoever
+needs it first: the lifespan hook at startup, or the first request when
+imports are deferred (ML_LAZY_IMPORTS=1). Then `warm_up` runs every
+analysis once on WARMUP_ECOSYSTEM, so real requests find everything ready.
+Both steps are timed and reported on /api/models/status.
+"""
+
+import asyncio
+import threading
+import time
+from typing import Callable, Dict, Optional
+
+# Built-in template used to warm up the model (grassland biome of the
+# frontend, client/src/data/biomes.js)
+WARMUP_ECOSYSTEM = [
+    {'name': 'Grass', 'trophicLevel': 'producer', 'biomass': 10000,
+     'energy': 100000, 'population': 1000000, 'icon': '🌱'},
+    {'name': 'Grasshopper', 'trophicLevel': 'primary_consumer', 'biomass': 1000,
+     'energy': 10000, 'population': 100000, 'icon': '🦗'},
+    {'name': 'Frog', 'trophicLevel': 'secondary_consumer', 'biomass': 100,
+     'energy': 1000, 'population': 10000, 'icon': '🐸'},
+    {'name': 'Hawk', 'trophicLevel': 'tertiary_consumer', 'biomass': 10,
+     'energy': 100, 'population': 1000, 'icon': '🦅'}
+]
+
+
+class ModelLoader:
+    """
+    Imports and warms up the model once, and remembers how long it took
+
+    load:    imports the model, returns True if it is available
+    warm_up: runs the model code paths once
+    """
+
+    def __init__(self, load: Callable[[], bool], warm_up: Callable[[], None]):
+        self._load = load
+        self._warm_up = warm_up
+        self._lock = threading.Lock()
+        self.available: Optional[bool] = None  # None = not imported yet
+        self.warmed_up = False
+        self.import_seconds: Optional[float] = None
+        self.warmup_seconds: Optional[float] = None
+        self.warmup_error: Optional[str] = None
+
+    @property
+    def loaded(self) -> bool:
+        return self.available is not None
+
+    def load(self) -> bool:
+        """Import the model (only the first call does the work)"""
+        with self._lock:
+            if self.available is None:
+                start = time.perf_counter()
+                self.available = bool(self._load())
+                self.import_seconds = time.perf_counter() - start
+            return self.available
+
+    def warm(self) -> None:
+        """Import the model if needed, then run the warm-up once"""
+        if not self.load():
+            return
+        with self._lock:
+            if self.warmed_up:
+                return
+            start = time.perf_counter()
+            try:
+                self._warm_up()
+            except Exception as e:
+                # A failed warm-up only costs speed, never requests
+                self.warmup_error = str(e)
+                print(f"⚠️ Model warm-up failed: {e}")
+            self.warmup_seconds = time.perf_counter() - start
+            self.warmed_up = True
+
+    async def ensure_loaded(self) -> bool:
+        """load() without blocking the event loop"""
+        if self.loaded:
+            return self.available
+        return await asyncio.to_thread(self.load)
+
+    def stats(self) -> Dict:
+        return {
+            "state": (
+                "warm" if self.warmed_up
+                else "loaded" if self.loaded
+                else "deferred"
+            ),
+            "model_available": self.available,
+            "import_seconds": _rounded(self.import_seconds),
+            "warmup_seconds": _rounded(self.warmup_seconds),
+            "warmup_error": self.warmup_error
+        }
+
+
+def _rounded(seconds: Optional[float]) -> Optional[float]:
+    return None if seconds is None else round(seconds, 4)
@@ -0,0 +1,234 @@
+"""
+trajectory_format.py
+
+BEGINNER GUIDE: Compact encodings for trajectory timelines
+
+The default trajectory response repeats every species name at every
+step:
+
+    {"step": 0, "species_data": {"Grass": 5000, "Rabbit": 300, ...}}
+
+so its size grows with steps x species x name length. Clients that ask
+for it (with the Accept header) can get a "table" instead: the names
+once, plus a steps x species matrix of populations.
+
+    Accept: application/vnd.ecopyramid.trajectory+json     -> compact JSON
+    Accept: application/vnd.ecopyramid.trajectory+float32  -> binary (below)
+    Accept: application/msgpack                            -> msgpack
+                                                              (if installed)
+
+Binary layout (all little-endian, every section 4-byte aligned):
+
+    magic        4 bytes  b'ECOT'
+    version      uint16   1
+    reserved     uint16   0
+    num_steps    uint32   rows
+    num_species  uint32   columns
+    names_size   uint32   bytes of the names section
+    names        UTF-8 JSON array of species names, padded to 4 bytes
+    steps        uint32  x num_steps
+    health       float32 x num_steps
+    populations  float32 x num_steps x num_species (row = one step)
+"""
+
+import json
+import struct
+from typing import Dict, Iterable, List, Optional
+
+# NumPy is imported inside the functions that need it, so importing this
+# module (and the app) stays cheap with ML_LAZY_IMPORTS (service/startup.py)
+
+COMPACT_JSON = 'compact'
+BINARY_FLOAT32 = 'float32'
+MSGPACK = 'msgpack'
+
+MEDIA_TYPES = {
+    'application/vnd.ecopyramid.trajectory+json': COMPACT_JSON,
+    'application/vnd.ecopyramid.trajectory+float32': BINARY_FLOAT32,
+    'application/msgpack': MSGPACK,
+    'application/x-msgpack': MSGPACK
+}
+CONTENT_TYPES = {
+    COMPACT_JSON: 'application/vnd.ecopyramid.trajectory+json',
+    BINARY_FLOAT32: 'application/vnd.ecopyramid.trajectory+float32',
+    MSGPACK: 'application/msgpack'
+}
+
+BINARY_MAGIC = b'ECOT'
+BINARY_VERSION = 1
+_BINARY_HEADER = struct.Struct('<4sHHIII')
+
+
+def msgpack_available() -> bool:
+    """msgpack is an optional dependency"""
+    try:
+        import msgpack  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def negotiate_format(accept: str) -> Optional[str]:
+    """
+    Pick a compact format from an Accept header
+
+    Returns None when the client did not ask for one of them (or
+    prefers plain JSON), in which case the usual timeline is sent.
+    """
+    best = None
+    best_q = 0.0
+    default_q = 0.0
+    for item in accept.split(','):
+        parts = [part.strip() for part in item.split(';')]
+        media_type = parts[0].lower()
+        q = 1.0
+        for param in parts[1:]:
+            if param.startswith('q='):
+                try:
+                    q = float(param[2:])
+                except ValueError:
+                    q = 0.0
+
+        fmt = MEDIA_TYPES.get(media_type)
+        if fmt == MSGPACK and not msgpack_available():
+            fmt = None
+        if fmt is not None and q > best_q:
+            best, best_q = fmt, q
+        elif media_type == 'application/json':
+            default_q = max(default_q, q)
+
+    if best is None or best_q < default_q:
+        return None
+    return best
+
+
+def table_from_timeline(timeline: Iterable[Dict]) -> Dict:
+    """
+    Convert a list of timeline entries into the table layout
+    (used for the fallback trajectory)
+    """
+    import numpy as np
+
+    timeline = list(timeline)
+    names = list(timeline[0]['species_data']) if timeline else []
+    populations = np.array(
+        [[entry['species_data'][name] for name in names] for entry in timeline],
+        dtype=np.float64
+    ).reshape(len(timeline), len(names))
+    return {
+        'names': names,
+        'steps': [entry['step'] for entry in timeline],
+        'ecosystem_health': [entry['ecosystem_health'] for entry in timeline],
+        'populations': populations
+    }
+
+
+def encode_table(fmt: str, table: Dict, source: str, model_version: str) -> bytes:
+    """
+    Encode a trajectory table in one of the compact formats
+    """
+    if fmt == COMPACT_JSON:
+        return encode_compact_json(table, source, model_version)
+    if fmt == BINARY_FLOAT32:
+        return encode_float32(table)
+    if fmt == MSGPACK:
+        return encode_msgpack(table, source, model_version)
+    raise ValueError(f"Unknown trajectory format: {fmt}")
+
+
+def encode_compact_json(table: Dict, source: str, model_version: str) -> bytes:
+    """
+    {"success": true, "data": {"names", "steps", "ecosystem_health",
+    "populations": [[...], ...]}, "model_version", "source"}
+    """
+    body = {
+        'success': True,
+        'data': _plain_table(table),
+        'model_version': model_version,
+        'source': source
+    }
+    return json.dumps(body, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def encode_msgpack(table: Dict, source: str, model_version: str) -> bytes:
+    """
+    Same structure as the compact JSON, packed with msgpack
+    """
+    import msgpack
+
+    body = {
+        'success': True,
+        'data': _plain_table(table),
+        'model_version': model_version,
+        'source': source
+    }
+    return msgpack.packb(body, use_bin_type=True)
+
+
+def encode_float32(table: Dict) -> bytes:
+    """
+    Raw float32 matrix with a small header (layout in the module docstring)
+    """
+    import numpy as np
+
+    populations = np.asarray(table['populations'], dtype='<f4')
+    num_steps, num_species = populations.shape
+
+    steps = np.asarray(table['steps'], dtype=np.int64)
+    if len(steps) and (steps.min() < 0 or steps.max() > 0xFFFFFFFF):
+        raise ValueError("Steps must fit in uint32 for the binary format")
+
+    names = json.dumps(table['names'], ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    names += b' ' * (-len(names) % 4)
+
+    header = _BINARY_HEADER.pack(
+        BINARY_MAGIC, BINARY_VERSION, 0, num_steps, num_species, len(names)
+    )
+    return b''.join([
+        header,
+        names,
+        steps.astype('<u4').tobytes(),
+        np.asarray(table['ecosystem_health'], dtype='<f4').tobytes(),
+        populations.tobytes()
+    ])
+
+
+def decode_float32(data: bytes) -> Dict:
+    """
+    Inverse of encode_float32 (handy for Python clients and scripts)
+    """
+    import numpy as np
+
+    magic, version, _, num_steps, num_species, names_size = _BINARY_HEADER.unpack_from(data)
+    if magic != BINARY_MAGIC or version != BINARY_VERSION:
+        raise ValueError("Not an ECOT v1 trajectory")
+
+    offset = _BINARY_HEADER.size
+    names = json.loads(data[offset:offset + names_size].decode('utf-8'))
+    offset += names_size
+    steps = np.frombuffer(data, dtype='<u4', count=num_steps, offset=offset)
+    offset += 4 * num_steps
+    health = np.frombuffer(data, dtype='<f4', count=num_steps, offset=offset)
+    offset += 4 * num_steps
+    populations = np.frombuffer(
+        data, dtype='<f4', count=num_steps * num_species, offset=offset
+    ).reshape(num_steps, num_species)
+
+    return {
+        'names': names,
+        'steps': steps.tolist(),
+        'ecosystem_health': health.astype(np.int64).tolist(),
+        'populations': populations
+    }
+
+
+def _plain_table(table: Dict) -> Dict:
+    """Table with the matrix as nested lists of ints"""
+    from model.numeric import truncate_to_ints
+
+    return {
+        'names': list(table['names']),
+        'steps': list(table['steps']),
+        'ecosystem_health': list(table['ecosystem_health']),
+        'populations': truncate_to_ints(table['populations'])
+    }
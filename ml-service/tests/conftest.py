@@ -0,0 +1,58 @@
+"""
+Shared fixtures for the ML service tests
+
+    cd ml-service
+    pip install -r tests/requirements.txt
+    python -m pytest
+"""
+
+import os
+import sys
+
+import pytest
+
+# The biome templates are parsed by the benchmark helpers
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'benchmarks'))
+
+from ecosystems import load_templates, make_ecosystem  # noqa: E402
+
+BIOME_NAMES = ('grassland', 'forest', 'aquatic', 'desert', 'tundra')
+
+
+def make_species(name, trophic_level, population, biomass, energy=100.0, icon='🔹'):
+    return {
+        'name': name,
+        'icon': icon,
+        'trophicLevel': trophic_level,
+        'biomass': biomass,
+        'energy': energy,
+        'population': population
+    }
+
+
+def biome(name):
+    """The four species of one biome template (client/src/data/biomes.js)"""
+    start = BIOME_NAMES.index(name) * 4
+    species_list = load_templates()[start:start + 4]
+    return [
+        make_species(s['name'], s['trophicLevel'], s['population'], s['biomass'],
+                     s['energy'], s['icon'])
+        for s in species_list
+    ]
+
+
+@pytest.fixture
+def pyramid():
+    """Small four-level food chain"""
+    return [
+        make_species('Grass', 'producer', 5000, 1000, 10000, '🌿'),
+        make_species('Rabbit', 'primary_consumer', 300, 200, 1000, '🐇'),
+        make_species('Fox', 'secondary_consumer', 40, 60, 200, '🦊'),
+        make_species('Eagle', 'tertiary_consumer', 8, 20, 50, '🦅')
+    ]
+
+
+@pytest.fixture
+def large_ecosystem():
+    """1,000 species grown from the biome templates (fixed seed)"""
+    return make_ecosystem(1000)
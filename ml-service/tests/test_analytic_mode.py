@@ -0,0 +1,104 @@
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+from app import MAX_TIME_STEPS, MAX_TRAJECTORY_STEP, app
+from model.cascade_model import predict_population_table, predict_populations
+from model.population_engine import PopulationEngine, PopulationOverflow
+
+
+def test_analytic_matches_iterative(pyramid):
+    iterative = predict_population_table(pyramid, 200)
+    analytic = predict_population_table(pyramid, 200, mode='analytic')
+    assert analytic['steps'] == iterative['steps']
+    np.testing.assert_allclose(analytic['populations'], iterative['populations'], rtol=1e-9, atol=1)
+
+
+def test_analytic_sparse_steps_match_iterative(large_ecosystem):
+    steps = [5000, 0, 77, 5000]
+    engine = PopulationEngine(
+        [s['name'] for s in large_ecosystem],
+        [s['population'] for s in large_ecosystem],
+        [0] * len(large_ecosystem)
+    )
+    expected = np.array([s['population'] for s in large_ecosystem]) * 1.025 ** 5001
+    np.testing.assert_allclose(engine.populations_at(5000), expected, rtol=1e-12)
+
+    analytic = predict_populations(large_ecosystem, 12, mode='analytic', steps=steps)
+    iterative = predict_populations(large_ecosystem, 12, steps=steps)
+    assert [entry['step'] for entry in analytic] == [0, 77, 5000]
+    for a, b in zip(analytic, iterative):
+        for name, value in a['species_data'].items():
+            assert value == pytest.approx(b['species_data'][name], rel=1e-9, abs=1)
+
+
+@pytest.mark.parametrize('mode', ['iterative', 'analytic'])
+def test_overflow_raises(pyramid, mode):
+    with pytest.raises(PopulationOverflow, match='step'):
+        predict_populations(pyramid, 12, mode=mode, steps=[40000])
+    with pytest.raises(PopulationOverflow):
+        predict_population_table(pyramid, 12, mode=mode, steps=[1, 40000])
+
+
+def test_iterative_overflow_stops_early(pyramid):
+    # Fails at the first non-finite step, not after a million steps
+    with pytest.raises(PopulationOverflow) as error:
+        predict_populations(pyramid, 12, steps=[MAX_TRAJECTORY_STEP])
+    step = int(str(error.value).split('step ')[1].split(':')[0])
+    assert step < 40000
+
+
+def trajectory_request(pyramid, **fields):
+    return {'species': pyramid, **fields}
+
+
+@pytest.mark.parametrize('accept', ['application/json', 'application/vnd.ecopyramid.trajectory+json'])
+def test_overflow_is_a_422(pyramid, accept):
+    with TestClient(app) as client:
+        response = client.post(
+            '/api/predict/trajectory',
+            json=trajectory_request(pyramid, mode='analytic', steps=[30000]),
+            headers={'Accept': accept, 'Cache-Control': 'no-store'}
+        )
+    assert response.status_code == 422
+    assert 'overflow' in response.json()['detail']
+
+
+@pytest.mark.parametrize('fields', [
+    {'steps': [MAX_TRAJECTORY_STEP + 1]},
+    {'steps': [-1]},
+    {'timeSteps': MAX_TIME_STEPS + 1},
+    {'timeSteps': -1}
+])
+def test_horizon_is_bounded(pyramid, fields):
+    with TestClient(app) as client:
+        response = client.post('/api/predict/trajectory', json=trajectory_request(pyramid, **fields))
+    assert response.status_code == 422
+
+
+def test_large_analytic_step_within_range(pyramid):
+    with TestClient(app) as client:
+        response = client.post(
+            '/api/predict/trajectory',
+            json=trajectory_request(pyramid, mode='analytic', steps=[0, 20000])
+        )
+    assert response.status_code == 200
+    timeline = response.json()['data']['timeline']
+    assert [entry['step'] for entry in timeline] == [0, 20000]
+    assert timeline[1]['species_data']['Grass'] == pytest.approx(5000 * 1.025 ** 20001, rel=1e-9)
+
+
+@pytest.mark.parametrize('mode', ['analytic', 'lotka_volterra'])
+def test_non_positive_populations_match_iterative(mode):
+    species = [
+        {'name': 'a', 'trophicLevel': 'producer', 'biomass': 100, 'energy': 10, 'population': -50},
+        {'name': 'b', 'trophicLevel': 'producer', 'biomass': 100, 'energy': 10, 'population': 0},
+        {'name': 'c', 'trophicLevel': 'primary_consumer', 'biomass': 10, 'energy': 5, 'population': 20}
+    ]
+    iterative = predict_populations(species, 3)
+    assert [entry['species_data']['a'] for entry in iterative] == [0, 0, 0]
+    if mode == 'analytic':
+        assert predict_populations(species, 3, mode=mode) == iterative
+    else:
+        for entry in predict_populations(species, 3, mode=mode):
+            assert entry['species_data']['a'] == entry['species_data']['b'] == 0
@@ -0,0 +1,153 @@
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+import app as service
+from conftest import BIOME_NAMES, biome, make_ecosystem, make_species
+from model.batch import EcosystemBatch, batch_cascade, batch_invasive, batch_risk, batch_trajectory
+from model.cascade_model import (
+    analyze_cascade, analyze_invasive, assess_extinction_risks, predict_populations
+)
+
+LEVELS = ('producer', 'primary_consumer', 'secondary_consumer', 'tertiary_consumer')
+
+
+def random_ecosystems(count, seed=0):
+    rng = np.random.default_rng(seed)
+    ecosystems = []
+    for e in range(count):
+        size = int(rng.integers(0, 9))
+        ecosystems.append([
+            make_species(f'S{int(rng.integers(5))}', LEVELS[rng.integers(4)],
+                         float(rng.integers(0, 200)), float(rng.integers(1, 300)))
+            for _ in range(size)
+        ])
+    return ecosystems
+
+
+@pytest.fixture
+def ecosystems():
+    return random_ecosystems(40) + [biome(name) for name in BIOME_NAMES] + [make_ecosystem(30)]
+
+
+def pick_targets(ecosystems, seed=1):
+    rng = np.random.default_rng(seed)
+    return [eco[rng.integers(len(eco))] if eco else make_species('Nobody', LEVELS[rng.integers(4)], 1, 1)
+            for eco in ecosystems]
+
+
+def test_batch_layout(ecosystems):
+    batch = EcosystemBatch(ecosystems)
+    assert len(batch) == len(ecosystems)
+    assert batch.num_species == sum(len(eco) for eco in ecosystems)
+    for index, eco in enumerate(ecosystems):
+        segment = batch.segment(index)
+        assert batch.population[segment].tolist() == [s['population'] for s in eco]
+        assert (batch.ecosystem[segment] == index).all()
+
+
+def test_cascade_matches_single_calls(ecosystems):
+    targets = pick_targets(ecosystems)
+    seeds = list(range(len(ecosystems)))
+    assert batch_cascade(ecosystems, targets, seeds) == [
+        analyze_cascade(eco, target, seed) for eco, target, seed in zip(ecosystems, targets, seeds)
+    ]
+    assert batch_cascade(ecosystems, targets, seeds, ensemble_size=50) == [
+        analyze_cascade(eco, target, seed, ensemble_size=50)
+        for eco, target, seed in zip(ecosystems, targets, seeds)
+    ]
+
+
+def test_invasive_matches_single_calls(ecosystems):
+    invasives = pick_targets(ecosystems, seed=2)
+    strengths = [index % 11 for index in range(len(ecosystems))]
+    assert batch_invasive(ecosystems, invasives, strengths) == [
+        analyze_invasive(eco, invasive, strength)
+        for eco, invasive, strength in zip(ecosystems, invasives, strengths)
+    ]
+
+
+@pytest.mark.parametrize('mode, steps', [
+    ('iterative', None), ('analytic', None), ('analytic', [0, 40, 7]), ('lotka_volterra_rk45', [0, 11])
+])
+def test_trajectory_matches_single_calls(ecosystems, mode, steps):
+    ecosystems = ecosystems[-8:]
+    assert batch_trajectory(ecosystems, 12, mode, steps) == [
+        predict_populations(eco, 12, mode, steps) for eco in ecosystems
+    ]
+
+
+def test_risk_matches_single_calls(ecosystems):
+    assert batch_risk(ecosystems) == [assess_extinction_risks(eco) for eco in ecosystems]
+
+
+def test_mismatched_inputs():
+    with pytest.raises(ValueError):
+        batch_cascade([biome('forest')], [])
+    with pytest.raises(ValueError):
+        batch_trajectory([biome('forest')], 12, 'sideways')
+
+
+@pytest.fixture
+def client():
+    service.result_cache.clear()
+    with TestClient(service.app) as client:
+        yield client
+
+
+def test_batch_endpoints_match_the_single_endpoints(client):
+    ecosystems = [biome(name) for name in BIOME_NAMES]
+    targets = pick_targets(ecosystems)
+
+    body = {'seed': 100, 'ecosystems': [
+        {'species': eco, 'targetSpecies': target} for eco, target in zip(ecosystems, targets)
+    ]}
+    body['ecosystems'][2]['seed'] = 7
+    results = client.post('/api/batch/cascade', json=body).json()['data']['results']
+    for index, (eco, target) in enumerate(zip(ecosystems, targets)):
+        seed = 7 if index == 2 else 100 + index
+        single = client.post('/api/analyze/cascade', json={
+            'speciesArray': eco, 'targetSpecies': target, 'seed': seed
+        }).json()['data']
+        assert results[index] == single
+
+    body = {'ecosystems': [
+        {'species': eco, 'invasiveSpecies': target, 'invasionStrength': 3}
+        for eco, target in zip(ecosystems, targets)
+    ]}
+    results = client.post('/api/batch/invasive', json=body).json()['data']['results']
+    assert results == [
+        client.post('/api/analyze/invasive', json={
+            'currentSpecies': eco, 'invasiveSpecies': target, 'invasionStrength': 3
+        }).json()['data']
+        for eco, target in zip(ecosystems, targets)
+    ]
+
+    body = {'ecosystems': [{'species': eco} for eco in ecosystems], 'mode': 'analytic', 'steps': [3, 30]}
+    results = client.post('/api/batch/trajectory', json=body).json()['data']['results']
+    assert [result['timeline'] for result in results] == [
+        client.post('/api/predict/trajectory', json={'species': eco, 'mode': 'analytic', 'steps': [3, 30]}).json()['data']['timeline']
+        for eco in ecosystems
+    ]
+
+    body = {'ecosystems': [{'species': eco} for eco in ecosystems]}
+    response = client.post('/api/batch/health', json=body).json()['data']
+    assert response['num_ecosystems'] == len(ecosystems)
+    assert response['results'] == [
+        client.post('/api/ecosystem/health', json={'species': eco}).json()['data'] for eco in ecosystems
+    ]
+
+
+def test_batch_validation(client, pyramid):
+    columns = {
+        'name': [s['name'] for s in pyramid], 'trophicLevel': [s['trophicLevel'] for s in pyramid],
+        'biomass': [1, 2, 3, 4], 'energy': [1, 2, 3, 4], 'population': [s['population'] for s in pyramid]
+    }
+    ok = client.post('/api/batch/health', json={'ecosystems': [{'speciesColumns': columns}, {'species': pyramid}]})
+    assert ok.status_code == 200
+    assert client.post('/api/batch/health', json={'ecosystems': []}).status_code == 422
+    assert client.post('/api/batch/health', json={'ecosystems': [{}]}).status_code == 422
+    too_many = {'ecosystems': [{'species': pyramid}] * (service.MAX_BATCH_ECOSYSTEMS + 1)}
+    assert client.post('/api/batch/health', json=too_many).status_code == 422
+    overflow = {'ecosystems': [{'species': pyramid}], 'mode': 'analytic', 'steps': [40000]}
+    assert client.post('/api/batch/trajectory', json=overflow).status_code == 422
@@ -0,0 +1,73 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from app import app
+from conftest import make_species
+from model.cascade_model import EcosystemCascadeModel, analyze_cascade
+
+
+@pytest.fixture
+def food_chain(pyramid):
+    # Two direct predators of the rabbit, so several columns are random
+    return pyramid + [make_species('Owl', 'secondary_consumer', 30, 40)]
+
+
+def test_same_seed_same_ensemble(food_chain):
+    a = analyze_cascade(food_chain, food_chain[1], seed=7, ensemble_size=500)
+    b = analyze_cascade(food_chain, food_chain[1], seed=7, ensemble_size=500)
+    c = analyze_cascade(food_chain, food_chain[1], seed=8, ensemble_size=500)
+    assert a == b
+    assert a != c
+    assert a['ensemble_size'] == 500
+
+
+def test_ensemble_statistics(food_chain):
+    result = analyze_cascade(food_chain, food_chain[1], seed=1, ensemble_size=20000)
+    by_name = {s['name']: s for s in result['affected_species']}
+    assert set(by_name) == {'Fox', 'Owl', 'Eagle'}
+
+    for name in ('Fox', 'Owl'):
+        fox = by_name[name]
+        # Direct predators lose 60 +/- 10 (uniform)
+        assert fox['population_loss'] == pytest.approx(60, abs=0.3)
+        assert fox['population_loss_p5'] == pytest.approx(51, abs=0.3)
+        assert fox['population_loss_p95'] == pytest.approx(69, abs=0.3)
+        assert fox['extinction_probability'] == pytest.approx(0.6, abs=0.003)
+        assert fox['prob_loss_over_90'] == 0
+
+    # Two levels up: fixed loss, no spread
+    eagle = by_name['Eagle']
+    assert eagle['population_loss'] == eagle['population_loss_p5'] == eagle['population_loss_p95'] == 20
+    assert eagle['extinction_probability'] == 0.2
+    assert result['expected_extinctions'] == 0
+
+
+def test_chunked_sampling_gives_the_same_statistics(food_chain):
+    model = EcosystemCascadeModel(seed=3)
+    model.ENSEMBLE_CHUNK_ELEMENTS = 5000  # one column per chunk
+    chunked = model.predict_cascade_effect(food_chain, food_chain[1], ensemble_size=5000)
+    whole = analyze_cascade(food_chain, food_chain[1], seed=3, ensemble_size=5000)
+    whole_by_name = {s['name']: s for s in whole['affected_species']}
+    assert len(chunked['affected_species']) == len(whole_by_name)
+    for species in chunked['affected_species']:
+        expected = whole_by_name[species['name']]['population_loss']
+        assert species['population_loss'] == pytest.approx(expected, abs=0.5)
+
+
+def test_single_draw_without_ensemble(food_chain):
+    result = analyze_cascade(food_chain, food_chain[1], seed=2)
+    assert 'ensemble_size' not in result
+    for species in result['affected_species']:
+        assert 'population_loss_p5' not in species
+        if species['affected_by'] == 'direct':
+            assert 50 <= species['population_loss'] <= 70
+
+
+def test_endpoint(food_chain):
+    body = {'speciesArray': food_chain, 'targetSpecies': food_chain[1], 'ensembleSize': 1000, 'seed': 5}
+    with TestClient(app) as client:
+        response = client.post('/api/analyze/cascade', json=body)
+        too_many = client.post('/api/analyze/cascade', json=dict(body, ensembleSize=100001))
+    assert response.status_code == 200
+    assert response.json()['data'] == analyze_cascade(food_chain, food_chain[1], seed=5, ensemble_size=1000)
+    assert too_many.status_code == 422
@@ -0,0 +1,150 @@
+import pytest
+from fastapi.testclient import TestClient
+
+import app as service
+from conftest import biome
+from model.cascade_model import predict_populations, predict_populations_checkpointed
+from model.ecosystem import CompiledEcosystem, compile_ecosystem
+from service.checkpoints import CheckpointStore, InvalidCheckpoint
+
+MODES = ['iterative', 'analytic', 'lotka_volterra', 'lotka_volterra_rk45']
+
+
+@pytest.mark.parametrize('mode', MODES)
+def test_resuming_matches_one_long_run(mode):
+    species = biome('forest')
+    first = predict_populations_checkpointed(species, 12, mode)
+    assert first['checkpoint']['step'] == 12
+    assert first['timeline'] == predict_populations(species, 12, mode)
+
+    rest = predict_populations_checkpointed(species, 12, mode, checkpoint=first['checkpoint'])
+    assert [entry['step'] for entry in rest['timeline']] == list(range(12, 24))
+    assert first['timeline'] + rest['timeline'] == predict_populations(species, 24, mode)
+    assert rest['checkpoint']['step'] == 24
+
+
+def test_resuming_with_sparse_steps():
+    species = biome('aquatic')
+    first = predict_populations_checkpointed(species, 10)
+    rest = predict_populations_checkpointed(species, steps=[15, 40], checkpoint=first['checkpoint'])
+    assert rest['timeline'] == predict_populations(species, steps=[15, 40])
+    with pytest.raises(ValueError, match='before the checkpoint'):
+        predict_populations_checkpointed(species, steps=[5], checkpoint=first['checkpoint'])
+
+
+def test_fingerprint_ignores_the_input_layout():
+    species = biome('desert')
+    columns = {
+        key: [s[key] for s in species]
+        for key in ('name', 'trophicLevel', 'biomass', 'energy', 'population')
+    }
+    assert CompiledEcosystem.from_columns(**columns).fingerprint() == compile_ecosystem(species).fingerprint()
+    changed = [dict(species[0], population=1)] + species[1:]
+    assert compile_ecosystem(changed).fingerprint() != compile_ecosystem(species).fingerprint()
+
+
+def test_tokens_are_signed_and_bound_to_ecosystem_and_mode():
+    store = CheckpointStore(secret=b'secret')
+    state = {'step': 3, 'populations': [1.5, 2.0]}
+    token = store.encode('eco', 'iterative', state)
+    assert store.decode(token, 'eco', 'iterative') == state
+
+    with pytest.raises(InvalidCheckpoint, match='different ecosystem'):
+        store.decode(token, 'other', 'iterative')
+    with pytest.raises(InvalidCheckpoint, match='analytic'):
+        store.decode(token, 'eco', 'analytic')
+    with pytest.raises(InvalidCheckpoint, match='invalid'):
+        CheckpointStore(secret=b'other').decode(token, 'eco', 'iterative')
+    body, signature = token.split('.')
+    for forged in (body[:-2] + 'AA.' + signature, 'garbage', token + '.x'):
+        with pytest.raises(InvalidCheckpoint, match='invalid'):
+            store.decode(forged, 'eco', 'iterative')
+
+
+def test_cache_returns_the_latest_checkpoint_and_is_bounded():
+    store = CheckpointStore(max_entries=3)
+    for step in (12, 24, 36):
+        store.put('eco', 'iterative', {'step': step, 'populations': [float(step)]})
+    assert store.latest('eco', 'iterative', 30)['step'] == 24
+    assert store.latest('eco', 'iterative', 36)['step'] == 36
+    assert store.latest('eco', 'iterative', 11) is None
+    assert store.latest('eco', 'analytic', 30) is None
+
+    # 12 is the least recently used
+    store.put('eco', 'iterative', {'step': 48, 'populations': [48.0]})
+    assert store.latest('eco', 'iterative', 20) is None
+    stats = store.stats()
+    assert stats['entries'] == 3
+    assert stats['evictions'] == 1
+
+
+# ================================================
+# ENDPOINTS
+# ================================================
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(service, 'checkpoint_store', CheckpointStore())
+    service.result_cache.clear()
+    return TestClient(service.app)
+
+
+def trajectory(client, **body):
+    response = client.post('/api/predict/trajectory', json=body)
+    assert response.status_code == 200, response.text
+    return response.json()['data']
+
+
+@pytest.mark.parametrize('mode', ['iterative', 'lotka_volterra'])
+def test_checkpoint_token_continues_the_run(client, pyramid, mode):
+    first = trajectory(client, species=pyramid, timeSteps=12, mode=mode)
+    assert first['checkpoint']['step'] == 12
+    rest = trajectory(client, species=pyramid, timeSteps=12, mode=mode,
+                      checkpoint=first['checkpoint']['token'])
+    full = trajectory(client, species=pyramid, timeSteps=24, mode=mode)
+    assert first['timeline'] + rest['timeline'] == full['timeline']
+    assert rest['checkpoint']['step'] == 24
+
+
+def test_start_step_resumes_from_the_server_cache(client, pyramid, monkeypatch):
+    trajectory(client, species=pyramid, timeSteps=12)
+
+    calls = []
+    real = service.predict_populations_checkpointed
+
+    def spy(species, time_steps, mode, steps, checkpoint):
+        calls.append(checkpoint['step'] if checkpoint else None)
+        return real(species, time_steps, mode, steps, checkpoint)
+
+    monkeypatch.setattr(service, 'predict_populations_checkpointed', spy)
+    rest = trajectory(client, species=pyramid, timeSteps=6, startStep=12)
+    assert calls == [12]
+    assert [entry['step'] for entry in rest['timeline']] == list(range(12, 18))
+    assert rest['timeline'] == trajectory(client, species=pyramid, timeSteps=18)['timeline'][12:]
+
+    # Nothing cached at or before step 5 of another mode: computed from the start
+    calls.clear()
+    analytic = trajectory(client, species=pyramid, timeSteps=3, startStep=5, mode='analytic')
+    assert calls == [None]
+    assert [entry['step'] for entry in analytic['timeline']] == [5, 6, 7]
+    assert client.get('/api/models/status').json()['checkpoints']['hits'] >= 1
+
+
+def test_checkpoint_for_another_ecosystem_is_rejected(client, pyramid):
+    token = trajectory(client, species=pyramid)['checkpoint']['token']
+    response = client.post('/api/predict/trajectory', json={'species': biome('tundra'), 'checkpoint': token})
+    assert response.status_code == 422
+    assert 'different ecosystem' in response.text
+
+    response = client.post('/api/predict/trajectory', json={'species': pyramid, 'checkpoint': token[:-4]})
+    assert response.status_code == 422
+
+
+@pytest.mark.parametrize('body, headers, status', [
+    ({'checkpoint': 'x', 'startStep': 3}, {}, 422),
+    ({'startStep': 10, 'steps': [5]}, {}, 422),
+    ({'startStep': 10}, {'Accept': 'application/vnd.ecopyramid.trajectory+json'}, 406),
+])
+def test_invalid_resume_requests(client, pyramid, body, headers, status):
+    response = client.post('/api/predict/trajectory', json=dict(body, species=pyramid), headers=headers)
+    assert response.status_code == status
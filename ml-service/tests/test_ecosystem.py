@@ -0,0 +1,66 @@
+import numpy as np
+import pytest
+
+from model.cascade_model import (
+    analyze_cascade,
+    analyze_invasive,
+    analyze_keystones,
+    assess_extinction_risks,
+    predict_populations
+)
+from model.ecosystem import DEFAULT_ICON, CompiledEcosystem, compile_ecosystem
+
+
+def test_columns_and_level_index(pyramid):
+    pyramid.append(dict(pyramid[1], name='Mouse'))
+    eco = compile_ecosystem(pyramid)
+    assert eco.names == ['Grass', 'Rabbit', 'Fox', 'Eagle', 'Mouse']
+    assert eco.levels.tolist() == [0, 1, 2, 3, 1]
+    assert eco.level_counts.tolist() == [1, 2, 1, 1]
+    assert [index.tolist() for index in eco.level_index] == [[0], [1, 4], [2], [3]]
+    assert eco.population.tolist() == [5000, 300, 40, 8, 300]
+    np.testing.assert_allclose(eco.level_totals(eco.biomass), [1000, 400, 60, 20])
+
+
+def test_defaults_for_missing_fields():
+    eco = compile_ecosystem([{'name': 'Moss', 'trophicLevel': 'lichen'}])
+    assert eco.levels.tolist() == [0]
+    assert eco.biomass.tolist() == [100]
+    assert eco.energy.tolist() == [0]
+    assert eco.population.tolist() == [100]
+    assert eco.icons == [DEFAULT_ICON]
+
+
+def test_compiled_ecosystem_is_read_only(pyramid):
+    eco = compile_ecosystem(pyramid)
+    assert compile_ecosystem(eco) is eco
+    for column in (eco.levels, eco.biomass, eco.energy, eco.population, eco.name_array):
+        with pytest.raises(ValueError):
+            column[0] = 0
+
+
+def test_from_columns_matches_from_species(pyramid):
+    columns = {
+        'name': [s['name'] for s in pyramid],
+        'trophicLevel': [s['trophicLevel'] for s in pyramid],
+        'biomass': np.array([s['biomass'] for s in pyramid], dtype=np.float64),
+        'energy': [s['energy'] for s in pyramid],
+        'population': [s['population'] for s in pyramid],
+        'icon': [s['icon'] for s in pyramid]
+    }
+    a = CompiledEcosystem.from_columns(**columns)
+    b = CompiledEcosystem.from_species(pyramid)
+    assert a.names == b.names and a.icons == b.icons
+    for column in ('levels', 'biomass', 'energy', 'population'):
+        np.testing.assert_array_equal(getattr(a, column), getattr(b, column))
+
+
+def test_one_compiled_ecosystem_serves_every_analysis(pyramid):
+    eco = compile_ecosystem(pyramid)
+    target, invasive = pyramid[1], dict(pyramid[2], name='Cat')
+    for _ in range(2):  # analyses must not modify the shared columns
+        assert analyze_cascade(eco, target, seed=3) == analyze_cascade(pyramid, target, seed=3)
+        assert analyze_invasive(eco, invasive, 7) == analyze_invasive(pyramid, invasive, 7)
+        assert analyze_keystones(eco) == analyze_keystones(pyramid)
+        assert assess_extinction_risks(eco) == assess_extinction_risks(pyramid)
+        assert predict_populations(eco, 6) == predict_populations(pyramid, 6)
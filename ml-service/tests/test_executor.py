@@ -0,0 +1,95 @@
+import asyncio
+import threading
+
+import pytest
+from fastapi.testclient import TestClient
+
+import app as service
+from service.executor import ExecutorBusy, ModelExecutor, parse_overrides
+from service.settings import env_choice
+
+
+def test_runs_in_the_pool():
+    executor = ModelExecutor('thread', max_workers=2, max_queue=0)
+    try:
+        name = asyncio.run(executor.run(lambda: threading.current_thread().name))
+    finally:
+        executor.shutdown()
+    assert name.startswith('model')
+    assert executor.stats()['pending'] == 0
+    assert executor.finished == 1
+
+
+def test_full_queue_rejects():
+    executor = ModelExecutor('thread', max_workers=1, max_queue=1)
+    release = threading.Event()
+
+    async def scenario():
+        first = asyncio.ensure_future(executor.run(release.wait))
+        second = asyncio.ensure_future(executor.run(release.wait))
+        await asyncio.sleep(0.05)
+        with pytest.raises(ExecutorBusy):
+            await executor.run(release.wait)
+        release.set()
+        await asyncio.gather(first, second)
+
+    try:
+        asyncio.run(scenario())
+    finally:
+        executor.shutdown()
+    assert executor.rejected == 1
+    assert executor.finished == 2
+
+
+def test_cancelled_request_keeps_its_slot_until_the_call_finishes():
+    executor = ModelExecutor('thread', max_workers=1, max_queue=0)
+    started, release = threading.Event(), threading.Event()
+
+    def work():
+        started.set()
+        release.wait()
+
+    async def scenario():
+        task = asyncio.ensure_future(executor.run(work))
+        await asyncio.get_running_loop().run_in_executor(None, started.wait)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        # The worker is still busy, so the bound still holds
+        assert executor.stats()['pending'] == 1
+        with pytest.raises(ExecutorBusy):
+            await executor.run(work)
+        release.set()
+        await asyncio.get_running_loop().run_in_executor(None, executor.shutdown)
+
+    asyncio.run(scenario())
+    assert executor.stats()['pending'] == 0
+
+
+def test_inline_releases_on_error():
+    executor = ModelExecutor('inline', max_workers=1, max_queue=0)
+    with pytest.raises(ZeroDivisionError):
+        asyncio.run(executor.run(lambda: 1 / 0))
+    assert executor.stats()['pending'] == 0
+
+
+def test_busy_endpoint_answers_503(monkeypatch, pyramid):
+    async def busy(*args, **kwargs):
+        raise ExecutorBusy('thread', retry_after=3)
+
+    monkeypatch.setattr(service.model_executors, 'run', busy)
+    service.result_cache.clear()
+    with TestClient(service.app) as client:
+        response = client.post('/api/analyze/keystone', json={'speciesArray': pyramid},
+                               headers={'Cache-Control': 'no-cache'})
+    assert response.status_code == 503
+    assert response.headers['Retry-After'] == '3'
+
+
+def test_invalid_settings_fall_back(monkeypatch, capsys):
+    monkeypatch.setenv('ML_EXECUTOR', 'threads')
+    assert env_choice('ML_EXECUTOR', 'thread', ('inline', 'thread', 'process')) == 'thread'
+    assert 'ML_EXECUTOR' in capsys.readouterr().out
+
+    assert parse_overrides('trajectory=process, cascade=gpu') == {'trajectory': 'process'}
+    assert 'cascade=gpu' in capsys.readouterr().out
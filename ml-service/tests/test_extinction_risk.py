@@ -0,0 +1,87 @@
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+from app import app
+from conftest import BIOME_NAMES, biome, make_ecosystem, make_species
+from model.cascade_model import EcosystemCascadeModel, assess_extinction_risks
+
+LEVELS = ('producer', 'primary_consumer', 'secondary_consumer', 'tertiary_consumer')
+
+
+def reference_risks(species_list):
+    """The per-species loop: score, build factors, fully sort"""
+    model = EcosystemCascadeModel()
+    risks = []
+    for s in species_list:
+        level = model.get_trophic_level(s['trophicLevel'])
+        score, factors = model.species_risk(s['population'], level, s['biomass'])
+        risks.append({
+            'species': s['name'],
+            'icon': s['icon'],
+            'risk_level': model.risk_level(score),
+            'risk_score': min(100, score),
+            'risk_factors': factors
+        })
+    risks.sort(key=lambda r: r['risk_score'], reverse=True)
+    return risks
+
+
+def catalog(size, seed=0):
+    rng = np.random.default_rng(seed)
+    return [
+        make_species(f'sp{i}', LEVELS[rng.integers(4)],
+                     float(rng.integers(0, 100)), float(rng.integers(0, 200)))
+        for i in range(size)
+    ]
+
+
+@pytest.mark.parametrize('species_list', [biome(name) for name in BIOME_NAMES] +
+                         [make_ecosystem(50), catalog(500), []])
+def test_matches_the_per_species_loop(species_list):
+    assert assess_extinction_risks(species_list) == reference_risks(species_list)
+
+
+@pytest.mark.parametrize('top_k', [1, 3, 17, 499, 500, 1000])
+def test_top_k_is_the_prefix_of_the_full_ranking(top_k):
+    species_list = catalog(500, seed=1)
+    assert assess_extinction_risks(species_list, top_k=top_k) == reference_risks(species_list)[:top_k]
+
+
+@pytest.mark.parametrize('min_score', [0, 40, 61, 75, 95, 100])
+def test_min_score_keeps_rows_at_or_above_the_threshold(min_score):
+    species_list = catalog(300, seed=2)
+    expected = [r for r in reference_risks(species_list) if r['risk_score'] >= min_score]
+    assert assess_extinction_risks(species_list, min_score=min_score) == expected
+
+
+def test_top_k_and_min_score_combine():
+    species_list = catalog(300, seed=3)
+    expected = [r for r in reference_risks(species_list) if r['risk_score'] >= 60][:5]
+    assert assess_extinction_risks(species_list, top_k=5, min_score=60) == expected
+
+
+def test_risk_scores_columns():
+    model = EcosystemCascadeModel()
+    scores, codes = model.risk_scores(
+        np.array([5000, 300, 40, 8]), np.array([0, 1, 2, 3]), np.array([1000, 200, 60, 20])
+    )
+    assert scores.tolist() == [20, 30, 95, 95]
+    assert model.risk_factor_labels(int(codes[0])) == []
+    assert model.risk_factor_labels(int(codes[2])) == model.species_risk(40, 2, 60)[1]
+
+
+def test_endpoint_filters(pyramid):
+    client = TestClient(app)
+    full = client.post('/api/ecosystem/health', json={'species': pyramid}).json()['data']['species_risks']
+    top = client.post('/api/ecosystem/health', json={'species': pyramid, 'topK': 2}).json()
+    assert top['data']['species_risks'] == full[:2]
+    above = client.post('/api/ecosystem/health', json={'species': pyramid, 'minScore': 50}).json()
+    assert above['data']['species_risks'] == [r for r in full if r['risk_score'] >= 50]
+
+
+@pytest.mark.parametrize('change', [{'topK': 0}, {'minScore': -1}, {'minScore': 101}])
+def test_endpoint_validation(pyramid, change):
+    client = TestClient(app)
+    body = dict({'species': pyramid}, **change)
+    assert client.post('/api/ecosystem/health', json=body).status_code == 422
@@ -0,0 +1,120 @@
+from collections import deque
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+import app as service
+from conftest import make_species
+from model.cascade_model import analyze_cascade
+from model.food_web import FoodWeb, build_food_web, resolve_species
+
+
+def random_web(seed, num_species=60, num_links=200):
+    rng = np.random.default_rng(seed)
+    return (rng.integers(0, num_species, num_links),
+            rng.integers(0, num_species, num_links), num_species)
+
+
+def reference_distances(num_species, predators, prey, sources):
+    eaten_by = {i: set() for i in range(num_species)}
+    for predator, victim in zip(predators.tolist(), prey.tolist()):
+        if predator != victim:
+            eaten_by[victim].add(predator)
+    distance = [-1] * num_species
+    queue = deque()
+    for source in sources:
+        distance[source] = 0
+        queue.append(source)
+    while queue:
+        species = queue.popleft()
+        for predator in eaten_by[species]:
+            if distance[predator] < 0:
+                distance[predator] = distance[species] + 1
+                queue.append(predator)
+    return distance
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_bfs_matches_a_reference_search(seed):
+    predators, prey, n = random_web(seed)
+    web = FoodWeb(n, predators, prey)
+    for sources in ([0], [3, 7], [5, 5]):
+        assert web.predator_distances(sources).tolist() == reference_distances(n, predators, prey, sources)
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_diet_lost_matches_a_reference(seed):
+    predators, prey, n = random_web(seed)
+    web = FoodWeb(n, predators, prey)
+    lost = np.random.default_rng(seed).random(n) < 0.3
+
+    diets = {i: set() for i in range(n)}
+    for predator, victim in zip(predators.tolist(), prey.tolist()):
+        if predator != victim:
+            diets[predator].add(victim)
+    expected = [sum(lost[v] for v in diets[i]) / len(diets[i]) if diets[i] else 0 for i in range(n)]
+    np.testing.assert_allclose(web.diet_lost(lost), expected)
+
+
+def test_duplicates_and_self_loops_are_dropped():
+    web = FoodWeb(3, [1, 1, 2, 2, 1], [0, 0, 1, 2, 1])
+    assert web.num_links == 2
+    assert web.prey(1).tolist() == [0]
+    assert web.predators(1).tolist() == [2]
+    assert web.diet_size.tolist() == [0, 1, 1]
+    assert web.stats() == {'num_species': 3, 'num_links': 2, 'max_diet_size': 1}
+
+
+def test_invalid_links():
+    with pytest.raises(ValueError):
+        FoodWeb(2, [0, 1], [1])
+    with pytest.raises(ValueError):
+        FoodWeb(2, [0], [2])
+
+
+def test_resolve_species():
+    names = ['Grass', 'Fox', 'Grass']
+    assert resolve_species(names, ['Grass', 'Fox', 2]).tolist() == [0, 1, 2]
+    assert resolve_species(names, np.array([2, 1])).tolist() == [2, 1]
+    with pytest.raises(ValueError, match="unknown species 'Wolf'"):
+        resolve_species(names, ['Wolf'])
+
+
+def test_build_food_web_shapes():
+    names = ['Grass', 'Rabbit', 'Fox']
+    pairs = build_food_web(names, [('Rabbit', 'Grass'), ('Fox', 'Rabbit')])
+    columns = build_food_web(names, {'predator': [1, 2], 'prey': [0, 1]})
+    assert pairs.prey_indices.tolist() == columns.prey_indices.tolist()
+    assert build_food_web(names, pairs) is pairs
+    with pytest.raises(ValueError):
+        build_food_web(names + ['Owl'], pairs)
+
+
+def test_cascade_follows_the_links(pyramid):
+    species = pyramid + [make_species('Mole', 'secondary_consumer', 20, 5)]
+    # The mole eats grass only, so removing the rabbit does not touch it;
+    # the fox gets half its diet from the mole
+    web = {'predator': ['Rabbit', 'Fox', 'Fox', 'Eagle', 'Mole'],
+           'prey': ['Grass', 'Rabbit', 'Mole', 'Fox', 'Grass']}
+    result = analyze_cascade(species, pyramid[1], seed=0, food_web=web)
+    by_name = {s['name']: s for s in result['affected_species']}
+    assert set(by_name) == {'Fox', 'Eagle'}
+    assert by_name['Fox']['distance'] == 1 and by_name['Fox']['diet_dependency'] == 0.5
+    assert 25 <= by_name['Fox']['population_loss'] <= 35
+    assert by_name['Eagle']['distance'] == 2 and by_name['Eagle']['population_loss'] == 20
+    assert result['cascade_depth'] == 2
+
+
+@pytest.mark.parametrize('food_web, message', [
+    ({'predator': ['Fox'], 'prey': ['Wolf']}, "unknown species 'Wolf'"),
+    ({'predator': [0], 'prey': [9]}, 'index out of range'),
+    ({'predator': [0, 1], 'prey': [1]}, 'same length'),
+])
+def test_endpoint_rejects_bad_links(pyramid, food_web, message):
+    with TestClient(service.app) as client:
+        response = client.post('/api/analyze/cascade', json={
+            'speciesArray': pyramid, 'targetSpecies': pyramid[1], 'foodWeb': food_web
+        })
+    assert response.status_code == 422
+    assert message in response.text
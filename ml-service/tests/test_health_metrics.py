@@ -0,0 +1,89 @@
+import math
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+import app as service
+from conftest import BIOME_NAMES, biome
+from model.batch import batch_health_curves
+from model.cascade_model import predict_health_curves, predict_populations
+from model.health_metrics import trajectory_health
+
+
+def reference(populations, levels, initial, biomass, previous):
+    """Per-step metrics written out with plain Python"""
+    total = sum(populations)
+    shares = [p / total for p in populations]
+    level_biomass = [0.0] * 4
+    for p, level, p0, b in zip(populations, levels, initial, biomass):
+        level_biomass[level] += b * p / p0 if p0 > 0 else 0.0
+    change = sum(abs(p - q) for p, q in zip(populations, previous))
+    return {
+        'shannon': -sum(s * math.log(s) for s in shares if s > 0),
+        'simpson': 1 - sum(s * s for s in shares),
+        'stability': 1 - change / (total + sum(previous)),
+        'level_biomass': level_biomass
+    }
+
+
+def test_metrics_match_a_per_step_reference():
+    matrix = np.array([[100.0, 50, 0, 5], [120, 40, 2, 5], [90, 60, 1, 0]])
+    levels, initial, biomass = [0, 1, 2, 3], [100, 50, 1, 5], [1000, 100, 10, 2]
+    curves = trajectory_health([0, 1, 2], matrix, levels, initial, biomass)
+
+    previous = initial
+    for row, populations in enumerate(matrix.tolist()):
+        expected = reference(populations, levels, initial, biomass, previous)
+        for name in ('shannon', 'simpson', 'stability'):
+            assert curves[name][row] == pytest.approx(expected[name], abs=1e-6)
+        for level, name in enumerate(curves['level_biomass']):
+            assert curves['level_biomass'][name][row] == pytest.approx(expected['level_biomass'][level], abs=1e-6)
+        previous = populations
+
+    # Tertiary level gone at step 2 -> ratio 0; ratios use the level below
+    assert curves['biomass_ratios']['tertiary_consumer/secondary_consumer'][2] == 0
+    assert curves['biomass_ratios']['primary_consumer/producer'][0] == pytest.approx(0.1)
+
+
+def test_empty_levels_and_ecosystems_are_handled():
+    # No producers: the ratio above them is undefined
+    curves = trajectory_health([0], np.array([[10.0, 0.0]]), [1, 2], [10, 5], [50, 5])
+    assert curves['biomass_ratios']['primary_consumer/producer'] == [None]
+    assert curves['biomass_ratios']['secondary_consumer/primary_consumer'] == [0.0]
+
+    dead = trajectory_health([0, 1], np.zeros((2, 2)), [0, 1], [0, 0], [1, 1])
+    assert dead['shannon'] == dead['simpson'] == [0.0, 0.0]
+    assert dead['stability'] == [1.0, 1.0]
+
+
+@pytest.mark.parametrize('mode', ['iterative', 'analytic', 'lotka_volterra'])
+def test_health_matches_the_timeline(mode):
+    species = biome('forest')
+    curves = predict_health_curves(species, 20, mode)
+    timeline = predict_populations(species, 20, mode)
+    assert curves['steps'] == list(range(20))
+    assert curves['ecosystem_health'] == [entry['ecosystem_health'] for entry in timeline]
+    assert all(0 < value <= 1 for value in curves['stability'])
+
+
+@pytest.mark.parametrize('mode', ['iterative', 'lotka_volterra'])
+def test_batch_matches_single_ecosystems(mode):
+    ecosystems = [biome(name) for name in BIOME_NAMES] + [biome('forest')[:2]]
+    results = batch_health_curves(ecosystems, 8, mode, None)
+    assert results == [predict_health_curves(eco, 8, mode) for eco in ecosystems]
+
+
+def test_health_endpoints(pyramid):
+    service.result_cache.clear()
+    client = TestClient(service.app)
+    body = {'species': pyramid, 'timeSteps': 6, 'mode': 'analytic'}
+    single = client.post('/api/predict/trajectory/health', json=body)
+    assert single.status_code == 200
+    assert single.json()['data'] == predict_health_curves(pyramid, 6, 'analytic')
+
+    batch = client.post('/api/batch/trajectory/health', json={
+        'ecosystems': [{'species': pyramid}, {'species': biome('tundra')}], 'timeSteps': 6, 'mode': 'analytic'
+    })
+    assert batch.status_code == 200
+    assert batch.json()['data']['results'][0] == single.json()['data']
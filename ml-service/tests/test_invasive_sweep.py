@@ -0,0 +1,79 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from app import app
+from conftest import BIOME_NAMES, biome, make_ecosystem, make_species
+from model.cascade_model import analyze_invasive, analyze_invasive_sweep
+
+LEVELS = ['producer', 'primary_consumer', 'secondary_consumer', 'tertiary_consumer']
+
+CANDIDATES = [make_species(f'Invader{i}', level, 100, 100) for i, level in enumerate(LEVELS)]
+
+
+def assert_cell_matches(sweep, c, s, single):
+    changes = dict(zip(sweep['species'], sweep['population_change'][c][s]))
+    for entry in single['affected_species']:
+        assert changes[entry['species']] == pytest.approx(entry['population_change'])
+    affected = [t is not None for t in sweep['impact_types'][c]]
+    assert sum(affected) == sweep['num_affected'][c] == len(single['affected_species'])
+    assert [t for t in sweep['impact_types'][c] if t is not None] == [
+        entry['impact_type'] for entry in single['affected_species']
+    ]
+    assert sweep['total_impact'][c][s] == pytest.approx(single['total_impact'])
+    assert sweep['outcome_prediction'][c][s] == single['outcome_prediction']
+
+
+@pytest.mark.parametrize('species_list', [biome(name) for name in BIOME_NAMES] + [make_ecosystem(40)])
+def test_every_cell_matches_a_single_analysis(species_list):
+    sweep = analyze_invasive_sweep(species_list, CANDIDATES)
+    assert sweep['strengths'] == list(range(1, 11))
+    assert sweep['candidates'] == [c['name'] for c in CANDIDATES]
+    assert len(sweep['population_change']) == len(CANDIDATES)
+
+    for c, candidate in enumerate(CANDIDATES):
+        assert len(sweep['population_change'][c]) == 10
+        for s, strength in enumerate(sweep['strengths']):
+            single = analyze_invasive(species_list, candidate, strength)
+            assert_cell_matches(sweep, c, s, single)
+
+
+def test_unaffected_natives_have_no_change(pyramid):
+    sweep = analyze_invasive_sweep(pyramid, [CANDIDATES[0]], [3, 9])
+    assert sweep['strengths'] == [3, 9]
+    # A producer invasive only affects producers and their grazers
+    types = dict(zip(sweep['species'], sweep['impact_types'][0]))
+    assert types == {'Grass': 'competition', 'Rabbit': 'predator_benefit', 'Fox': None, 'Eagle': None}
+    changes = dict(zip(sweep['species'], sweep['population_change'][0][1]))
+    assert changes['Fox'] == changes['Eagle'] == 0
+
+
+def test_empty_ecosystem():
+    sweep = analyze_invasive_sweep([], CANDIDATES[:2], [5])
+    assert sweep['population_change'] == [[[]], [[]]]
+    assert sweep['num_affected'] == [0, 0]
+    assert sweep['outcome_prediction'] == [['COEXISTENCE'], ['COEXISTENCE']]
+
+
+def test_endpoint_matches_the_single_endpoint(pyramid):
+    client = TestClient(app)
+    body = {'currentSpecies': pyramid, 'candidates': CANDIDATES, 'strengths': [2, 8]}
+    sweep = client.post('/api/analyze/invasive/sweep', json=body).json()['data']
+
+    for c, candidate in enumerate(CANDIDATES):
+        for s, strength in enumerate([2, 8]):
+            single = client.post('/api/analyze/invasive', json={
+                'currentSpecies': pyramid, 'invasiveSpecies': candidate, 'invasionStrength': strength
+            }).json()['data']
+            assert_cell_matches(sweep, c, s, single)
+
+
+@pytest.mark.parametrize('change', [
+    {'candidates': []},
+    {'strengths': [0]},
+    {'strengths': [11]},
+    {'strengths': []},
+])
+def test_endpoint_validation(pyramid, change):
+    client = TestClient(app)
+    body = dict({'currentSpecies': pyramid, 'candidates': CANDIDATES}, **change)
+    assert client.post('/api/analyze/invasive/sweep', json=body).status_code == 422
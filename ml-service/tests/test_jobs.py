@@ -0,0 +1,236 @@
+import asyncio
+import threading
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+import app as service
+from service.jobs import JobCancelled, JobManager, JobNotFound, JobQueueFull
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def wait_until(predicate, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline, 'timed out'
+        time.sleep(0.005)
+
+
+def blocking_job(release: threading.Event, started: threading.Event = None):
+    def run(job):
+        if started is not None:
+            started.set()
+        release.wait(5)
+        return 'done'
+    return run
+
+
+def stepping_job(steps, delay=0.01):
+    def run(job):
+        job.report(0, steps)
+        for step in range(steps):
+            job.check_cancelled()
+            time.sleep(delay)
+            job.report(step + 1)
+        return steps
+    return run
+
+
+@pytest.fixture
+def manager():
+    manager = JobManager(max_workers=1, max_queue=1)
+    yield manager
+    manager.shutdown()
+
+
+def test_job_runs_and_long_poll_returns_when_it_finishes(manager):
+    release = threading.Event()
+    job = manager.submit('test', blocking_job(release))
+
+    async def poll():
+        threading.Timer(0.05, release.set).start()
+        return await manager.wait(job.id, 5)
+
+    start = time.monotonic()
+    finished = asyncio.run(poll())
+    assert time.monotonic() - start < 4
+    assert finished.to_dict()['status'] == 'succeeded'
+    assert finished.to_dict()['result'] == 'done'
+
+
+def test_long_poll_times_out_on_a_running_job(manager):
+    release = threading.Event()
+    job = manager.submit('test', blocking_job(release))
+    info = asyncio.run(manager.wait(job.id, 0.05)).to_dict()
+    assert info['status'] in ('queued', 'running')
+    assert 'result' not in info
+    release.set()
+
+
+def test_full_queue_applies_backpressure(manager):
+    release, started = threading.Event(), threading.Event()
+    running = manager.submit('test', blocking_job(release, started))
+    started.wait(5)
+    queued = manager.submit('test', blocking_job(release))
+    with pytest.raises(JobQueueFull) as busy:
+        manager.submit('test', blocking_job(release))
+    assert busy.value.retry_after >= 1
+    assert manager.stats()['rejected'] == 1
+    assert manager.get(queued.id).status == 'queued'
+
+    release.set()
+    wait_until(lambda: manager.get(queued.id).finished)
+    assert manager.get(running.id).status == 'succeeded'
+    # Slots are free again
+    manager.submit('test', blocking_job(release))
+
+
+def test_cancelling_a_queued_job_never_runs_it(manager):
+    release, started = threading.Event(), threading.Event()
+    manager.submit('test', blocking_job(release, started))
+    started.wait(5)
+    ran = []
+    queued = manager.submit('test', lambda job: ran.append(1))
+
+    assert manager.cancel(queued.id).status == 'cancelled'
+    release.set()
+    time.sleep(0.05)
+    assert ran == []
+    assert manager.stats()['active'] == 0
+
+
+def test_cancelling_a_running_job_stops_it_between_steps(manager):
+    job = manager.submit('test', stepping_job(1000))
+    wait_until(lambda: job.progress >= 3)
+    manager.cancel(job.id)
+    wait_until(lambda: job.finished)
+    info = job.to_dict()
+    assert info['status'] == 'cancelled'
+    assert 3 <= info['progress'] < 1000
+    assert info['total'] == 1000
+
+
+def test_failed_job_reports_its_error(manager):
+    def fail(job):
+        raise ValueError('population exploded')
+
+    job = manager.submit('test', fail)
+    wait_until(lambda: job.finished)
+    assert job.to_dict()['status'] == 'failed'
+    assert job.to_dict()['error'] == 'population exploded'
+
+
+def test_check_cancelled_raises_once_cancelled(manager):
+    release, started = threading.Event(), threading.Event()
+    job = manager.submit('test', blocking_job(release, started))
+    started.wait(5)
+    job.check_cancelled()
+    manager.cancel(job.id)
+    with pytest.raises(JobCancelled):
+        job.check_cancelled()
+    release.set()
+
+
+def test_finished_jobs_expire_and_are_bounded():
+    clock = FakeClock()
+    manager = JobManager(max_workers=1, max_queue=10, keep_seconds=60, max_finished=2, clock=clock)
+    jobs = []
+    for value in range(3):
+        jobs.append(manager.submit('test', lambda job, value=value: value))
+        wait_until(lambda: jobs[-1].finished)
+
+    # Only the two most recent finished jobs are kept
+    with pytest.raises(JobNotFound):
+        manager.get(jobs[0].id)
+    assert manager.get(jobs[2].id).result == 2
+
+    clock.now += 61
+    with pytest.raises(JobNotFound):
+        manager.get(jobs[2].id)
+    manager.shutdown()
+
+
+# ================================================
+# ENDPOINTS
+# ================================================
+
+@pytest.fixture
+def client():
+    service.result_cache.clear()
+    return TestClient(service.app)
+
+
+def finished_job(client, job_id):
+    response = client.get(f'/api/jobs/{job_id}', params={'wait': 10})
+    assert response.status_code == 200
+    return response.json()['data']
+
+
+def test_trajectory_job_matches_the_trajectory_endpoint(client, pyramid):
+    body = {'species': pyramid, 'timeSteps': 30, 'mode': 'lotka_volterra'}
+    submitted = client.post('/api/jobs/trajectory', json=body)
+    assert submitted.status_code == 202
+    job_id = submitted.json()['data']['id']
+    assert submitted.headers['location'] == f'/api/jobs/{job_id}'
+
+    job = finished_job(client, job_id)
+    assert job['status'] == 'succeeded'
+    assert job['progress'] == job['total'] == 30
+    direct = client.post('/api/predict/trajectory', json=body).json()['data']
+    assert job['result']['timeline'] == direct['timeline']
+
+
+def test_cascade_job_matches_the_cascade_endpoint(client, pyramid):
+    body = {'speciesArray': pyramid, 'targetSpecies': pyramid[1], 'ensembleSize': 200}
+    job_id = client.post('/api/jobs/cascade', json=body).json()['data']['id']
+    job = finished_job(client, job_id)
+    assert job['status'] == 'succeeded'
+    assert job['result'] == client.post('/api/analyze/cascade', json=body).json()['data']
+
+
+def test_cancel_stops_a_running_trajectory(client, pyramid, monkeypatch):
+    real_stream = service.stream_populations
+
+    def slow_stream(*args):
+        for entry in real_stream(*args):
+            time.sleep(0.01)
+            yield entry
+
+    monkeypatch.setattr(service, 'stream_populations', slow_stream)
+    body = {'species': pyramid, 'timeSteps': 5000}
+    job_id = client.post('/api/jobs/trajectory', json=body).json()['data']['id']
+    wait_until(lambda: client.get(f'/api/jobs/{job_id}').json()['data']['progress'] > 2)
+
+    cancelled = client.delete(f'/api/jobs/{job_id}')
+    assert cancelled.status_code == 200
+    job = finished_job(client, job_id)
+    assert job['status'] == 'cancelled'
+    assert job['progress'] < 5000
+    assert 'result' not in job
+
+
+def test_full_job_queue_answers_429_with_retry_after(client, pyramid, monkeypatch):
+    small = JobManager(max_workers=1, max_queue=0)
+    monkeypatch.setattr(service, 'job_manager', small)
+    release = threading.Event()
+    small.submit('test', blocking_job(release))
+
+    response = client.post('/api/jobs/trajectory', json={'species': pyramid})
+    assert response.status_code == 429
+    assert int(response.headers['retry-after']) >= 1
+    assert client.get('/api/jobs/stats').json()['rejected'] == 1
+    release.set()
+    small.shutdown()
+
+
+def test_unknown_job_is_404(client):
+    assert client.get('/api/jobs/nope').status_code == 404
+    assert client.delete('/api/jobs/nope').status_code == 404
@@ -0,0 +1,77 @@
+import random
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+from app import app
+from conftest import make_species
+from model.cascade_model import EcosystemCascadeModel, analyze_keystones
+
+LEVELS = ['producer', 'primary_consumer', 'secondary_consumer', 'tertiary_consumer']
+
+
+class NoJitter:
+    """Random source that always draws 0, so cascades use expected losses"""
+
+    def uniform(self, low, high, size=None):
+        return np.zeros(size) if size is not None else 0.0
+
+
+def random_ecosystem(seed, size):
+    rng = random.Random(seed)
+    # Few distinct names, so some targets share their name with others
+    return [
+        make_species(f'sp{rng.randint(0, size // 2)}', rng.choice(LEVELS),
+                     rng.choice([10, 60, 500]), rng.choice([50, 150]))
+        for _ in range(size)
+    ]
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_sweep_matches_one_cascade_per_target(seed):
+    species_list = random_ecosystem(seed, 40)
+    model = EcosystemCascadeModel()
+    model.rng = NoJitter()
+    sweep = analyze_keystones(species_list)
+    assert sweep['num_species'] == len(species_list)
+
+    rows = sorted(sweep['keystone_ranking'], key=lambda r: r['rank'])
+    by_target = {}
+    for row in rows:
+        by_target.setdefault((row['target_species'], row['trophic_level']), row)
+
+    for species in species_list:
+        cascade = model.predict_cascade_effect(species_list, species)
+        row = by_target[(species['name'], LEVELS.index(species['trophicLevel']))]
+        assert row['num_species_affected'] == cascade['num_species_affected']
+        assert row['ecosystem_health_change'] == cascade['ecosystem_health_change']
+        assert row['extinctions_predicted'] == cascade['extinctions_predicted']
+        assert row['cascade_depth'] == cascade['cascade_depth']
+        losses = [s['population_loss'] for s in cascade['affected_species']]
+        expected_mean = round(sum(losses) / len(losses), 2) if losses else 0
+        assert row['mean_population_loss'] == pytest.approx(expected_mean)
+
+
+def test_ranking_puts_the_most_damaging_removal_first(pyramid):
+    ranking = analyze_keystones(pyramid)['keystone_ranking']
+    assert [row['rank'] for row in ranking] == [1, 2, 3, 4]
+    health = [row['ecosystem_health_change'] for row in ranking]
+    assert health == sorted(health)
+    # Removing the producer starves the three levels above it
+    assert ranking[0]['target_species'] == 'Grass'
+    assert ranking[0]['num_species_affected'] == 3
+    assert ranking[0]['direct_predators_affected'] == 1
+
+
+def test_empty_ecosystem():
+    assert analyze_keystones([]) == {'keystone_ranking': [], 'num_species': 0}
+
+
+def test_endpoint(pyramid):
+    with TestClient(app) as client:
+        response = client.post('/api/analyze/keystone', json={'speciesArray': pyramid})
+    assert response.status_code == 200
+    body = response.json()
+    assert body['source'] == 'ml_model'
+    assert body['data'] == analyze_keystones(pyramid)
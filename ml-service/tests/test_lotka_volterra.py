@@ -0,0 +1,136 @@
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+import app as service
+from conftest import BIOME_NAMES, biome, make_ecosystem
+from model.cascade_model import EcosystemCascadeModel, predict_populations, simulate_parameter_batch
+from model.ecosystem import TROPHIC_LEVELS
+from model.lotka_volterra import LotkaVolterraIntegrator, LotkaVolterraSystem
+from model.population_engine import LotkaVolterraEngine, PopulationOverflow
+
+MODES = ('lotka_volterra', 'lotka_volterra_rk45')
+
+# Populations at step 11 (t = 12), converged: 20000 RK4 substeps per time
+# unit and RK45 with rtol=1e-10 agree on every digit shown
+CONVERGED_BIOMES = {
+    'grassland': [1438183, 190264, 22090, 2864],
+    'forest': [128098, 1064889, 25036, 663138],
+    'aquatic': [2857596, 219116, 19094, 2078],
+    'desert': [17378, 438333, 2565, 208916],
+    'tundra': [39722, 241645, 1157, 143027],
+}
+
+
+def make_system(species):
+    return LotkaVolterraSystem(
+        [s['population'] for s in species],
+        [TROPHIC_LEVELS[s['trophicLevel']] for s in species],
+        [s['biomass'] for s in species],
+        EcosystemCascadeModel().lotka_volterra_parameters()
+    )
+
+
+def converged(species, steps):
+    """Tight-tolerance reference populations [steps, species]"""
+    system = make_system(species)
+    return system.integrate([step + 1 for step in steps], 'rk45', rtol=1e-10, atol=1e-14)[0]
+
+
+def populations(timeline):
+    return np.array([list(entry['species_data'].values()) for entry in timeline], dtype=np.float64)
+
+
+@pytest.mark.parametrize('mode', MODES)
+@pytest.mark.parametrize('name', BIOME_NAMES)
+def test_biomes_match_the_converged_solution(mode, name):
+    result = populations(predict_populations(biome(name), 12, mode))
+    assert np.isfinite(result).all()
+    np.testing.assert_allclose(result[-1], CONVERGED_BIOMES[name], rtol=2e-5, atol=2)
+    np.testing.assert_allclose(result, np.trunc(converged(biome(name), range(12))), rtol=2e-5, atol=2)
+
+
+@pytest.mark.parametrize('mode', MODES)
+def test_fast_pyramid_matches_the_converged_solution(mode, pyramid):
+    # Populations swing over five orders of magnitude in the first steps
+    steps = [0, 5, 11, 99]
+    result = populations(predict_populations(pyramid, 0, mode, steps))
+    np.testing.assert_allclose(result, np.trunc(converged(pyramid, steps)), rtol=1e-4, atol=2)
+
+
+@pytest.mark.parametrize('seed', range(3))
+def test_random_ecosystems_stay_finite_and_accurate(seed):
+    species = make_ecosystem(24, seed=seed)
+    expected = converged(species, [11, 199])
+    for mode in MODES:
+        result = populations(predict_populations(species, 0, mode, [11, 199]))
+        assert np.isfinite(result).all() and (result >= 0).all()
+        np.testing.assert_allclose(result, np.trunc(expected), rtol=1e-3, atol=2)
+
+
+def test_long_horizons_settle():
+    # Integration stops at equilibrium, so the far end costs no more
+    species = biome('forest')
+    for mode in MODES:
+        far = predict_populations(species, 0, mode, [10 ** 5, 10 ** 6 - 1])
+        assert far[0]['species_data'] == far[1]['species_data']
+        assert all(value > 0 for value in far[1]['species_data'].values())
+
+
+def test_step_integrates_one_time_unit():
+    species = biome('tundra')
+    model = EcosystemCascadeModel()
+    parameters = model.lotka_volterra_parameters()
+    names = [s['name'] for s in species]
+    levels = [TROPHIC_LEVELS[s['trophicLevel']] for s in species]
+    args = (names, [s['population'] for s in species], levels, [s['biomass'] for s in species], parameters)
+
+    stepped = LotkaVolterraEngine(*args)
+    for _ in range(5):
+        stepped.step()
+    run = LotkaVolterraEngine(*args).run(5)
+    np.testing.assert_allclose(np.trunc(stepped.populations), populations(run)[-1], rtol=1e-5, atol=1)
+    np.testing.assert_allclose(LotkaVolterraEngine(*args).populations_at(4), stepped.populations, rtol=1e-5)
+
+    # run() continues from the current state, like the logistic engine
+    later = stepped.run(3)
+    np.testing.assert_allclose(populations(later)[-1], populations(LotkaVolterraEngine(*args).run(8))[-1],
+                               rtol=1e-5, atol=1)
+
+
+def test_integrator_advances_in_pieces():
+    system = make_system(biome('desert'))
+    whole = LotkaVolterraIntegrator(system, 'rk45').advance(12.0)
+    pieces = LotkaVolterraIntegrator(system, 'rk45')
+    for t in (0.5, 3.0, 3.0, 7.25, 12.0):
+        x = pieces.advance(t)
+    np.testing.assert_allclose(x, whole, rtol=1e-5)
+    with pytest.raises(ValueError):
+        pieces.advance(1.0)
+
+
+def test_parameter_batch_matches_single_runs():
+    species = biome('forest')
+    rates = np.array([0.005, 0.01, 0.02])
+    batch = simulate_parameter_batch(species, {'predation_rate': rates}, 12, method='rk45')
+    for row, rate in enumerate(rates):
+        parameters = dict(EcosystemCascadeModel().lotka_volterra_parameters(), predation_rate=rate)
+        single = LotkaVolterraSystem(
+            [s['population'] for s in species], [TROPHIC_LEVELS[s['trophicLevel']] for s in species],
+            [s['biomass'] for s in species], parameters
+        ).integrate(list(range(1, 13)), 'rk45')[0]
+        np.testing.assert_allclose(batch['populations'][row], single, rtol=1e-4)
+
+
+def test_non_finite_state_is_a_422(monkeypatch, pyramid):
+    def blow_up(self, x):
+        return np.full_like(x, np.inf)
+
+    monkeypatch.setattr(LotkaVolterraSystem, 'derivative', blow_up)
+    with pytest.raises(PopulationOverflow):
+        predict_populations(pyramid, 3, 'lotka_volterra')
+    with TestClient(service.app) as client:
+        response = client.post('/api/predict/trajectory', json={
+            'species': pyramid, 'mode': 'lotka_volterra_rk45'
+        }, headers={'Cache-Control': 'no-cache'})
+    assert response.status_code == 422
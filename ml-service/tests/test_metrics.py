@@ -0,0 +1,77 @@
+import re
+
+import pytest
+from fastapi.testclient import TestClient
+
+import app as service
+from service.metrics import MetricsRegistry
+
+LABELS = r'(\{(?:[a-zA-Z_]\w*="(?:[^"\\]|\\.)*",?)*\})?'
+SAMPLE = re.compile(r'^[a-zA-Z_:][a-zA-Z0-9_:]*' + LABELS + r' -?[0-9.e+\-]+$|^[a-z_]+' + LABELS + r' [+-]Inf$')
+
+
+def test_counter_exposition():
+    registry = MetricsRegistry()
+    counter = registry.counter('jobs_total', 'Jobs done', ('queue',))
+    counter.inc(queue='a')
+    counter.inc(2, queue='a')
+    counter.inc(queue='say "hi"\n')
+    assert counter.value(queue='a') == 3
+    assert registry.render().splitlines() == [
+        '# HELP jobs_total Jobs done',
+        '# TYPE jobs_total counter',
+        'jobs_total{queue="a"} 3',
+        'jobs_total{queue="say \\"hi\\"\\n"} 1',
+    ]
+    with pytest.raises(ValueError):
+        counter.inc(other='a')
+
+
+def test_histogram_buckets_are_cumulative():
+    registry = MetricsRegistry()
+    histogram = registry.histogram('size_bytes', 'Sizes', buckets=(10, 100))
+    for value in (1, 10, 50, 1000):
+        histogram.observe(value)
+    assert registry.render().splitlines()[2:] == [
+        'size_bytes_bucket{le="10"} 2',
+        'size_bytes_bucket{le="100"} 3',
+        'size_bytes_bucket{le="+Inf"} 4',
+        'size_bytes_sum 1061.0',
+        'size_bytes_count 4',
+    ]
+    assert histogram.snapshot() == {'count': 4, 'sum': 1061}
+
+
+def test_duplicate_names_are_rejected():
+    registry = MetricsRegistry()
+    registry.counter('x_total', 'x')
+    with pytest.raises(ValueError):
+        registry.histogram('x_total', 'x')
+
+
+def test_metrics_endpoint_counts_requests(pyramid):
+    requests = service.request_metrics.requests
+    stages = service.request_metrics.stage_seconds
+    path = '/api/analyze/keystone'
+    ok = requests.value(endpoint=path, method='POST', status='200')
+    invalid = requests.value(endpoint=path, method='POST', status='422')
+    model_runs = stages.snapshot(endpoint=path, stage='model')['count']
+
+    with TestClient(service.app) as client:
+        client.post(path, json={'speciesArray': pyramid})
+        client.post(path, json={})
+        client.get('/no/such/path')
+        response = client.get('/metrics')
+
+    assert requests.value(endpoint=path, method='POST', status='200') == ok + 1
+    # Rejected before the handler, but still labelled with the route
+    assert requests.value(endpoint=path, method='POST', status='422') == invalid + 1
+    assert requests.value(endpoint='unmatched', method='GET', status='404') >= 1
+    assert stages.snapshot(endpoint=path, stage='model')['count'] == model_runs + 1
+
+    assert response.headers['content-type'] == MetricsRegistry.CONTENT_TYPE
+    lines = response.text.splitlines()
+    assert '# TYPE ml_request_stage_seconds histogram' in lines
+    assert f'ml_responses_by_source_total{{endpoint="{path}",source="ml_model"}}' in response.text
+    for line in lines:
+        assert line.startswith('# ') or SAMPLE.match(line), line
@@ -0,0 +1,127 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from fastapi.testclient import TestClient
+
+import app as service
+from conftest import BIOME_NAMES, biome
+from service.micro_batch import MicroBatcher, MicroBatchRegistry
+
+
+def recording_batch(calls):
+    async def run_batch(items):
+        calls.append(list(items))
+        return [item * 10 for item in items]
+    return run_batch
+
+
+def test_calls_within_the_window_share_one_batch():
+    calls = []
+    batcher = MicroBatcher('test', recording_batch(calls), window_seconds=0.02, max_batch=10)
+
+    async def main():
+        return await asyncio.gather(*(batcher.submit(i) for i in range(5)))
+
+    assert asyncio.run(main()) == [0, 10, 20, 30, 40]
+    assert calls == [[0, 1, 2, 3, 4]]
+    stats = batcher.stats()
+    assert stats['batches'] == 1
+    assert stats['largest_batch'] == 5
+    assert stats['mean_batch_size'] == 5
+
+
+def test_full_batch_runs_without_waiting_for_the_window():
+    calls = []
+    batcher = MicroBatcher('test', recording_batch(calls), window_seconds=30, max_batch=3)
+
+    async def main():
+        return await asyncio.wait_for(
+            asyncio.gather(*(batcher.submit(i) for i in range(6))), 5
+        )
+
+    assert asyncio.run(main()) == [0, 10, 20, 30, 40, 50]
+    assert calls == [[0, 1, 2], [3, 4, 5]]
+
+
+def test_a_failed_batch_fails_every_caller():
+    async def fail(items):
+        raise ValueError('bad batch')
+
+    batcher = MicroBatcher('test', fail, window_seconds=0.01, max_batch=10)
+
+    async def main():
+        return await asyncio.gather(
+            *(batcher.submit(i) for i in range(3)), return_exceptions=True
+        )
+
+    results = asyncio.run(main())
+    assert all(isinstance(r, ValueError) for r in results)
+
+
+def test_registry_only_accepts_small_ecosystems_when_enabled():
+    assert not MicroBatchRegistry(0, 64, 64).accepts([{}])
+    registry = MicroBatchRegistry(0.005, 64, max_species=2)
+    assert registry.accepts([{}, {}])
+    assert not registry.accepts([{}, {}, {}])
+
+
+# ================================================
+# ENDPOINTS
+# ================================================
+
+@pytest.fixture
+def batching(monkeypatch):
+    registry = MicroBatchRegistry(window_seconds=0.05, max_batch=64, max_species=64)
+    monkeypatch.setattr(service, 'micro_batches', registry)
+    service.result_cache.clear()
+    yield registry
+    service.result_cache.clear()
+
+
+def concurrent_posts(client, path, bodies):
+    with ThreadPoolExecutor(len(bodies)) as pool:
+        responses = list(pool.map(lambda body: client.post(path, json=body), bodies))
+    assert all(r.status_code == 200 for r in responses)
+    return [r.json()['data'] for r in responses]
+
+
+def unbatched(path, bodies, monkeypatch):
+    monkeypatch.setattr(service, 'micro_batches', MicroBatchRegistry(0, 64, 64))
+    service.result_cache.clear()
+    client = TestClient(service.app)
+    return [client.post(path, json=body).json()['data'] for body in bodies]
+
+
+def test_concurrent_cascades_are_batched_with_unchanged_results(batching, monkeypatch):
+    bodies = [
+        {'speciesArray': biome(name), 'targetSpecies': biome(name)[1], 'ensembleSize': 100}
+        for name in BIOME_NAMES
+    ]
+    with TestClient(service.app) as client:
+        batched = concurrent_posts(client, '/api/analyze/cascade', bodies)
+        stats = client.get('/api/models/status').json()['micro_batching']
+
+    analysis = stats['analyses']['cascade:100']
+    assert analysis['items'] == len(bodies)
+    assert analysis['largest_batch'] > 1
+    assert batched == unbatched('/api/analyze/cascade', bodies, monkeypatch)
+
+
+def test_concurrent_health_checks_are_batched_with_unchanged_results(batching, monkeypatch):
+    bodies = [{'species': biome(name)} for name in BIOME_NAMES]
+    bodies[0]['topK'] = 2
+    bodies[1]['minScore'] = 30
+    with TestClient(service.app) as client:
+        batched = concurrent_posts(client, '/api/ecosystem/health', bodies)
+
+    assert batching.stats()['analyses']['health']['largest_batch'] > 1
+    assert batched == unbatched('/api/ecosystem/health', bodies, monkeypatch)
+
+
+def test_large_ecosystems_skip_the_batcher(batching, monkeypatch):
+    monkeypatch.setattr(batching, 'max_species', 3)
+    client = TestClient(service.app)
+    response = client.post('/api/ecosystem/health', json={'species': biome('forest')})
+    assert response.status_code == 200
+    assert batching.stats()['analyses'] == {}
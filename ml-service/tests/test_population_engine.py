@@ -0,0 +1,78 @@
+import numpy as np
+import pytest
+
+from conftest import BIOME_NAMES, biome, make_species
+from model.cascade_model import predict_population_table, predict_populations
+from model.population_engine import PopulationEngine, ecosystem_health
+from model.ecosystem import TROPHIC_LEVELS
+
+
+def reference_trajectory(species_list, time_steps):
+    """The original per-species loop (logistic growth, K = 2P)"""
+    current = [dict(s) for s in species_list]
+    timeline = []
+    for step in range(time_steps):
+        for species in current:
+            rate = 0.05 if TROPHIC_LEVELS.get(species['trophicLevel'], 0) == 0 else 0.03
+            P = species['population']
+            K = P * 2
+            dP = rate * P * (1 - P / K) if K else 0
+            species['population'] = max(0, P + dP)
+        timeline.append({
+            'step': step,
+            'month': f'Month {step}',
+            'species_data': {s['name']: int(s['population']) for s in current},
+            'ecosystem_health': ecosystem_health(np.array([s['population'] for s in current]))
+        })
+    return timeline
+
+
+@pytest.mark.parametrize('name', BIOME_NAMES)
+def test_matches_per_species_loop_on_biomes(name):
+    species_list = biome(name)
+    assert predict_populations(species_list, 24) == reference_trajectory(species_list, 24)
+
+
+def test_matches_per_species_loop_on_large_ecosystem(large_ecosystem):
+    assert predict_populations(large_ecosystem, 12) == reference_trajectory(large_ecosystem, 12)
+
+
+def test_zero_population_stays_zero(pyramid):
+    pyramid[2]['population'] = 0
+    timeline = predict_populations(pyramid, 5)
+    assert [entry['species_data']['Fox'] for entry in timeline] == [0] * 5
+    assert timeline == reference_trajectory(pyramid, 5)
+
+
+def test_sparse_steps_are_a_subset_of_the_full_run(pyramid):
+    full = predict_populations(pyramid, 40)
+    sparse = predict_populations(pyramid, 12, steps=[39, 3, 17, 3])
+    assert sparse == [full[3], full[17], full[39]]
+
+
+def test_engine_rows_only_depend_on_level():
+    engine = PopulationEngine(['a', 'b', 'c'], [100, 100, 100], [0, 1, 3])
+    engine.step()
+    np.testing.assert_allclose(engine.populations, [102.5, 101.5, 101.5])
+
+
+def test_table_matches_timeline(pyramid):
+    timeline = predict_populations(pyramid, 12)
+    table = predict_population_table(pyramid, 12)
+    assert table['names'] == [s['name'] for s in pyramid]
+    assert table['steps'] == list(range(12))
+    assert table['ecosystem_health'] == [entry['ecosystem_health'] for entry in timeline]
+    for row, entry in zip(table['populations'].tolist(), timeline):
+        assert [int(v) for v in row] == list(entry['species_data'].values())
+
+
+def test_empty_ecosystem():
+    assert predict_populations([], 3) == [
+        {'step': step, 'month': f'Month {step}', 'species_data': {}, 'ecosystem_health': 0}
+        for step in range(3)
+    ]
+
+
+def test_species_without_trophic_level_counts_as_producer():
+    species = make_species('Moss', 'unknown', 100, 10)
+    assert predict_populations([species], 1)[0]['species_data'] == {'Moss': 102}
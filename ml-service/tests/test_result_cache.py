@@ -0,0 +1,108 @@
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+import app as service
+from service.result_cache import ResultCache, canonical_key, seed_from_key
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_key_ignores_field_order_and_separates_endpoints():
+    a = canonical_key('cascade', {'x': 1, 'y': [1, 2]})
+    assert a == canonical_key('cascade', {'y': [1, 2], 'x': 1})
+    assert a != canonical_key('invasive', {'x': 1, 'y': [1, 2]})
+    assert a != canonical_key('cascade', {'x': 1, 'y': [2, 1]})
+    assert 0 <= seed_from_key(a) < 2 ** 32
+
+
+def test_key_hashes_array_contents():
+    a = canonical_key('t', {'population': np.array([1.0, 2.0])})
+    assert a == canonical_key('t', {'population': np.array([1.0, 2.0])})
+    assert a != canonical_key('t', {'population': np.array([1.0, 3.0])})
+    assert a != canonical_key('t', {'population': np.array([1, 2], dtype=np.int64)})
+
+
+def test_entries_expire_after_ttl():
+    clock = FakeClock()
+    cache = ResultCache(ttl_seconds=10, clock=clock)
+    cache.put('k', {'v': 1})
+    clock.now = 9.9
+    assert cache.get('k') == (True, {'v': 1})
+    clock.now = 10.0
+    assert cache.get('k') == (False, None)
+    stats = cache.stats()
+    assert (stats['hits'], stats['misses'], stats['expirations'], stats['entries']) == (1, 1, 1, 0)
+    assert stats['bytes'] == 0
+
+
+def test_least_recently_used_is_evicted_first():
+    cache = ResultCache(max_entries=2)
+    cache.put('a', 1)
+    cache.put('b', 2)
+    cache.get('a')
+    cache.put('c', 3)
+    assert cache.get('b') == (False, None)
+    assert cache.get('a') == (True, 1)
+    assert cache.get('c') == (True, 3)
+    assert cache.stats()['evictions'] == 1
+
+
+def test_memory_budget():
+    cache = ResultCache(max_bytes=100)
+    assert not cache.put('huge', 'x' * 1000)
+    assert cache.put('a', 'x', size=60)
+    assert cache.put('b', 'y', size=60)
+    assert cache.get('a') == (False, None)
+    assert cache.stats()['bytes'] == 60
+
+
+def test_hits_are_independent_copies():
+    cache = ResultCache()
+    result = {'timeline': [{'species_data': {'Fox': 3}}], 'table': np.arange(3.0)}
+    cache.put('k', result)
+    result['timeline'][0]['species_data']['Fox'] = 99
+
+    _, first = cache.get('k')
+    assert first['timeline'][0]['species_data']['Fox'] == 3
+    first['timeline'].clear()
+    first['table'][0] = 42
+
+    _, second = cache.get('k')
+    assert second['timeline'] == [{'species_data': {'Fox': 3}}]
+    np.testing.assert_array_equal(second['table'], [0, 1, 2])
+
+
+@pytest.fixture
+def client():
+    service.result_cache.clear()
+    with TestClient(service.app) as client:
+        yield client
+
+
+def test_cache_headers(client, pyramid):
+    body = {'species': pyramid}
+    first = client.post('/api/ecosystem/health', json=body)
+    second = client.post('/api/ecosystem/health', json=body)
+    assert first.headers['X-Cache'] == 'MISS'
+    assert second.headers['X-Cache'] == 'HIT'
+    assert first.json() == second.json()
+
+    refreshed = client.post('/api/ecosystem/health', json=body, headers={'Cache-Control': 'no-cache'})
+    assert refreshed.headers['X-Cache'] == 'BYPASS'
+    bypass = client.post('/api/ecosystem/health', json=body, headers={'Cache-Control': 'no-store'})
+    assert bypass.headers['X-Cache'] == 'BYPASS'
+
+
+def test_fresh_and_cached_cascades_agree(client, pyramid):
+    body = {'speciesArray': pyramid, 'targetSpecies': pyramid[0]}
+    first = client.post('/api/analyze/cascade', json=body).json()
+    fresh = client.post('/api/analyze/cascade', json=body, headers={'Cache-Control': 'no-store'}).json()
+    cached = client.post('/api/analyze/cascade', json=body).json()
+    assert first == fresh == cached
@@ -0,0 +1,122 @@
+import asyncio
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+import app as service
+from conftest import biome
+from model.sensitivity import (
+    analyze_sensitivity, evaluate_samples, first_order_indices, latin_hypercube,
+    output_names, parameter_bounds, scale_samples
+)
+from model.ecosystem import compile_ecosystem
+from service.executor import ModelExecutor
+from service.parallel_samples import gather_rows
+
+
+def test_latin_hypercube_uses_every_stratum_once():
+    unit = latin_hypercube(50, 3, seed=1)
+    assert unit.shape == (50, 3)
+    for column in unit.T:
+        assert sorted((column * 50).astype(int)) == list(range(50))
+    assert np.array_equal(unit, latin_hypercube(50, 3, seed=1))
+
+
+def test_indices_find_the_parameter_an_output_depends_on():
+    unit = latin_hypercube(400, 3, seed=2)
+    outputs = np.column_stack((
+        np.sin(2 * np.pi * unit[:, 0]),     # only x0 (non-monotonic)
+        unit[:, 1] + 0.5 * unit[:, 2],      # x1 mostly, x2 less
+        np.full(400, 3.0)                   # constant
+    ))
+    indices = first_order_indices(unit, outputs)
+    assert indices[0, 0] > 0.9
+    assert indices[1, 0] < 0.05 and indices[2, 0] < 0.05
+    assert indices[1, 1] == pytest.approx(0.8, abs=0.08)
+    assert indices[2, 1] == pytest.approx(0.2, abs=0.08)
+    assert np.isnan(indices[:, 2]).all()
+
+
+def test_parameter_bounds():
+    ranges = parameter_bounds(0.5, {'predation_rate': (0.0, 0.05)}, ['predation_rate', 'natural_mortality'])
+    assert ranges['predation_rate'] == (0.0, 0.05)
+    assert ranges['natural_mortality'] == pytest.approx((0.025, 0.075))
+    assert list(ranges) == ['predation_rate', 'natural_mortality']
+    assert len(parameter_bounds()) == 6
+    for kwargs, message in [({'parameters': ['gravity']}, 'Unknown'),
+                            ({'spread': 1.5}, 'spread'),
+                            ({'bounds': {'predation_rate': (0.2, 0.1)}}, 'low < high')]:
+        with pytest.raises(ValueError, match=message):
+            parameter_bounds(**kwargs)
+
+
+def test_evaluate_samples_reports_every_output():
+    species = biome('forest')
+    values = scale_samples(latin_hypercube(8, 6, seed=0), parameter_bounds())
+    outputs = evaluate_samples(species, values, 6)
+    assert outputs.shape == (8, len(output_names([s['name'] for s in species])))
+    assert np.allclose(outputs[:, len(species)], outputs[:, :len(species)].sum(axis=1))
+
+
+def double(values):
+    return np.column_stack((values, 2 * values))
+
+
+@pytest.mark.parametrize('kind', ['inline', 'thread', 'process'])
+def test_gather_rows_writes_every_chunk_into_place(kind):
+    executor = ModelExecutor(kind, max_workers=2)
+    try:
+        calls = [(0, (np.arange(3.0),)), (3, (np.arange(3.0, 7.0),))]
+        rows = asyncio.run(gather_rows(executor, double, calls, (7, 2)))
+    finally:
+        executor.shutdown()
+    assert rows.tolist() == [[i, 2 * i] for i in range(7)]
+
+
+def test_gather_rows_raises_a_failed_chunk():
+    executor = ModelExecutor('thread', max_workers=2)
+    try:
+        with pytest.raises(ValueError):
+            asyncio.run(gather_rows(executor, double, [(0, (np.ones((2, 2)),))], (2, 2)))
+    finally:
+        executor.shutdown()
+
+
+# ================================================
+# ENDPOINT
+# ================================================
+
+@pytest.fixture
+def client():
+    service.result_cache.clear()
+    return TestClient(service.app)
+
+
+def test_endpoint_matches_the_sequential_analysis(client, monkeypatch):
+    monkeypatch.setattr(service, 'SENSITIVITY_MIN_CHUNK', 16)
+    species = biome('aquatic')
+    body = {'species': species, 'samples': 64, 'timeSteps': 6, 'seed': 7,
+            'parameters': ['predation_rate', 'producer_growth_rate']}
+    response = client.post('/api/analyze/sensitivity', json=body)
+    assert response.status_code == 200, response.text
+    data = response.json()['data']
+
+    expected = analyze_sensitivity(species, 64, 6, parameters=body['parameters'], seed=7)
+    assert data['num_samples'] == 64
+    assert data['parameters'] == expected['parameters']
+    assert list(data['outputs']) == output_names(compile_ecosystem(species).names)
+    # Chunks are integrated separately (step control is shared per batch)
+    for name, output in expected['outputs'].items():
+        assert data['outputs'][name]['mean'] == pytest.approx(output['mean'], rel=1e-3, abs=1e-6)
+
+
+@pytest.mark.parametrize('body', [
+    {'parameters': ['gravity']},
+    {'bounds': {'predation_rate': [0.2, 0.1]}},
+    {'spread': 1},
+    {'samples': 4},
+])
+def test_invalid_sensitivity_requests(client, pyramid, body):
+    response = client.post('/api/analyze/sensitivity', json=dict(body, species=pyramid))
+    assert response.status_code == 422
@@ -0,0 +1,222 @@
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+import app as service
+from conftest import make_species
+from model.cascade_model import EcosystemCascadeModel
+from model.cascade_model import predict_populations
+from model.incremental import IncrementalEcosystem, compile_records
+from service.sessions import SessionNotFound, SessionStore, SessionTooLarge
+
+LEVELS = ('producer', 'primary_consumer', 'secondary_consumer', 'tertiary_consumer')
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class Sized:
+    def __init__(self, size):
+        self.size = size
+
+    def memory_estimate(self):
+        return self.size
+
+
+def random_species(rng, k):
+    return make_species(f'S{k}', LEVELS[rng.integers(4)],
+                        float(rng.uniform(90, 110)), float(rng.uniform(1, 500)))
+
+
+def apply_random_changes(eco, rng, count):
+    for k in range(count):
+        op = rng.integers(3) if len(eco) else 0
+        if op == 0:
+            eco.add(random_species(rng, k))
+        elif op == 1:
+            eco.remove(eco.ids()[rng.integers(len(eco))])
+        else:
+            eco.update(eco.ids()[rng.integers(len(eco))],
+                       {'population': float(rng.uniform(90, 110)), 'trophicLevel': LEVELS[rng.integers(4)]})
+
+
+def assert_matches_batch(eco):
+    species = [{k: v for k, v in s.items() if k != 'id'} for s in eco.species()]
+    model = EcosystemCascadeModel()
+    populations = [s['population'] for s in species]
+    stats = eco.population_stats()
+    assert stats['mean'] == pytest.approx(np.mean(populations), rel=1e-9)
+    assert stats['variance'] == pytest.approx(np.var(populations), rel=1e-6, abs=1e-9)
+    assert eco.ecosystem_health() == model._calculate_ecosystem_health(species)
+    assert eco.risks() == model.calculate_extinction_risk(species)
+    levels = {row['trophic_level']: row for row in eco.level_summary()}
+    for level in LEVELS:
+        same = [s for s in species if s['trophicLevel'] == level]
+        assert levels[level]['count'] == len(same)
+        assert levels[level]['biomass'] == pytest.approx(sum(s['biomass'] for s in same), abs=1e-6)
+
+
+@pytest.mark.parametrize('seed', range(4))
+def test_incremental_matches_the_batch_analysis(seed):
+    rng = np.random.default_rng(seed)
+    eco = IncrementalEcosystem([random_species(rng, -k) for k in range(1, 20)])
+    apply_random_changes(eco, rng, 300)
+    assert_matches_batch(eco)
+
+
+def test_resync_keeps_the_aggregates(pyramid):
+    eco = IncrementalEcosystem(pyramid)
+    eco.RESYNC_EVERY = 7
+    apply_random_changes(eco, np.random.default_rng(9), 50)
+    assert eco._changes_since_resync < 7
+    assert_matches_batch(eco)
+
+
+def test_ids_and_removal(pyramid):
+    eco = IncrementalEcosystem(pyramid)
+    assert eco.ids() == [0, 1, 2, 3]
+    assert eco.add(make_species('Owl', 'tertiary_consumer', 5, 3)) == 4
+    assert eco.remove(1)['name'] == 'Rabbit'
+    assert eco.update(4, {'population': 9, 'name': None})['name'] == 'Owl'
+    assert [s['name'] for s in eco.species()] == ['Grass', 'Fox', 'Eagle', 'Owl']
+    with pytest.raises(KeyError):
+        eco.remove(1)
+    eco.remove(0), eco.remove(2), eco.remove(3), eco.remove(4)
+    assert eco.ecosystem_health() == 0
+    assert eco.population_stats() == {'mean': 0.0, 'variance': 0.0}
+
+
+def test_compiled_is_cached_per_version(pyramid):
+    eco = IncrementalEcosystem(pyramid)
+    first = eco.compiled()
+    assert eco.compiled() is first
+    eco.update(0, {'population': 1})
+    assert eco.compiled() is not first
+    assert eco.compiled().population[0] == 1
+
+
+def test_snapshot_is_not_changed_by_later_deltas(pyramid):
+    eco = IncrementalEcosystem(pyramid)
+    version, records = eco.snapshot()
+    eco.update(0, {'population': 1})
+    eco.remove(3)
+    compiled = compile_records(records)
+    assert compiled.population[0] == pyramid[0]['population'] and len(compiled) == 4
+
+    # An older snapshot never replaces the compiled current version
+    current = eco.compiled()
+    eco.store_compiled(version, compiled)
+    assert eco.compiled() is current
+    assert eco.compiled_for(version) is None
+
+
+def test_store_expires_idle_sessions():
+    clock = FakeClock()
+    store = SessionStore(idle_seconds=10, clock=clock)
+    a = store.create(Sized(1))
+    clock.now = 8
+    b = store.create(Sized(1))
+    clock.now = 15
+    store.get(b)
+    with pytest.raises(SessionNotFound):
+        store.get(a)
+    assert store.stats()['expired'] == 1
+
+
+def test_store_evicts_least_recently_used():
+    store = SessionStore(max_sessions=2, max_bytes=100)
+    a, b = store.create(Sized(10)), store.create(Sized(10))
+    store.get(a)
+    c = store.create(Sized(10))
+    with pytest.raises(SessionNotFound):
+        store.get(b)
+    store.get(a), store.get(c)
+
+    big = Sized(60)
+    d = store.create(big)
+    assert store.stats()['sessions'] == 2  # a went to make room
+    big.size = 95
+    store.resize(d)
+    assert store.stats() == dict(store.stats(), sessions=1, bytes=95)
+
+    big.size = 101
+    with pytest.raises(SessionTooLarge):
+        store.resize(d)
+    with pytest.raises(SessionTooLarge):
+        store.create(Sized(101))
+    assert store.stats()['evicted'] == 3
+
+
+@pytest.fixture
+def client():
+    with TestClient(service.app) as client:
+        yield client
+
+
+def test_session_endpoints(client, pyramid):
+    created = client.post('/api/sessions', json={'species': pyramid}).json()
+    session_id = created['session_id']
+    assert created['data']['ids'] == [0, 1, 2, 3]
+
+    response = client.post(f'/api/sessions/{session_id}/deltas', json={'deltas': [
+        {'op': 'add', 'species': make_species('Owl', 'tertiary_consumer', 6, 4)},
+        {'op': 'update', 'id': 4, 'changes': {'population': 12}},
+        {'op': 'remove', 'id': 1},
+    ]}).json()
+    assert response['data']['added_ids'] == [4]
+    summary = response['data']['summary']
+
+    species = client.get(f'/api/sessions/{session_id}/species').json()['data']['species']
+    assert [(s['id'], s['name'], s['population']) for s in species] == [
+        (0, 'Grass', 5000), (2, 'Fox', 40), (3, 'Eagle', 8), (4, 'Owl', 12)
+    ]
+    plain = [{k: v for k, v in s.items() if k != 'id'} for s in species]
+    health = client.post('/api/ecosystem/health', json={'species': plain}).json()['data']
+    risks = client.get(f'/api/sessions/{session_id}/risks').json()['data']
+    assert risks['species_risks'] == health['species_risks']
+    assert summary['ecosystem_health'] == EcosystemCascadeModel()._calculate_ecosystem_health(plain)
+
+
+def test_bad_delta_leaves_the_session_untouched(client, pyramid):
+    session_id = client.post('/api/sessions', json={'species': pyramid}).json()['session_id']
+    before = client.get(f'/api/sessions/{session_id}').json()['data']['summary']
+    response = client.post(f'/api/sessions/{session_id}/deltas', json={'deltas': [
+        {'op': 'remove', 'id': 0},
+        {'op': 'update', 'id': 0, 'changes': {'population': 1}},
+    ]})
+    assert response.status_code == 422
+    assert 'deltas[1]: unknown species id 0' in response.text
+    assert client.get(f'/api/sessions/{session_id}').json()['data']['summary'] == before
+
+
+def test_unknown_and_oversized_sessions(client, pyramid, monkeypatch):
+    assert client.get('/api/sessions/nope').status_code == 404
+    monkeypatch.setattr(service.session_store, 'max_bytes', 100)
+    assert client.post('/api/sessions', json={'species': pyramid}).status_code == 413
+
+
+def test_sessions_build_and_compile_on_the_executor(client, pyramid, monkeypatch):
+    calls = []
+    real = service.model_executors.run
+
+    async def spy(endpoint, fn, *args):
+        calls.append((endpoint, fn.__name__))
+        return await real(endpoint, fn, *args)
+
+    monkeypatch.setattr(service.model_executors, 'run', spy)
+    session_id = client.post('/api/sessions', json={'species': pyramid}).json()['session_id']
+    body = {'timeSteps': 5}
+    headers = {'Cache-Control': 'no-store'}
+    timeline = client.post(f'/api/sessions/{session_id}/trajectory', json=body, headers=headers).json()
+    assert timeline['data']['timeline'] == predict_populations(pyramid, 5)
+    client.post(f'/api/sessions/{session_id}/trajectory', json=body, headers=headers)
+    assert calls == [
+        ('session', 'IncrementalEcosystem'),
+        ('session', 'compile_records'), ('trajectory', 'predict_populations'),
+        ('trajectory', 'predict_populations')  # compiled once per version
+    ]
@@ -0,0 +1,137 @@
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+import app as service
+from conftest import BIOME_NAMES, biome
+from service.species_catalog import SpeciesCatalog, species_id, write_catalog
+
+LIBRARY = [
+    dict(species, id=f'{name}-{i}')
+    for name in BIOME_NAMES
+    for i, species in enumerate(biome(name))
+]
+
+
+@pytest.fixture
+def catalog_path(tmp_path):
+    path = tmp_path / 'species.ecocat'
+    write_catalog(str(path), LIBRARY)
+    return str(path)
+
+
+@pytest.fixture
+def client(catalog_path, monkeypatch):
+    monkeypatch.setattr(service, 'SPECIES_CATALOG_PATH', catalog_path)
+    service.species_catalog.cache_clear()
+    service.result_cache.clear()
+    yield TestClient(service.app)
+    service.species_catalog.cache_clear()
+
+
+def test_catalog_round_trip(catalog_path):
+    catalog = SpeciesCatalog(catalog_path)
+    assert len(catalog) == len(LIBRARY)
+    assert catalog.ids == [s['id'] for s in LIBRARY]
+    assert catalog.names == [s['name'] for s in LIBRARY]
+    for field in ('biomass', 'energy', 'population'):
+        assert catalog.columns[field].tolist() == [float(s[field]) for s in LIBRARY]
+
+    selected = catalog.select(['forest-2', 'grassland-0', 'forest-2'])
+    assert selected['name'] == ['Fox', 'Grass', 'Fox']
+    assert selected['trophicLevel'] == ['secondary_consumer', 'producer', 'secondary_consumer']
+    assert selected['population'].tolist() == [3000, 1000000, 3000]
+
+
+def test_columns_are_read_only_views_of_the_mapped_file(catalog_path):
+    catalog = SpeciesCatalog(catalog_path)
+    for column in catalog.columns.values():
+        assert not column.flags.writeable
+        assert not column.flags.owndata
+        assert column.ctypes.data % 8 == 0
+    with pytest.raises(ValueError):
+        catalog.columns['population'][0] = 1
+
+
+def test_unknown_ids_are_named(catalog_path):
+    catalog = SpeciesCatalog(catalog_path)
+    with pytest.raises(ValueError, match='Unknown species catalog IDs: nope'):
+        catalog.rows(['forest-0', 'nope'])
+
+
+def test_mongo_ids_and_bad_files(tmp_path):
+    assert species_id({'_id': {'$oid': '65a1'}, 'name': 'Fox'}) == '65a1'
+    assert species_id({'_id': '65a2'}) == '65a2'
+    with pytest.raises(ValueError, match='has no id'):
+        species_id({'name': 'Fox'})
+    with pytest.raises(ValueError, match='unique'):
+        write_catalog(str(tmp_path / 'dup.ecocat'), [LIBRARY[0], LIBRARY[0]])
+
+    bad = tmp_path / 'bad.ecocat'
+    bad.write_bytes(b'ECOT' + bytes(12))
+    with pytest.raises(ValueError, match='not an ECOC'):
+        SpeciesCatalog(str(bad))
+
+
+@pytest.mark.parametrize('path, list_field, extra', [
+    ('/api/analyze/cascade', 'speciesArray', lambda s: {'targetSpecies': s[1], 'seed': 3}),
+    ('/api/analyze/keystone', 'speciesArray', lambda s: {}),
+    ('/api/predict/trajectory', 'species', lambda s: {'timeSteps': 6}),
+    ('/api/ecosystem/health', 'species', lambda s: {}),
+])
+def test_catalog_ids_give_the_same_answer_as_records(client, path, list_field, extra):
+    species = biome('aquatic') + biome('desert')[1:3]
+    ids = [f'aquatic-{i}' for i in range(4)] + ['desert-1', 'desert-2']
+    body = extra(species)
+
+    as_records = client.post(path, json=dict(body, **{list_field: species}))
+    by_id = client.post(path, json=dict(body, speciesColumns={'catalogIds': ids}))
+    assert as_records.status_code == by_id.status_code == 200
+    assert by_id.json()['data'] == as_records.json()['data']
+
+
+def test_overrides_replace_single_values(client):
+    species = biome('tundra')
+    species[2] = dict(species[2], population=3, name='Lone Wolf')
+    body = {
+        'catalogIds': [f'tundra-{i}' for i in range(4)],
+        'overrides': {'2': {'population': 3, 'name': 'Lone Wolf'}}
+    }
+    by_id = client.post('/api/ecosystem/health', json={'speciesColumns': body})
+    as_records = client.post('/api/ecosystem/health', json={'species': species})
+    assert by_id.json()['data'] == as_records.json()['data']
+
+    # The mapped catalog itself is untouched
+    assert service.species_catalog().select(['tundra-2'])['population'].tolist() != [3]
+
+
+@pytest.mark.parametrize('columns, message', [
+    ({'catalogIds': ['forest-0', 'missing']}, 'Unknown species catalog IDs: missing'),
+    ({'catalogIds': ['forest-0'], 'name': ['Trees']}, 'catalogIds replaces the species columns'),
+    ({'catalogIds': ['forest-0'], 'overrides': {'1': {'population': 1}}}, 'out of range'),
+    ({'catalogIds': ['forest-0'], 'overrides': {'0': {'population': 'NaN'}}}, 'finite'),
+    ({'name': ['Trees'], 'trophicLevel': ['producer'], 'biomass': [1], 'energy': [1],
+      'population': [1], 'overrides': {'0': {'population': 1}}}, 'only apply to catalogIds'),
+    ({'name': ['Trees'], 'trophicLevel': ['producer']}, 'Missing columns: biomass, energy, population'),
+])
+def test_invalid_catalog_requests(client, columns, message):
+    response = client.post('/api/analyze/keystone', json={'speciesColumns': columns})
+    assert response.status_code == 422
+    assert message in response.text
+
+
+def test_catalog_must_be_configured(monkeypatch):
+    monkeypatch.setattr(service, 'SPECIES_CATALOG_PATH', '')
+    service.species_catalog.cache_clear()
+    client = TestClient(service.app)
+    response = client.post('/api/analyze/keystone', json={'speciesColumns': {'catalogIds': ['x']}})
+    assert response.status_code == 422
+    assert 'No species catalog is available' in response.text
+    assert client.get('/api/models/status').json()['species_catalog'] == 'disabled'
+    service.species_catalog.cache_clear()
+
+
+def test_status_reports_the_catalog(client):
+    stats = client.get('/api/models/status').json()['species_catalog']
+    assert stats['num_species'] == len(LIBRARY)
+    assert stats['mapped_bytes'] > 0
@@ -0,0 +1,78 @@
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+import app as service
+from conftest import biome
+
+
+def to_columns(species):
+    return {
+        'name': [s['name'] for s in species],
+        'trophicLevel': [s['trophicLevel'] for s in species],
+        'biomass': [s['biomass'] for s in species],
+        'energy': [s['energy'] for s in species],
+        'population': [s['population'] for s in species],
+        'icon': [s['icon'] for s in species],
+    }
+
+
+@pytest.fixture
+def client():
+    service.result_cache.clear()
+    with TestClient(service.app) as client:
+        yield client
+
+
+@pytest.mark.parametrize('path, list_field, extra', [
+    ('/api/analyze/cascade', 'speciesArray', lambda s: {'targetSpecies': s[1], 'seed': 1}),
+    ('/api/analyze/keystone', 'speciesArray', lambda s: {}),
+    ('/api/analyze/invasive', 'currentSpecies',
+     lambda s: {'invasiveSpecies': dict(s[1], name='Invader'), 'invasionStrength': 7}),
+    ('/api/predict/trajectory', 'species', lambda s: {'timeSteps': 8}),
+    ('/api/ecosystem/health', 'species', lambda s: {}),
+])
+@pytest.mark.parametrize('name', ['forest', 'tundra'])
+def test_columns_give_the_same_answer_as_the_list(client, path, list_field, extra, name):
+    species = biome(name)
+    body = extra(species)
+    as_list = client.post(path, json=dict(body, **{list_field: species}))
+    as_columns = client.post(path, json=dict(body, speciesColumns=to_columns(species)))
+    assert as_list.status_code == as_columns.status_code == 200
+    assert as_columns.json()['data'] == as_list.json()['data']
+
+
+def test_icons_are_optional(client, pyramid):
+    columns = to_columns(pyramid)
+    del columns['icon']
+    response = client.post('/api/predict/trajectory', json={'speciesColumns': columns})
+    assert response.status_code == 200
+
+
+def test_column_lengths_must_match(client, pyramid):
+    columns = to_columns(pyramid)
+    columns['biomass'] = columns['biomass'][:-1]
+    response = client.post('/api/analyze/keystone', json={'speciesColumns': columns})
+    assert response.status_code == 422
+    assert 'biomass has 3 entries, expected 4' in response.text
+
+
+@pytest.mark.parametrize('value', ['1e999', 'NaN', '"lots"', '[1]'])
+def test_numeric_columns_must_be_finite_numbers(client, pyramid, value):
+    columns = to_columns(pyramid)
+    columns['population'][0] = '__VALUE__'
+    body = json.dumps({'speciesColumns': columns}).replace('"__VALUE__"', value)
+    response = client.post('/api/analyze/keystone', content=body,
+                           headers={'Content-Type': 'application/json'})
+    assert response.status_code == 422
+    if value in ('1e999', 'NaN'):
+        assert 'must only contain finite numbers' in response.json()['detail'][0]['msg']
+
+
+def test_exactly_one_species_input(client, pyramid):
+    both = client.post('/api/analyze/keystone',
+                       json={'speciesArray': pyramid, 'speciesColumns': to_columns(pyramid)})
+    neither = client.post('/api/analyze/keystone', json={})
+    assert both.status_code == neither.status_code == 422
+    assert 'exactly one of speciesArray or speciesColumns' in neither.text
@@ -0,0 +1,118 @@
+import json
+import os
+import subprocess
+import sys
+import threading
+
+from fastapi.testclient import TestClient
+
+import app as service
+from service.startup import WARMUP_ECOSYSTEM, ModelLoader
+
+SERVICE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Generous bound for importing the app with deferred model imports
+# (about 0.4s here, most of it FastAPI itself)
+STARTUP_BUDGET_SECONDS = 3.0
+
+COLD_START_SCRIPT = '''
+import json, sys, time
+start = time.perf_counter()
+import app
+import_seconds = time.perf_counter() - start
+deferred = {m: m in sys.modules for m in ("numpy", "model.cascade_model")}
+
+from fastapi.testclient import TestClient
+from service.startup import WARMUP_ECOSYSTEM
+client = TestClient(app.app)
+before = client.get("/api/models/status").json()
+health = client.post("/api/ecosystem/health", json={"species": WARMUP_ECOSYSTEM}).json()
+after = client.get("/api/models/status").json()
+print(json.dumps({"import_seconds": import_seconds, "deferred": deferred,
+                  "before": before, "source": health["source"], "after": after}))
+'''
+
+
+def run_cold_start(**env):
+    result = subprocess.run(
+        [sys.executable, '-c', COLD_START_SCRIPT],
+        cwd=SERVICE_DIR, capture_output=True, text=True, timeout=60,
+        env=dict(os.environ, **env)
+    )
+    assert result.returncode == 0, result.stderr
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def test_lazy_cold_start_defers_the_model_until_the_first_request():
+    report = min((run_cold_start(ML_LAZY_IMPORTS='1') for _ in range(3)),
+                 key=lambda r: r['import_seconds'])
+    assert report['import_seconds'] < STARTUP_BUDGET_SECONDS, report['import_seconds']
+    assert report['deferred'] == {'numpy': False, 'model.cascade_model': False}
+
+    assert report['before']['cascade_model'] == '⏳ Not loaded yet'
+    assert report['before']['startup']['state'] == 'deferred'
+    # The first model request imports it and gets the real model
+    assert report['source'] == 'ml_model'
+    assert report['after']['cascade_model'] == '✅ Ready'
+    assert report['after']['startup']['import_seconds'] > 0
+
+
+def test_eager_start_imports_the_model():
+    report = run_cold_start(ML_LAZY_IMPORTS='0')
+    assert report['deferred'] == {'numpy': True, 'model.cascade_model': True}
+    assert report['before']['startup']['state'] == 'loaded'
+
+
+def test_lifespan_warms_up_and_reports_timings():
+    with TestClient(service.app) as client:
+        startup = client.get('/api/models/status').json()['startup']
+    assert startup['state'] == 'warm'
+    assert startup['model_available'] is True
+    assert startup['warmup_seconds'] > 0
+    assert startup['warmup_error'] is None
+
+
+def test_loader_imports_once_under_concurrent_first_requests():
+    calls = []
+    loader = ModelLoader(lambda: calls.append(1) or True, lambda: None)
+    threads = [threading.Thread(target=loader.load) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert calls == [1]
+    assert loader.available is True
+
+
+def test_failed_warm_up_is_reported_not_raised():
+    def warm_up():
+        raise RuntimeError('boom')
+
+    loader = ModelLoader(lambda: True, warm_up)
+    loader.warm()
+    assert loader.stats()['state'] == 'warm'
+    assert loader.warmup_error == 'boom'
+
+
+def test_unavailable_model_is_not_warmed_up():
+    warmed = []
+    loader = ModelLoader(lambda: False, lambda: warmed.append(1))
+    loader.warm()
+    assert warmed == []
+    assert loader.stats()['model_available'] is False
+
+
+def test_warmup_template_is_a_valid_request():
+    client = TestClient(service.app)
+    response = client.post('/api/predict/trajectory', json={'species': WARMUP_ECOSYSTEM})
+    assert response.status_code == 200
+
+
+def test_validators_import_numpy_through_the_model_loader(monkeypatch):
+    loads = []
+    loader = ModelLoader(lambda: loads.append('load') or True, lambda: None)
+    monkeypatch.setattr(service, 'model_loader', loader)
+    assert service._float_column([1, 2.5]).tolist() == [1.0, 2.5]
+    service._link_column([0, 1])
+    assert loads == ['load']
+    assert loader.stats()['import_seconds'] is not None
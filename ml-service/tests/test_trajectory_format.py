@@ -0,0 +1,112 @@
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+import app as service
+from model.numeric import truncate_to_ints
+from service.trajectory_format import (
+    BINARY_FLOAT32, COMPACT_JSON, MSGPACK, decode_float32, encode_float32,
+    msgpack_available, negotiate_format, table_from_timeline
+)
+
+JSON_TABLE = 'application/vnd.ecopyramid.trajectory+json'
+FLOAT32_TABLE = 'application/vnd.ecopyramid.trajectory+float32'
+
+
+@pytest.fixture
+def client():
+    service.result_cache.clear()
+    with TestClient(service.app) as client:
+        yield client
+
+
+@pytest.mark.parametrize('accept, expected', [
+    ('', None),
+    ('*/*', None),
+    ('application/json', None),
+    (JSON_TABLE, COMPACT_JSON),
+    (FLOAT32_TABLE, BINARY_FLOAT32),
+    (f'{JSON_TABLE};q=0.5, {FLOAT32_TABLE}', BINARY_FLOAT32),
+    (f'{JSON_TABLE};q=0.5, application/json', None),
+    (f'application/json;q=0.2, {JSON_TABLE}', COMPACT_JSON),
+])
+def test_negotiate_format(accept, expected):
+    assert negotiate_format(accept) == expected
+
+
+def test_msgpack_only_when_installed():
+    expected = MSGPACK if msgpack_available() else None
+    assert negotiate_format('application/msgpack') == expected
+
+
+def test_compact_json_matches_the_timeline(client, pyramid):
+    body = {'species': pyramid, 'timeSteps': 9}
+    timeline = client.post('/api/predict/trajectory', json=body).json()['data']['timeline']
+    response = client.post('/api/predict/trajectory', json=body, headers={'Accept': JSON_TABLE})
+    assert response.headers['content-type'].startswith(JSON_TABLE)
+    table = response.json()['data']
+
+    assert table['names'] == [s['name'] for s in pyramid]
+    assert table['steps'] == [entry['step'] for entry in timeline]
+    assert table['ecosystem_health'] == [entry['ecosystem_health'] for entry in timeline]
+    assert table['populations'] == [list(entry['species_data'].values()) for entry in timeline]
+
+
+def test_float32_round_trip(client, pyramid):
+    body = {'species': pyramid, 'steps': [0, 3, 50]}
+    timeline = client.post('/api/predict/trajectory', json=body).json()['data']['timeline']
+    response = client.post('/api/predict/trajectory', json=body, headers={'Accept': FLOAT32_TABLE})
+    assert response.headers['content-type'] == FLOAT32_TABLE
+
+    table = decode_float32(response.content)
+    assert table['names'] == [s['name'] for s in pyramid]
+    assert table['steps'] == [0, 3, 50]
+    assert table['ecosystem_health'] == [entry['ecosystem_health'] for entry in timeline]
+    expected = np.array([list(entry['species_data'].values()) for entry in timeline], dtype=np.float32)
+    np.testing.assert_array_equal(table['populations'], expected)
+
+
+def test_float32_layout():
+    table = {
+        'names': ['Gräs', 'Räv 🦊'],
+        'steps': [0, 7],
+        'ecosystem_health': [90, 85],
+        'populations': np.array([[1.5, 2.0], [3.0, 4.25]])
+    }
+    data = encode_float32(table)
+    assert data[:4] == b'ECOT'
+    assert len(data) % 4 == 0
+    decoded = decode_float32(data)
+    assert decoded['names'] == table['names']
+    assert decoded['steps'] == [0, 7]
+    assert decoded['ecosystem_health'] == [90, 85]
+    np.testing.assert_array_equal(decoded['populations'], table['populations'])
+
+    with pytest.raises(ValueError):
+        decode_float32(b'NOPE' + data[4:])
+    with pytest.raises(ValueError):
+        encode_float32(dict(table, steps=[0, 2 ** 32]))
+
+
+def test_empty_timeline():
+    table = table_from_timeline([])
+    decoded = decode_float32(encode_float32(table))
+    assert decoded['names'] == [] and decoded['steps'] == []
+    assert decoded['populations'].shape == (0, 0)
+
+
+def test_populations_past_int64_become_python_ints():
+    assert truncate_to_ints(np.array([[1.9, 2.0], [0.0, 7.5]])) == [[1, 2], [0, 7]]
+    big = 2.0 ** 70
+    assert truncate_to_ints(np.array([[big, 3.7]])) == [[2 ** 70, 3]]
+    assert truncate_to_ints(np.array([big, 1.5])) == [2 ** 70, 1]
+    assert truncate_to_ints(np.empty((0, 3))) == []
+
+
+def test_msgpack_round_trip(client, pyramid):
+    msgpack = pytest.importorskip('msgpack')
+    body = {'species': pyramid, 'timeSteps': 4}
+    compact = client.post('/api/predict/trajectory', json=body, headers={'Accept': JSON_TABLE}).json()
+    response = client.post('/api/predict/trajectory', json=body, headers={'Accept': 'application/msgpack'})
+    assert msgpack.unpackb(response.content, raw=False) == compact
@@ -0,0 +1,83 @@
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+import app as service
+from model.cascade_model import predict_populations
+from service.executor import ExecutorBusy
+
+
+@pytest.fixture
+def client():
+    with TestClient(service.app) as client:
+        yield client
+
+
+def ndjson(response):
+    return [json.loads(line) for line in response.text.splitlines()]
+
+
+def sse(response):
+    events = []
+    for block in response.text.split('\n\n'):
+        if block:
+            event, data = block.split('\n')
+            assert event.startswith('event: ') and data.startswith('data: ')
+            events.append((event[len('event: '):], json.loads(data[len('data: '):])))
+    return events
+
+
+@pytest.mark.parametrize('chunk_size', [1, 4, 12, 100])
+def test_ndjson_matches_the_trajectory(client, pyramid, chunk_size):
+    response = client.post('/api/predict/trajectory/stream',
+                           json={'species': pyramid, 'timeSteps': 12, 'chunkSize': chunk_size})
+    assert response.status_code == 200
+    assert response.headers['content-type'].startswith('application/x-ndjson')
+    messages = ndjson(response)
+    assert messages[-1] == {'done': True, 'steps': 12}
+    assert messages[:-1] == predict_populations(pyramid, 12)
+
+
+def test_sse_framing(client, pyramid):
+    response = client.post('/api/predict/trajectory/stream?format=sse',
+                           json={'species': pyramid, 'timeSteps': 5, 'chunkSize': 2})
+    assert response.headers['content-type'].startswith('text/event-stream')
+    events = sse(response)
+    assert [event for event, _ in events] == ['step'] * 5 + ['done']
+    assert [data for _, data in events[:-1]] == predict_populations(pyramid, 5)
+
+
+def test_failure_mid_stream_sends_an_error_record(client, pyramid):
+    body = {'species': pyramid, 'mode': 'analytic', 'steps': [1, 2, 40000]}
+    lines = ndjson(client.post('/api/predict/trajectory/stream', json=body))
+    assert [line['step'] for line in lines[:2]] == [1, 2]
+    assert lines[-1]['steps'] == 2
+    assert 'overflow' in lines[-1]['error']
+    assert 'done' not in lines[-1]
+
+    events = sse(client.post('/api/predict/trajectory/stream',
+                             json=body, headers={'Accept': 'text/event-stream'}))
+    assert events[-1][0] == 'error'
+
+
+def test_failure_before_the_first_step_is_a_status_code(client, pyramid):
+    response = client.post('/api/predict/trajectory/stream',
+                           json={'species': pyramid, 'mode': 'analytic', 'steps': [40000]})
+    assert response.status_code == 422
+
+
+def test_stream_uses_the_model_executor(client, pyramid, monkeypatch):
+    executor = service.model_executors.for_generator('trajectory')
+    before = executor.finished
+    client.post('/api/predict/trajectory/stream',
+                json={'species': pyramid, 'timeSteps': 10, 'chunkSize': 4})
+    # Chunks of 4, 4, 2
+    assert executor.finished - before == 3
+
+    async def busy(*args, **kwargs):
+        raise ExecutorBusy('thread')
+
+    monkeypatch.setattr(executor, 'run', busy)
+    response = client.post('/api/predict/trajectory/stream', json={'species': pyramid})
+    assert response.status_code == 503